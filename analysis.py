@@ -0,0 +1,40 @@
+from transcript import Transcript
+
+
+class AnalysisResult:
+    """
+    Résultat de l'analyse d'une vidéo: tout ce qui coûte cher (Whisper, volume, fusion).
+    La sélection du Highlight et la compilation des Tiktoks n'en dépendent que: elles
+    peuvent être recalculées instantanément (autre profil, autre nombre de Tiktoks)
+    sans relancer l'analyse (cf. VideoProcessor.replan).
+    """
+    def __init__(self, input_file, video_duration, transcript, scored_chunks, intelligent_segments,
+                 params=None):
+        self.input_file = input_file
+        self.video_duration = video_duration
+        self.transcript = Transcript.from_dict(transcript) # Transcription en colonnes (phrases + mots)
+        self.scored_chunks = [tuple(c) for c in scored_chunks]                   # (start, end, durée, score)
+        self.intelligent_segments = [tuple(s) for s in intelligent_segments]     # idem, triés par score
+        self.params = dict(params or {})                 # Paramètres qui ont produit l'analyse
+
+    @property
+    def speech_timeline(self):
+        """Phrases transcrites: [(start, end, texte), ...] dans l'ordre chronologique."""
+        return self.transcript.segments()
+
+    def to_dict(self):
+        return {
+            'input_file': self.input_file,
+            'video_duration': self.video_duration,
+            'transcript': self.transcript.to_dict(),
+            'scored_chunks': [list(c) for c in self.scored_chunks],
+            'intelligent_segments': [list(s) for s in self.intelligent_segments],
+            'params': self.params,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        # 'whisper_result': analyses enregistrées avant le format en colonnes
+        transcript = data['transcript'] if 'transcript' in data else data['whisper_result']
+        return cls(data['input_file'], data['video_duration'], transcript,
+                   data['scored_chunks'], data['intelligent_segments'], data.get('params'))
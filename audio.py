@@ -0,0 +1,361 @@
+import os
+import subprocess
+import tempfile
+
+# DÉPENDANCE OPTIONNELLE:
+# NumPy (déjà installé avec openai-whisper) permet l'analyse de volume en
+# une seule passe. Sans lui, on retombe sur l'ancienne méthode (1 ffmpeg par 'bout').
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SAMPLE_RATE = 16000     # 16 kHz mono: le format attendu par Whisper
+FRAME_DURATION = 0.1    # Résolution de l'analyse de volume (100 ms)
+READ_BLOCK_SECONDS = 60 # Quantité d'audio lue dans le pipe à chaque itération
+SILENCE_FLOOR_DB = -91.0 # Plancher de 'volumedetect' (silence numérique)
+
+
+class FrameLevels:
+    """
+    Niveaux audio d'une vidéo sur une grille fine de 'frames' (ex: 100 ms).
+    Pour chaque frame on garde le pic (valeur absolue max) et la somme des carrés,
+    ce qui suffit pour recalculer max_volume / mean_volume sur n'importe quel intervalle.
+    """
+    def __init__(self, peak, sumsq, counts, frame_duration, sample_rate, flux=None):
+        self.peak = peak        # np.float32[n_frames]
+        self.sumsq = sumsq      # np.float64[n_frames]
+        self.counts = counts    # np.int64[n_frames] (échantillons par frame)
+        self.frame_duration = frame_duration
+        self.sample_rate = sample_rate
+        self.flux = flux        # np.float64[n_frames] (flux spectral) ou None si non calculé
+
+    def __len__(self):
+        return len(self.peak)
+
+    @property
+    def duration(self):
+        return float(self.counts.sum()) / self.sample_rate
+
+    def frame_range(self, start, end):
+        """Indices [i0, i1) des frames couvrant l'intervalle [start, end[ (en secondes)."""
+        i0 = int(round(start / self.frame_duration))
+        i1 = int(round(end / self.frame_duration))
+        i0 = min(max(i0, 0), len(self))
+        i1 = min(max(i1, i0), len(self))
+        return i0, i1
+
+
+def pcm_decode_cmd(input_file, sample_rate=SAMPLE_RATE, start=None, duration=None, input_args=None):
+    """
+    Commande ffmpeg qui décode la piste audio en PCM float32 mono sur stdout.
+    'input_args' sont des options d'entrée supplémentaires (ex: '-follow 1' pour un fichier qui grossit).
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-nostdin', '-loglevel', 'error']
+    if start:
+        cmd += ['-ss', str(start)]
+    if duration:
+        cmd += ['-t', str(duration)]
+    if input_args:
+        cmd += list(input_args)
+    cmd += [
+        '-i', input_file,
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+        '-f', 'f32le', '-acodec', 'pcm_f32le', '-'
+    ]
+    return cmd
+
+
+def _read_exact(stream, size):
+    """Lit 'size' octets (ou moins si fin de flux) depuis un pipe."""
+    buf = bytearray()
+    while len(buf) < size:
+        data = stream.read(size - len(buf))
+        if not data:
+            break
+        buf += data
+    return bytes(buf)
+
+
+def iter_pcm_blocks(input_file, block_samples, sample_rate=SAMPLE_RATE, popen=subprocess.Popen, input_args=None):
+    """
+    Décode la piste audio UNE seule fois via un pipe ffmpeg et la rend
+    par blocs de 'block_samples' échantillons (np.float32).
+    'popen' permet de passer un Popen instrumenté (cf. metrics.RunReport.popen).
+    """
+    if np is None:
+        raise ImportError("NumPy est requis pour le décodage audio en une passe.")
+
+    block_bytes = block_samples * 4 # float32
+    # stderr va dans un fichier temporaire: un pipe non lu pourrait bloquer ffmpeg
+    with tempfile.TemporaryFile() as err:
+        proc = popen(pcm_decode_cmd(input_file, sample_rate, input_args=input_args), stdout=subprocess.PIPE, stderr=err)
+        try:
+            while True:
+                data = _read_exact(proc.stdout, block_bytes)
+                usable = len(data) - (len(data) % 4)
+                if usable:
+                    yield np.frombuffer(data[:usable], dtype=np.float32)
+                if len(data) < block_bytes:
+                    break
+        except BaseException:
+            # Lecture interrompue (erreur, ou l'appelant s'arrête avant la fin): ffmpeg est arrêté
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+
+        # Code négatif: ffmpeg a été tué de l'extérieur (ex: arrêt du traitement), l'audio est incomplet
+        if returncode != 0:
+            err.seek(0)
+            stderr = err.read().decode('utf-8', errors='replace')
+            raise subprocess.CalledProcessError(returncode, proc.args, stderr=stderr)
+
+
+def _block_samples(frame_duration, sample_rate):
+    """(échantillons par frame, échantillons par bloc lu): un bloc contient un nombre entier de frames."""
+    frame_samples = max(1, int(round(frame_duration * sample_rate)))
+    frames_per_block = max(1, int(READ_BLOCK_SECONDS / frame_duration))
+    return frame_samples, frame_samples * frames_per_block
+
+
+def compute_frame_levels(input_file, frame_duration=FRAME_DURATION, sample_rate=SAMPLE_RATE,
+                         total_duration=None, progress_cb=None, popen=subprocess.Popen, spectral=False):
+    """
+    Décode l'audio une seule fois et calcule, de façon vectorisée, le pic et
+    l'énergie de chaque frame de 'frame_duration' secondes.
+    'spectral': calcule aussi le flux spectral dans la même passe (cf. scoring.py).
+    """
+    _, block_samples = _block_samples(frame_duration, sample_rate)
+    blocks = iter_pcm_blocks(input_file, block_samples, sample_rate, popen)
+    return levels_from_blocks(blocks, frame_duration, sample_rate, total_duration, progress_cb, spectral)
+
+
+def levels_from_blocks(blocks, frame_duration=FRAME_DURATION, sample_rate=SAMPLE_RATE,
+                       total_duration=None, progress_cb=None, spectral=False):
+    """Niveaux (FrameLevels) à partir de blocs PCM contenant chacun un nombre entier de frames."""
+    frame_samples, _ = _block_samples(frame_duration, sample_rate)
+    peaks, sumsqs, counts = [], [], []
+    fluxes = [] if spectral else None
+    previous_spectrum = None
+    decoded_samples = 0
+    expected_samples = (total_duration or 0) * sample_rate
+
+    for block in blocks:
+        peak, sumsq, count = block_levels(block, frame_samples)
+        peaks.append(peak)
+        sumsqs.append(sumsq)
+        counts.append(count)
+        if spectral:
+            flux, previous_spectrum = block_flux(block, frame_samples, previous_spectrum)
+            fluxes.append(flux)
+
+        decoded_samples += len(block)
+        if progress_cb and expected_samples:
+            progress_cb(min(100.0, decoded_samples / expected_samples * 100))
+
+    return concat_levels(peaks, sumsqs, counts, frame_duration, sample_rate, fluxes)
+
+
+# --- Piste audio décodée une fois, partagée par toutes les analyses ---
+
+class PcmBuffer:
+    """
+    Piste audio décodée UNE fois (16 kHz mono float32) dans un fichier mappé en mémoire.
+    Whisper, l'analyse de volume et le filtre VAD en lisent des vues NumPy sans copie;
+    les processus de transcription ouvrent le même fichier et partagent ses pages.
+    Mappage 'copy-on-write': les vues sont modifiables (Whisper en fait des tenseurs)
+    sans que le fichier ne le soit jamais.
+    """
+    def __init__(self, path, sample_rate=SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.samples = open_pcm(path)
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+    def view(self, start=None, end=None):
+        """Échantillons de [start, end[ (secondes), sans copie."""
+        i0 = 0 if start is None else max(0, int(start * self.sample_rate))
+        i1 = len(self.samples) if end is None else max(i0, int(end * self.sample_rate))
+        return self.samples[i0:i1]
+
+    def iter_blocks(self, block_samples):
+        for i in range(0, len(self.samples), block_samples):
+            yield self.samples[i:i + block_samples]
+
+    def frame_levels(self, frame_duration=FRAME_DURATION, spectral=False):
+        """Niveaux (FrameLevels) recalculés depuis le fichier, sans décodage (ex: reprise)."""
+        _, block_samples = _block_samples(frame_duration, self.sample_rate)
+        return levels_from_blocks(self.iter_blocks(block_samples), frame_duration, self.sample_rate,
+                                  spectral=spectral)
+
+    def close(self):
+        """Libère le mappage (nécessaire sous Windows avant de supprimer le fichier)."""
+        self.samples = None
+
+
+def open_pcm(path):
+    """Vue mappée (copy-on-write) d'un fichier PCM float32; un fichier vide donne un tableau vide."""
+    if os.path.getsize(path) < 4:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode='c')
+
+
+def decode_to_buffer(input_file, path, frame_duration=FRAME_DURATION, sample_rate=SAMPLE_RATE,
+                     total_duration=None, progress_cb=None, popen=subprocess.Popen, spectral=False):
+    """
+    Décode la piste audio dans 'path' (PCM float32) et calcule les niveaux dans la même
+    passe. Écrit d'abord dans '<path>.part': un fichier 'path' existant est toujours complet.
+    Retourne (PcmBuffer, FrameLevels).
+    """
+    _, block_samples = _block_samples(frame_duration, sample_rate)
+    part_path = f"{path}.part"
+
+    def written(blocks, f):
+        for block in blocks:
+            block.tofile(f)
+            yield block
+
+    try:
+        with open(part_path, 'wb') as f:
+            blocks = written(iter_pcm_blocks(input_file, block_samples, sample_rate, popen), f)
+            levels = levels_from_blocks(blocks, frame_duration, sample_rate, total_duration, progress_cb, spectral)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return PcmBuffer(path, sample_rate), levels
+
+
+def block_levels(block, frame_samples):
+    """(pic, somme des carrés, échantillons) de chaque frame d'un bloc PCM. La dernière peut être incomplète."""
+    n_full = len(block) // frame_samples
+    frames = block[:n_full * frame_samples].reshape(n_full, frame_samples)
+    peak = np.abs(frames).max(axis=1) if n_full else np.zeros(0, dtype=np.float32)
+    sumsq = np.square(frames, dtype=np.float64).sum(axis=1)
+    count = np.full(n_full, frame_samples, dtype=np.int64)
+    tail = block[n_full * frame_samples:]
+    if len(tail):
+        # Dernière frame incomplète (fin de flux uniquement)
+        peak = np.append(peak, np.float32(np.abs(tail).max()))
+        sumsq = np.append(sumsq, np.square(tail, dtype=np.float64).sum())
+        count = np.append(count, len(tail))
+    return peak, sumsq, count
+
+
+def block_flux(block, frame_samples, previous_spectrum=None):
+    """
+    Flux spectral de chaque frame d'un bloc: hausse moyenne du spectre (log-amplitude)
+    par rapport à la frame précédente. Élevé sur les attaques (cris, explosions, rires).
+    Retourne (flux, spectre de la dernière frame complète, pour le bloc suivant).
+    """
+    n_full = len(block) // frame_samples
+    flux = np.zeros(0)
+    if n_full:
+        frames = block[:n_full * frame_samples].reshape(n_full, frame_samples)
+        spectrum = np.log1p(np.abs(np.fft.rfft(frames * np.hanning(frame_samples).astype(np.float32), axis=1)))
+        previous = spectrum[:1] if previous_spectrum is None else previous_spectrum[np.newaxis, :]
+        flux = np.maximum(np.diff(np.vstack([previous, spectrum]), axis=0), 0).mean(axis=1)
+        previous_spectrum = spectrum[-1]
+    if len(block) % frame_samples:
+        flux = np.append(flux, 0.0) # Dernière frame incomplète (fin de flux)
+    return flux, previous_spectrum
+
+
+def concat_levels(peaks, sumsqs, counts, frame_duration=FRAME_DURATION, sample_rate=SAMPLE_RATE, fluxes=None):
+    """Assemble des niveaux calculés bloc par bloc (cf. block_levels) en un seul FrameLevels."""
+    if not peaks:
+        empty = np.zeros(0)
+        return FrameLevels(empty.astype(np.float32), empty, empty.astype(np.int64), frame_duration, sample_rate,
+                           None if fluxes is None else empty)
+    return FrameLevels(np.concatenate(peaks), np.concatenate(sumsqs), np.concatenate(counts),
+                       frame_duration, sample_rate, None if fluxes is None else np.concatenate(fluxes))
+
+
+def to_db(values, floor_db=SILENCE_FLOOR_DB):
+    """Convertit une amplitude linéaire en dB (plancher = silence numérique)."""
+    floor = 10 ** (floor_db / 20)
+    return 20 * np.log10(np.maximum(values, floor))
+
+
+def chunk_levels(levels, chunks):
+    """
+    Calcule (max_volume, mean_volume) en dB pour chaque (start, end) de 'chunks',
+    comme le ferait le filtre 'volumedetect' de ffmpeg, mais en une passe vectorisée.
+    """
+    n = len(chunks)
+    max_db = np.full(n, SILENCE_FLOOR_DB)
+    mean_db = np.full(n, SILENCE_FLOOR_DB)
+    if n == 0 or len(levels) == 0:
+        return max_db, mean_db
+
+    bounds = np.array(chunks, dtype=np.float64).reshape(-1, 2)
+    i0 = np.clip(np.round(bounds[:, 0] / levels.frame_duration).astype(np.int64), 0, len(levels))
+    i1 = np.clip(np.round(bounds[:, 1] / levels.frame_duration).astype(np.int64), i0, len(levels))
+    valid = i1 > i0
+
+    # Sommes préfixes: énergie et nombre d'échantillons sur [i0, i1) en O(1)
+    cum_sumsq = np.concatenate(([0.0], np.cumsum(levels.sumsq)))
+    cum_counts = np.concatenate(([0], np.cumsum(levels.counts)))
+    energy = cum_sumsq[i1] - cum_sumsq[i0]
+    samples = cum_counts[i1] - cum_counts[i0]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_power = np.where(samples > 0, energy / np.maximum(samples, 1), 0.0)
+    mean_db = np.where(valid, to_db(np.sqrt(mean_power)), SILENCE_FLOOR_DB)
+
+    widths = i1 - i0
+    if n > 1 and widths[0] > 0 and np.all(widths == widths[0]):
+        # Fenêtres glissantes de largeur fixe (qui se chevauchent): max glissant en O(frames)
+        peaks_max = sliding_max(levels.peak, int(widths[0]))[i0].astype(np.float64)
+    else:
+        # Pic par intervalle: un seul 'reduceat' sur les bornes entrelacées (i0, i1)
+        padded_peak = np.append(levels.peak, np.float32(0)) # i1 peut valoir n_frames
+        interleaved = np.empty(2 * n, dtype=np.int64)
+        interleaved[0::2] = i0
+        interleaved[1::2] = i1
+        peaks_max = np.maximum.reduceat(padded_peak, interleaved)[0::2].astype(np.float64)
+    max_db = np.where(valid, to_db(peaks_max), SILENCE_FLOOR_DB)
+    return max_db, mean_db
+
+
+def sliding_max(values, width):
+    """
+    m[i] = max(values[i:i + width]) pour i dans [0, len(values) - width], en O(n)
+    quelle que soit la largeur (algorithme de van Herk / Gil-Werman: max cumulés
+    avant/arrière par blocs de 'width').
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if width <= 1 or n == 0:
+        return values.copy()
+    width = min(width, n)
+    blocks = -(-n // width)
+    padded = np.full(blocks * width, values.min(), dtype=values.dtype)
+    padded[:n] = values
+    padded = padded.reshape(blocks, width)
+    forward = np.maximum.accumulate(padded, axis=1).ravel()                 # max depuis le début du bloc
+    backward = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel() # max jusqu'à la fin du bloc
+    starts = np.arange(n - width + 1)
+    return np.maximum(backward[starts], forward[starts + width - 1])
+
+
+def volume_scores(durations, max_db, mean_db):
+    """
+    Formule de 'hype' historique (cf. VideoProcessor._score_segment), vectorisée:
+    score = durée * facteur_volume * facteur_dynamique, 0 si max <= -40 dB.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    vol_factor = (max_db + 40) / 40
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dyn_factor = np.where(mean_db != 0, np.abs(mean_db - max_db) / np.abs(mean_db), 1.0)
+    scores = durations * vol_factor * dyn_factor
+    return np.where(max_db <= -40, 0.0, scores)
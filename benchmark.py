@@ -0,0 +1,316 @@
+"""
+Banc d'essai reproductible des étapes du VideoProcessor (sans Whisper).
+
+    python benchmark.py                                  # vidéo synthétique de 10 min
+    python benchmark.py --durations 600,3600,14400 --skip-extraction
+    python benchmark.py --save-baseline                  # enregistre la référence
+    python benchmark.py --compare                        # compare à la référence
+
+Les vidéos de test sont générées localement par ffmpeg (sources 'lavfi': mire,
+bruit de fond, silences et 'bursts' de hype scriptés) et réutilisées d'un lancement
+à l'autre. Whisper est remplacé par une transcription enregistrée (JSON) alignée
+sur les bursts: seules les étapes de ce projet sont mesurées.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+from processor import VideoProcessor
+from transcript import Transcript
+
+DEFAULT_FIXTURES_DIR = "bench_fixtures"
+DEFAULT_BASELINE = "bench_baseline.json"
+DEFAULT_TOLERANCE = 0.25 # +25% de temps = régression
+NOISE_FLOOR = 0.05       # En dessous de 50 ms, les écarts ne sont pas significatifs
+
+BASE_LEVEL = 0.03        # Bruit de fond ('chat' du stream)
+BURST_LEVEL = 1.0        # Moment 'hype'
+WORDS = ("non", "mais", "regarde", "ça", "c'est", "incroyable", "allez", "vas-y", "oh", "là", "quoi", "gg")
+
+
+# --- 1. Génération des vidéos de test ---
+
+def burst_schedule(duration, seed=0):
+    """
+    Scénario déterministe: (bursts, silences), listes de (début, fin) en secondes.
+    Un burst de 5 à 20 s toutes les 60 à 180 s, et quelques silences complets.
+    """
+    rng = random.Random(seed)
+    bursts, silences = [], []
+    t = rng.uniform(20, 60)
+    while t < duration - 5:
+        length = rng.uniform(5, 20)
+        bursts.append((round(t, 2), round(min(duration, t + length), 2)))
+        gap = rng.uniform(60, 180)
+        if rng.random() < 0.3 and t + length + 30 < duration:
+            start = t + length + rng.uniform(5, gap / 2)
+            silences.append((round(start, 2), round(min(duration, start + rng.uniform(5, 20)), 2)))
+        t += length + gap
+    return bursts, silences
+
+
+def _level_expression(bursts, silences):
+    """Expression ffmpeg 'volume' (évaluée par frame): bruit de fond, bursts, silences."""
+    def any_of(regions):
+        return "+".join(f"between(t,{s},{e})" for s, e in regions) or "0"
+    return (f"if(gt({any_of(silences)},0),0,"
+            f"if(gt({any_of(bursts)},0),{BURST_LEVEL},{BASE_LEVEL}))")
+
+
+def fixture_command(output_path, duration, bursts, silences, size="320x180", seed=0):
+    level = _level_expression(bursts, silences)
+    # 'Voix': un ton haché (syllabes de 0.4 s) pendant les bursts
+    speech = "if(gt({},0),0.5*gte(mod(t,0.6),0.2),0)".format(
+        "+".join(f"between(t,{s},{e})" for s, e in bursts) or "0"
+    )
+    return [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={size}:rate=30:duration={duration}",
+        '-f', 'lavfi', '-i', f"anoisesrc=color=pink:amplitude=0.5:sample_rate=48000:seed={seed}:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=220:sample_rate=48000:duration={duration}",
+        '-filter_complex',
+        f"[1:a]volume='{level}':eval=frame[noise];"
+        f"[2:a]volume='{speech}':eval=frame[voice];"
+        f"[noise][voice]amix=inputs=2:duration=first:normalize=0[a]",
+        '-map', '0:v', '-map', '[a]',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '35', '-g', '60', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '64k', '-ac', '2',
+        output_path
+    ]
+
+
+def synthetic_transcript(duration, bursts, seed=0):
+    """
+    Transcription 'enregistrée' au format compact de VideoProcessor: des phrases
+    pendant chaque burst, et des phrases plus rares entre les bursts.
+    """
+    rng = random.Random(seed + 1)
+    segments = []
+
+    def add_phrases(start, end):
+        t = start
+        while t < end - 0.5:
+            length = min(end - t, rng.uniform(1.5, 6.0))
+            words, w = [], t
+            while w < t + length - 0.2:
+                step = rng.uniform(0.2, 0.5)
+                words.append({'word': f" {rng.choice(WORDS)}", 'start': round(w, 2), 'end': round(min(w + step, t + length), 2)})
+                w += step
+            segments.append({
+                'start': round(t, 2), 'end': round(t + length, 2),
+                'text': "".join(word['word'] for word in words), 'words': words,
+            })
+            t += length + rng.uniform(0.1, 1.0)
+
+    previous_end = 0.0
+    for start, end in bursts:
+        # Bavardage entre deux bursts (environ une phrase par minute)
+        for _ in range(int((start - previous_end) / 60)):
+            t = rng.uniform(previous_end, max(previous_end, start - 6))
+            add_phrases(t, t + rng.uniform(2, 5))
+        add_phrases(max(0.0, start - rng.uniform(0, 2)), min(duration, end + rng.uniform(0, 2)))
+        previous_end = end
+
+    segments.sort(key=lambda seg: seg['start'])
+    return {'language': 'fr', 'segments': segments}
+
+
+def ensure_fixture(fixtures_dir, duration, seed=0, size="320x180", log=print):
+    """Génère (une seule fois) la vidéo et la transcription d'une durée donnée."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    name = f"synthetic_{int(duration)}s_seed{seed}"
+    video_path = os.path.join(fixtures_dir, f"{name}.mp4")
+    transcript_path = os.path.join(fixtures_dir, f"{name}_transcript.json")
+    bursts, silences = burst_schedule(duration, seed)
+
+    if not os.path.exists(video_path):
+        log(f"Génération de '{video_path}' ({duration / 60:.0f} min, {len(bursts)} bursts)...")
+        tmp_path = os.path.join(fixtures_dir, f"{name}.tmp.mp4")
+        subprocess.run(fixture_command(tmp_path, duration, bursts, silences, size, seed), check=True)
+        os.replace(tmp_path, video_path)
+
+    if not os.path.exists(transcript_path):
+        with open(transcript_path, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_transcript(duration, bursts, seed), f)
+    return video_path, transcript_path
+
+
+# --- 2. Whisper remplacé par une transcription enregistrée ---
+
+class TranscriptStubProcessor(VideoProcessor):
+    """VideoProcessor dont la transcription est relue depuis un fichier JSON (pas de Whisper)."""
+    def __init__(self, *args, transcript_file, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transcript_file = transcript_file
+
+    def run_transcription(self, step_progress_cb=None, scored_chunks=None):
+        with open(self.transcript_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+# --- 3. Mesure des étapes ---
+
+def run_benchmark(video_path, transcript_path, work_dir, extraction=True, extraction_mode="reencode",
+                  profile="Moyen", log=print):
+    """Exécute chaque étape une fois et retourne {étape: mesures} (+ durée du média)."""
+    os.makedirs(work_dir, exist_ok=True)
+    output_file = os.path.join(work_dir, f"{os.path.splitext(os.path.basename(video_path))[0]}_highlight.mp4")
+    processor = TranscriptStubProcessor(
+        video_path, output_file,
+        log_callback=lambda message: None,
+        progress_callback=lambda value: None,
+        profile=profile,
+        use_cache=False,
+        resume=False,
+        extraction_mode=extraction_mode,
+        transcript_file=transcript_path,
+    )
+    report = processor.report
+    no_progress = lambda p: None
+
+    with report.stage('duration'):
+        processor.video_duration = processor.get_video_duration()
+    if not processor.video_duration:
+        raise RuntimeError(f"Durée illisible: {video_path}")
+    with report.stage('generate_chunks'):
+        chunks = processor.generate_chunks(processor.chunk_size)
+    with report.stage('score_segments_parallel'):
+        scored_chunks = processor.score_segments_parallel(chunks, step_progress_cb=no_progress)
+    with report.stage('transcription_stub'):
+        transcript = Transcript.from_whisper(processor.run_transcription())
+    with report.stage('find_intelligent_segments'):
+        intelligent_segments = processor.find_intelligent_segments(transcript, scored_chunks)
+    with report.stage('select_best_segments'):
+        selected = processor.select_best_segments(intelligent_segments, processor.calculate_target_duration())
+    with report.stage('compile_tiktoks'):
+        processor.compile_tiktoks(intelligent_segments)
+    if extraction and selected:
+        with report.stage('extraction'):
+            processor.extract_and_concatenate_segments(selected, step_progress_cb=no_progress)
+    report.close()
+    processor._release_pcm_buffer()
+
+    media = processor.video_duration
+    stages = {}
+    for name, stats in report.stages.items():
+        data = stats.to_dict()
+        data['throughput'] = round(media / stats.wall, 1) if stats.wall > 0 else None # s de média / s réelle
+        stages[name] = data
+    log(f"  {len(chunks)} bouts, {len(scored_chunks)} notés, {len(intelligent_segments)} moments, "
+        f"{len(selected)} sélectionnés")
+    return {'media_seconds': media, 'stages': stages}
+
+
+# --- 4. Référence (baseline) ---
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Retourne (lignes de comparaison, nombre de régressions)."""
+    lines, regressions = [], 0
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            lines.append(f"{key}: pas de référence")
+            continue
+        for stage, data in result['stages'].items():
+            ref = reference['stages'].get(stage)
+            if ref is None:
+                continue
+            wall, ref_wall = data['wall_s'], ref['wall_s']
+            ratio = wall / ref_wall if ref_wall > 0 else float('inf')
+            regressed = ratio > 1 + tolerance and wall - ref_wall > NOISE_FLOOR
+            regressions += regressed
+            lines.append(f"{key} {stage:<26} {ref_wall:8.3f} s -> {wall:8.3f} s  (x{ratio:.2f})"
+                         f"{'  RÉGRESSION' if regressed else ''}")
+    return lines, regressions
+
+
+def format_results(results):
+    lines = []
+    for key, result in results.items():
+        lines.append(f"{key} ({result['media_seconds'] / 60:.0f} min de média)")
+        for stage, data in result['stages'].items():
+            throughput = f"{data['throughput']:>10.1f} x" if data['throughput'] else f"{'-':>12}"
+            lines.append(f"  {stage:<26} {data['wall_s']:8.3f} s {throughput}")
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Banc d'essai des étapes de traitement (vidéos synthétiques).")
+    parser.add_argument('--durations', default="600",
+                        help="Durées des vidéos de test en secondes, séparées par des virgules (défaut: 600).")
+    parser.add_argument('--seed', type=int, default=0, help="Graine du scénario (bursts / silences).")
+    parser.add_argument('--size', default="320x180", help="Résolution des vidéos de test.")
+    parser.add_argument('--fixtures-dir', default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument('--transcript', help="Transcription enregistrée (JSON) à utiliser à la place de la synthétique.")
+    parser.add_argument('--skip-extraction', action='store_true', help="Ne mesure pas l'encodage des clips.")
+    parser.add_argument('--extraction-mode', choices=("reencode", "smartcut", "onepass"), default="reencode")
+    parser.add_argument('--profile', choices=("Court", "Moyen", "Longue"), default="Moyen")
+    parser.add_argument('--output', help="Écrit les résultats complets en JSON.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Enregistre ces résultats comme référence.")
+    parser.add_argument('--compare', action='store_true', help="Compare à la référence (code 1 si régression).")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        print("Erreur critique: FFmpeg et/ou FFprobe n'ont pas été trouvés dans le PATH.", file=sys.stderr)
+        return 2
+
+    results = {}
+    for duration in [float(d) for d in args.durations.split(',') if d.strip()]:
+        video_path, transcript_path = ensure_fixture(args.fixtures_dir, duration, args.seed, args.size)
+        key = f"{int(duration)}s"
+        print(f"Benchmark {key}...", flush=True)
+        t0 = time.perf_counter()
+        results[key] = run_benchmark(
+            video_path, args.transcript or transcript_path,
+            work_dir=os.path.join(args.fixtures_dir, "out"),
+            extraction=not args.skip_extraction,
+            extraction_mode=args.extraction_mode,
+            profile=args.profile,
+        )
+        results[key]['total_wall_s'] = round(time.perf_counter() - t0, 3)
+
+    for line in format_results(results):
+        print(line)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    status = 0
+    if args.compare:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Référence illisible ({args.baseline}): {e}", file=sys.stderr)
+            return 2
+        lines, regressions = compare_to_baseline(results, baseline, args.tolerance)
+        print("\nComparaison à la référence:")
+        for line in lines:
+            print(line)
+        print(f"{regressions} régression(s) (tolérance +{args.tolerance:.0%}).")
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+        print(f"Référence enregistrée: {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
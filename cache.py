@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+import tempfile
+
+DEFAULT_MAX_SIZE = 2 * 1024**3 # 2 Go de cache maximum
+SAMPLE_BYTES = 1024**2        # 1 Mo lu au début, au milieu et à la fin du fichier
+
+
+def default_cache_dir():
+    """Dossier de cache utilisateur (Windows: %LOCALAPPDATA%, sinon ~/.cache)."""
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'auto-video-editor')
+
+
+def file_fingerprint(path, sample_bytes=SAMPLE_BYTES):
+    """
+    Empreinte rapide d'un fichier vidéo (plusieurs Go): taille + date de modification
+    + hash partiel (début, milieu, fin). Ne lit que ~3 Mo quel que soit le fichier.
+    """
+    stat = os.stat(path)
+    h = hashlib.sha1()
+    h.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, 'rb') as f:
+        for offset in (0, max(0, stat.st_size // 2 - sample_bytes // 2), max(0, stat.st_size - sample_bytes)):
+            f.seek(offset)
+            h.update(f.read(sample_bytes))
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Cache disque des analyses longues (Whisper, scoring de volume).
+    Une entrée = un fichier JSON dont le nom est la clé. Les entrées les plus
+    anciennement utilisées sont supprimées quand le cache dépasse 'max_size'.
+    """
+    def __init__(self, cache_dir=None, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = max_size
+
+    @staticmethod
+    def make_key(kind, fingerprint, **params):
+        """Clé = type d'analyse + empreinte du fichier + paramètres qui influencent le résultat."""
+        payload = json.dumps({'kind': kind, 'fingerprint': fingerprint, 'params': params}, sort_keys=True)
+        return f"{kind}_{hashlib.sha1(payload.encode()).hexdigest()}"
+
+    def _path(self, key, suffix=".json"):
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def load(self, key):
+        """Retourne les données en cache, ou None si absentes / illisibles."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path, None) # Marque l'entrée comme récemment utilisée (LRU)
+        except OSError:
+            pass
+        return data
+
+    def save(self, key, data):
+        """Écrit une entrée de façon atomique puis applique l'éviction par taille."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def load_file(self, key, suffix, load):
+        """Comme load(), pour une entrée binaire relue par 'load(chemin)' (ex: Transcript.load)."""
+        path = self._path(key, suffix)
+        try:
+            data = load(path)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def save_file(self, key, suffix, write):
+        """Comme save(), pour une entrée binaire: 'write(f)' l'écrit dans un fichier ouvert en binaire."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, self._path(key, suffix))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Supprime les entrées les plus anciennes tant que le cache dépasse 'max_size'."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,112 @@
+import os
+import json
+import shutil
+import threading
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _normalize(params):
+    """Tuples -> listes, etc.: les paramètres sont comparés tels que relus depuis le JSON."""
+    return json.loads(json.dumps(params))
+
+
+class Checkpoint:
+    """
+    Manifeste de reprise d'un traitement, dans un dossier '<sortie>_work'.
+
+    - Une 'étape' (durée, transcription, scoring, fusion, sélection...) est enregistrée
+      avec les paramètres qui l'ont produite; elle n'est réutilisée que si ces
+      paramètres sont identiques. Son résultat est écrit dans un fichier à part
+      pour que le manifeste reste petit.
+    - Une 'unité' (un clip, un Tiktok) est enregistrée dès qu'elle est terminée,
+      ce qui permet de reprendre au clip 57/60 après un crash.
+    """
+    def __init__(self, work_dir, signature):
+        self.work_dir = work_dir
+        self.signature = signature # Empreinte de la source: un autre fichier invalide tout
+        self.manifest_path = os.path.join(work_dir, "checkpoint.json")
+        self._lock = threading.Lock()
+        self._manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('signature') == self.signature:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'signature': self.signature, 'stages': {}, 'units': {}}
+
+    def _save_manifest(self):
+        os.makedirs(self.work_dir, exist_ok=True)
+        _write_json_atomic(self.manifest_path, self._manifest)
+
+    # --- Étapes ---
+
+    def get(self, stage, params):
+        """Résultat de l'étape si elle a déjà été faite avec ces paramètres, sinon None."""
+        with self._lock:
+            entry = self._manifest['stages'].get(stage)
+        if not entry or entry.get('params') != _normalize(params):
+            return None
+        try:
+            with open(os.path.join(self.work_dir, entry['file']), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, stage, params, value):
+        os.makedirs(self.work_dir, exist_ok=True)
+        filename = f"{stage}.json"
+        _write_json_atomic(os.path.join(self.work_dir, filename), value)
+        self._record_stage(stage, params, filename)
+
+    def get_path(self, stage, params, suffix):
+        """Fichier du résultat écrit par set_file(), si l'étape a déjà été faite avec ces paramètres."""
+        with self._lock:
+            entry = self._manifest['stages'].get(stage)
+        if not entry or entry.get('params') != _normalize(params) or not entry['file'].endswith(suffix):
+            return None
+        path = os.path.join(self.work_dir, entry['file'])
+        return path if os.path.isfile(path) else None
+
+    def set_file(self, stage, params, suffix, write):
+        """Résultat binaire (ex: colonnes NumPy): 'write(f)' l'écrit dans un fichier ouvert en binaire."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        filename = f"{stage}{suffix}"
+        path = os.path.join(self.work_dir, filename)
+        with open(f"{path}.tmp", 'wb') as f:
+            write(f)
+        os.replace(f"{path}.tmp", path)
+        self._record_stage(stage, params, filename)
+
+    def _record_stage(self, stage, params, filename):
+        with self._lock:
+            self._manifest['stages'][stage] = {'params': _normalize(params), 'file': filename}
+            self._save_manifest()
+
+    # --- Unités (clips, Tiktoks) ---
+
+    def unit_done(self, stage, unit_id, params):
+        """Vrai si l'unité a été terminée avec ces paramètres."""
+        with self._lock:
+            entry = self._manifest['units'].get(stage, {}).get(unit_id)
+        return entry is not None and entry == _normalize(params)
+
+    def mark_unit(self, stage, unit_id, params):
+        with self._lock:
+            self._manifest['units'].setdefault(stage, {})[unit_id] = _normalize(params)
+            self._save_manifest()
+
+    def clear(self):
+        """Traitement terminé avec succès: le dossier de reprise est supprimé."""
+        with self._lock:
+            self._manifest = {'signature': self.signature, 'stages': {}, 'units': {}}
+        shutil.rmtree(self.work_dir, ignore_errors=True)
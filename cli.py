@@ -0,0 +1,295 @@
+"""
+Point d'entrée en ligne de commande (sans interface graphique).
+
+    python cli.py stream.mp4 -o stream_highlight.mp4 --profile Court --tiktoks
+    python cli.py --batch /chemin/vers/vods --jobs 2 --output-dir /chemin/sortie
+    python cli.py --batch manifest.json
+    python cli.py --live /chemin/vers/enregistrement_obs --idle-timeout 120
+
+Un manifeste est un fichier JSON (liste de {"input": ..., "output": ..., "profile": ...,
+"tiktoks": ...}) ou un fichier texte avec un chemin de vidéo par ligne.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from processor import VideoProcessor
+from live import LiveHighlighter, DEFAULT_IDLE_TIMEOUT
+from scoring import ScoringEngine, parse_weights
+from supervisor import Cancelled, cancel_all
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi', '.flv', '.webm', '.wmv', '.ts')
+PROFILES = ("Court", "Moyen", "Longue")
+
+_print_lock = threading.Lock()
+
+
+def _print(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+# --- 1. Construction de la liste des 'jobs' ---
+
+def default_output_for(input_file, output_dir=None):
+    """'C:/vid/stream.mp4' -> 'C:/vid/stream_highlight.mp4' (comme le propose l'interface)."""
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(output_dir or os.path.dirname(input_file), f"{base_name}_highlight.mp4")
+
+
+def load_jobs(batch_source, defaults, output_dir=None):
+    """Retourne une liste de dicts {input, output, profile, tiktoks} depuis un dossier ou un manifeste."""
+    if os.path.isdir(batch_source):
+        entries = [
+            {'input': os.path.join(batch_source, name)}
+            for name in sorted(os.listdir(batch_source))
+            if name.lower().endswith(VIDEO_EXTENSIONS) and not name.endswith('_highlight.mp4')
+        ]
+    elif batch_source.lower().endswith('.json'):
+        with open(batch_source, 'r', encoding='utf-8') as f:
+            entries = [e if isinstance(e, dict) else {'input': e} for e in json.load(f)]
+    else:
+        with open(batch_source, 'r', encoding='utf-8') as f:
+            entries = [{'input': line.strip()} for line in f if line.strip() and not line.startswith('#')]
+
+    jobs = []
+    for entry in entries:
+        job = dict(defaults)
+        job.update(entry)
+        job['output'] = job.get('output') or default_output_for(job['input'], output_dir)
+        jobs.append(job)
+    return jobs
+
+
+# --- 2. Exécution d'un job (VideoProcessor inchangé) ---
+
+def status_path_for(output_file):
+    return f"{os.path.splitext(output_file)[0]}_status.json"
+
+
+def write_status(output_file, status):
+    """Écrit le fichier de statut d'un job (atomique: .tmp puis remplacement)."""
+    path = status_path_for(output_file)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run_job(job, processor_options, quiet=False):
+    """Exécute un VideoProcessor pour un job et retourne son statut final."""
+    name = os.path.basename(job['input'])
+    status = {
+        'input': job['input'],
+        'output': job['output'],
+        'profile': job['profile'],
+        'tiktoks': job['tiktoks'],
+        'state': 'running',
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'last_log': None,
+        'progress': 0.0,
+    }
+    write_status(job['output'], status)
+
+    last_reported = [-10]
+    status_lock = threading.Lock() # Les callbacks arrivent de plusieurs threads
+
+    def log(message):
+        status['last_log'] = message
+        if not quiet:
+            for line in message.splitlines() or [""]:
+                _print(f"[{name}] {line}")
+
+    def update_progress(value):
+        status['progress'] = round(value, 1)
+        # Affiche la progression par paliers de 10% (les callbacks sont très fréquents)
+        with status_lock:
+            if value - last_reported[0] < 10 and value < 100:
+                return
+            last_reported[0] = value
+            write_status(job['output'], status)
+        _print(f"[{name}] {value:.0f}%")
+
+    start = time.monotonic()
+    try:
+        if not os.path.exists(job['input']):
+            raise FileNotFoundError(f"Le fichier d'entrée n'existe pas: {job['input']}")
+        if job.get('live'):
+            # Stream en cours d'enregistrement: analyse au fil de l'eau, Highlight à la fin
+            options = dict(processor_options)
+            idle_timeout = options.pop('idle_timeout', DEFAULT_IDLE_TIMEOUT)
+            LiveHighlighter(
+                job['input'], job['output'], log, update_progress,
+                profile=job['profile'], generate_tiktoks=job['tiktoks'],
+                idle_timeout=idle_timeout, **options
+            ).run()
+        else:
+            processor_options = {k: v for k, v in processor_options.items() if k != 'idle_timeout'}
+            processor = VideoProcessor(
+                input_file=job['input'],
+                output_file=job['output'],
+                log_callback=log,
+                progress_callback=update_progress,
+                profile=job['profile'],
+                generate_tiktoks=job['tiktoks'],
+                **processor_options
+            )
+            processor.process()
+        status['state'] = 'done'
+    except Cancelled:
+        status['state'] = 'cancelled'
+        _print(f"[{name}] Arrêté.")
+    except Exception as e:
+        status['state'] = 'failed'
+        status['error'] = str(e)
+        _print(f"[{name}] ÉCHEC: {e}")
+    status['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    status['elapsed_seconds'] = round(time.monotonic() - start, 1)
+    write_status(job['output'], status)
+    return status
+
+
+def run_batch(jobs, processor_options, concurrency=1, quiet=False):
+    """
+    File d'attente de jobs: 'concurrency' vidéos traitées en même temps.
+    Le modèle Whisper est partagé (models.model_pool) et le budget CPU d'encodage
+    est réparti entre les jobs simultanés.
+    """
+    concurrency = max(1, min(concurrency, len(jobs) or 1))
+    cores = os.cpu_count() or 1
+    options = dict(processor_options)
+    if options.get('extract_workers') is None:
+        options['extract_workers'] = max(1, cores // 4 // concurrency)
+    if options.get('encoder_threads') is None:
+        options['encoder_threads'] = max(1, cores // (options['extract_workers'] * concurrency))
+
+    for job in jobs:
+        write_status(job['output'], {'input': job['input'], 'output': job['output'], 'state': 'pending'})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(lambda job: run_job(job, options, quiet), jobs))
+
+
+# --- 3. Ligne de commande ---
+
+def _install_interrupt_handler():
+    """Ctrl+C: arrête les traitements (processus ffmpeg tués, état 'cancelled'); un 2e Ctrl+C quitte."""
+    def handler(signum, frame):
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        _print("Arrêt demandé (Ctrl+C à nouveau pour forcer)...")
+        cancel_all()
+    signal.signal(signal.SIGINT, handler)
+
+
+def weights_arg(text):
+    """Type argparse de --weights: poids lus ET validés (signaux connus, au moins un non nul)."""
+    try:
+        weights = parse_weights(text)
+        ScoringEngine(weights)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return weights
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AutoEditor Video - génération de Highlights en ligne de commande.")
+    parser.add_argument('input', nargs='?', help="Vidéo à traiter (mode simple).")
+    parser.add_argument('-o', '--output', help="Fichier Highlight (défaut: <input>_highlight.mp4).")
+    parser.add_argument('--batch', metavar='DOSSIER_OU_MANIFESTE',
+                        help="Traite toutes les vidéos d'un dossier ou d'un manifeste (.json / .txt).")
+    parser.add_argument('--jobs', type=int, default=1, help="Nombre de vidéos traitées en même temps (batch).")
+    parser.add_argument('--output-dir', help="Dossier de sortie des Highlights (batch).")
+    parser.add_argument('--summary', help="Fichier de résumé du batch (défaut: batch_summary.json).")
+    parser.add_argument('--profile', choices=PROFILES, default="Moyen")
+    parser.add_argument('--tiktoks', action='store_true', help="Génère aussi les clips Tiktok (9:16).")
+    parser.add_argument('--tiktok-count', type=int, default=5, help="Nombre de Tiktoks à compiler.")
+    parser.add_argument('--model', default="base", help="Modèle Whisper (tiny, base, small, ...).")
+    parser.add_argument('--weights', metavar='SIGNAL=POIDS,...', type=weights_arg,
+                        help="Poids des signaux de scoring, ex: 'volume=1,flux=0.5,speech_rate=1' "
+                             f"({', '.join(ScoringEngine.available())}).")
+    parser.add_argument('--sliding', action='store_true',
+                        help="Analyse de volume par fenêtres glissantes (pics) au lieu de 'bouts' fixes de 10 s.")
+    parser.add_argument('--window-hop', type=float, default=1.0,
+                        help="Pas des fenêtres glissantes, en secondes (avec --sliding).")
+    parser.add_argument('--spill-dir',
+                        help="Dossier où la transcription est écrite puis lue en mémoire mappée (très longs streams).")
+    parser.add_argument('--no-cache', action='store_true', help="Désactive le cache des analyses.")
+    parser.add_argument('--cache-dir', help="Dossier du cache des analyses.")
+    parser.add_argument('--transcription-workers', type=int, default=1,
+                        help="Processus Whisper en parallèle (transcription par fenêtres).")
+    parser.add_argument('--gate', choices=("speech", "hype"),
+                        help="Ne transcrire que la parole détectée ou les zones 'hype'.")
+    parser.add_argument('--extraction-mode', choices=("reencode", "smartcut", "onepass"), default="reencode",
+                        help="'onepass': Highlight et clips en un seul décodage / encodage de la source.")
+    parser.add_argument('--extract-workers', type=int, help="Encodages simultanés par vidéo.")
+    parser.add_argument('--encoder-threads', type=int, help="Threads x264 par encodage.")
+    parser.add_argument('--live', action='store_true',
+                        help="Suit un enregistrement en cours (fichier qui grossit ou dossier de segments HLS/TS).")
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="Mode live: fin du stream après N secondes sans nouvelles données.")
+    parser.add_argument('-q', '--quiet', action='store_true', help="N'affiche que la progression.")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if bool(args.input) == bool(args.batch):
+        parser.error("Indiquez soit une vidéo, soit --batch.")
+    if args.live and args.batch:
+        parser.error("--live ne s'utilise qu'avec une seule source.")
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        print("Erreur critique: FFmpeg et/ou FFprobe n'ont pas été trouvés dans le PATH.", file=sys.stderr)
+        return 2
+
+    _install_interrupt_handler()
+    processor_options = {
+        'model_name': args.model,
+        'num_tiktoks': args.tiktok_count,
+        'scoring_weights': args.weights,
+        'window_mode': "sliding" if args.sliding else "fixed",
+        'window_hop': args.window_hop,
+        'spill_dir': args.spill_dir,
+        'use_cache': not args.no_cache,
+        'cache_dir': args.cache_dir,
+        'transcription_workers': args.transcription_workers,
+        'transcription_gate': args.gate,
+        'extraction_mode': args.extraction_mode,
+        'extract_workers': args.extract_workers,
+        'encoder_threads': args.encoder_threads,
+    }
+    defaults = {'profile': args.profile, 'tiktoks': args.tiktoks}
+
+    if args.input:
+        if args.live:
+            processor_options['idle_timeout'] = args.idle_timeout
+        output = args.output or default_output_for(args.input.rstrip('/\\'))
+        job = dict(defaults, input=args.input, output=output, live=args.live)
+        status = run_job(job, processor_options, args.quiet)
+        return 0 if status['state'] == 'done' else 1
+
+    jobs = load_jobs(args.batch, defaults, args.output_dir)
+    if not jobs:
+        print(f"Aucune vidéo trouvée dans '{args.batch}'.", file=sys.stderr)
+        return 1
+    _print(f"Batch: {len(jobs)} vidéo(s), {args.jobs} en parallèle.")
+    results = run_batch(jobs, processor_options, args.jobs, args.quiet)
+
+    summary_path = args.summary or os.path.join(args.output_dir or os.getcwd(), "batch_summary.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    failed = [r for r in results if r['state'] != 'done']
+    _print(f"Batch terminé: {len(results) - len(failed)} réussi(s), {len(failed)} échec(s). Résumé: {summary_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import os
+import threading
+
+
+class ClipStore:
+    """
+    Registre des clips déjà encodés (dérushage), partagé entre le Highlight et les Tiktoks.
+    Clé = (source, début, fin, padding, paramètres d'encodage): un segment encodé une
+    fois est réutilisé tel quel au lieu d'être ré-extrait de la source. Les Tiktoks
+    y sont aussi enregistrés (clé = leurs 'cuts'), pour la re-planification.
+    """
+    def __init__(self):
+        self._clips = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source, start, end, pad, encoding):
+        return (os.path.abspath(source), round(start, 3), round(end, 3), round(pad, 3), encoding)
+
+    def register(self, key, path):
+        with self._lock:
+            self._clips[key] = path
+
+    def lookup(self, key):
+        """Chemin du clip s'il existe encore sur le disque (et n'est pas vide), sinon None."""
+        with self._lock:
+            path = self._clips.get(key)
+        if path and os.path.isfile(path) and os.path.getsize(path) > 0:
+            return path
+        return None
+
+    def forget(self, key):
+        with self._lock:
+            self._clips.pop(key, None)
+
+    def relocate(self, old_dir, new_dir):
+        """Le dossier 'old_dir' a été renommé en 'new_dir': met à jour les chemins enregistrés."""
+        old_dir = os.path.abspath(old_dir)
+        with self._lock:
+            for key, path in self._clips.items():
+                path = os.path.abspath(path)
+                if os.path.dirname(path) == old_dir:
+                    self._clips[key] = os.path.join(new_dir, os.path.basename(path))
+
+    def forget_dir(self, directory):
+        """Oublie tous les clips d'un dossier (ex: supprimé)."""
+        directory = os.path.abspath(directory)
+        with self._lock:
+            for key in [k for k, p in self._clips.items() if os.path.dirname(os.path.abspath(p)) == directory]:
+                del self._clips[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clips)
@@ -0,0 +1,193 @@
+import os
+import time
+import asyncio
+import threading
+import subprocess
+import collections
+
+from supervisor import JobTimeout, kill_tree
+
+STDERR_TAIL_LINES = 200   # Lignes de stderr gardées pour les messages d'erreur
+STREAM_LIMIT = 1 << 20    # Longueur max d'une ligne lue sur les pipes
+
+
+# --- 1. Lecture incrémentale des sorties ffmpeg ---
+
+class ProgressParser:
+    """
+    Lit la sortie '-progress pipe:1' (blocs 'clé=valeur' terminés par 'progress=...')
+    ligne par ligne et rapporte la fraction produite de 'duration' secondes (0-1).
+    """
+    def __init__(self, duration, on_progress):
+        self.duration = duration
+        self.on_progress = on_progress
+        self.out_time = 0.0
+        self.done = False
+
+    def feed(self, line):
+        key, _, value = line.partition('=')
+        if key in ('out_time_us', 'out_time_ms'): # Les deux sont en microsecondes
+            try:
+                self.out_time = max(self.out_time, int(value) / 1e6)
+            except ValueError: # 'N/A' en début d'encodage
+                pass
+        elif key == 'progress':
+            self.done = value.strip() == 'end'
+            if self.on_progress and self.duration:
+                self.on_progress(1.0 if self.done else min(1.0, self.out_time / self.duration))
+
+
+class VolumeDetect:
+    """Valeurs du filtre 'volumedetect' (dB), relevées au fil du stderr."""
+    def __init__(self):
+        self.max_volume = None
+        self.mean_volume = None
+
+    def feed(self, line):
+        for name in ('max_volume', 'mean_volume'):
+            _, found, rest = line.partition(name + ':')
+            if found:
+                try:
+                    setattr(self, name, float(rest.split()[0]))
+                except (IndexError, ValueError):
+                    pass
+
+
+class _ProcessHandle:
+    """Processus asyncio vu comme un Popen par le superviseur (poll / kill / pid)."""
+    def __init__(self, process):
+        self.process = process
+        self.pid = process.pid
+
+    def poll(self):
+        return self.process.returncode
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except (OSError, RuntimeError): # Déjà terminé / transport fermé
+            pass
+
+
+# --- 2. Exécuteur asynchrone ---
+
+class FFmpegRunner:
+    """
+    Exécute les jobs ffmpeg dans une boucle asyncio (thread dédié, démarré au premier job):
+    - la sortie '-progress' est lue en continu et rapportée pendant l'encodage;
+    - le stderr est analysé ligne par ligne ('parsers'), seule la fin est gardée;
+    - un sémaphore borne le nombre de processus en cours, quel que soit le nombre
+      de threads appelants;
+    - délai, relance et arrêt comme ProcessSupervisor.run (processus suivis par le superviseur).
+    run() est synchrone: appelable depuis les threads / pools existants.
+    """
+    def __init__(self, supervisor, max_jobs=None, log=None):
+        self.supervisor = supervisor
+        self.max_jobs = max_jobs or max(2, os.cpu_count() or 1)
+        self.log = log
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_jobs)
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def close(self):
+        """Arrête la boucle (fin du traitement); elle redémarre au prochain job."""
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def run(self, cmd, duration=None, on_progress=None, parsers=(), timeout=None, retries=None,
+            check=True, on_exit=None):
+        """
+        Lance 'cmd' (ffmpeg) et attend sa fin. 'duration': secondes de média produites,
+        pour convertir '-progress' en fraction transmise à 'on_progress' (0-1, depuis le
+        thread de la boucle). 'parsers': objets .feed(ligne) qui lisent le stderr.
+        'on_exit(returncode, durée)': appelé après chaque tentative (instrumentation).
+        Retourne le code retour; lève CalledProcessError (stderr = dernières lignes),
+        JobTimeout ou Cancelled.
+        """
+        self.supervisor.check()
+        if on_progress is not None and os.path.splitext(os.path.basename(cmd[0]))[0] == 'ffmpeg':
+            cmd = [cmd[0], '-progress', 'pipe:1', '-nostats'] + list(cmd[1:])
+        retries = self.supervisor.retries if retries is None else retries
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_job(cmd, duration, on_progress, parsers, timeout, retries, on_exit), self._ensure_loop())
+        try:
+            returncode, tail = future.result()
+        except BaseException:
+            future.cancel()
+            raise
+        self.supervisor.check() # Tué par cancel(): ce n'est pas une erreur ffmpeg
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr="\n".join(tail))
+        return returncode
+
+    async def _run_job(self, cmd, duration, on_progress, parsers, timeout, retries, on_exit):
+        async with self._semaphore:
+            for attempt in range(retries + 1):
+                progress = ProgressParser(duration, on_progress)
+                tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+                t0 = time.perf_counter()
+                returncode = await self._attempt(cmd, progress, parsers, tail, timeout)
+                if on_exit:
+                    on_exit(returncode, time.perf_counter() - t0)
+                if returncode is not None:
+                    return returncode, tail
+                self.supervisor.check()
+                if attempt < retries:
+                    if self.log:
+                        self.log(f"Avertissement: '{os.path.basename(cmd[0])}' bloqué depuis {timeout:.0f}s, "
+                                 f"relance ({attempt + 1}/{retries})...")
+                    continue
+                raise JobTimeout(cmd, timeout)
+
+    async def _attempt(self, cmd, progress, parsers, tail, timeout):
+        """Une exécution de 'cmd'. Retourne le code retour, ou None si le délai est dépassé."""
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True # Pour tuer tout l'arbre (cf. kill_tree)
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            limit=STREAM_LIMIT, **kwargs)
+        handle = _ProcessHandle(process)
+        self.supervisor.adopt(handle)
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                self._read_lines(process.stdout, [progress]),
+                self._read_lines(process.stderr, list(parsers), tail),
+                process.wait(),
+            ), timeout)
+            return process.returncode
+        except asyncio.TimeoutError:
+            kill_tree(handle)
+            await process.wait()
+            return None
+        except BaseException:
+            kill_tree(handle)
+            raise
+        finally:
+            self.supervisor.release(handle)
+
+    @staticmethod
+    async def _read_lines(stream, parsers, tail=None):
+        async for raw in stream:
+            line = raw.decode('utf-8', errors='replace').rstrip()
+            for parser in parsers:
+                parser.feed(line)
+            if tail is not None and line:
+                tail.append(line)
+
@@ -0,0 +1,385 @@
+import os
+import re
+import queue
+import shutil
+import threading
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import audio
+import scoring
+import transcription
+from transcript import Transcript
+from clipstore import ClipStore
+from models import model_pool
+from processor import VideoProcessor
+
+DEFAULT_WINDOW = 120         # Whisper transcrit des fenêtres de 2 min pendant le stream
+DEFAULT_OVERLAP = 10         # Recouvrement entre deux fenêtres (secondes)
+DEFAULT_IDLE_TIMEOUT = 60    # Sans nouvelles données pendant 60 s, le stream est considéré terminé
+POLL_INTERVAL = 1.0          # Scrutation du dossier de segments (secondes)
+FINAL_MARGIN = 30.0          # Un 'moment' est définitif 30 s après la fin de sa transcription
+SEGMENT_EXTENSIONS = ('.ts', '.m2ts')
+
+
+# --- 1. Sources: fichier qui grossit, ou dossier de segments HLS / MPEG-TS ---
+
+def _natural_key(name):
+    """'seg10.ts' après 'seg9.ts'."""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def list_segments(directory):
+    """
+    (segments dans l'ordre, stream terminé?) d'un dossier écrit par OBS.
+    La playlist .m3u8 fait foi si elle existe; sinon les fichiers .ts sont triés par nom.
+    """
+    playlists = [name for name in os.listdir(directory) if name.endswith('.m3u8')]
+    if playlists:
+        try:
+            with open(os.path.join(directory, playlists[0]), 'r', encoding='utf-8') as f:
+                lines = [line.strip() for line in f]
+            names = [os.path.basename(line) for line in lines if line and not line.startswith('#')]
+            return names, '#EXT-X-ENDLIST' in lines
+        except OSError:
+            pass
+    names = sorted((name for name in os.listdir(directory) if name.lower().endswith(SEGMENT_EXTENSIONS)),
+                   key=_natural_key)
+    return names, False
+
+
+class SegmentCollector(threading.Thread):
+    """
+    Ajoute, dans l'ordre, les segments terminés d'un dossier HLS / MPEG-TS à un seul
+    fichier .ts (les segments MPEG-TS se concatènent tels quels). Ce fichier est
+    ensuite suivi comme un enregistrement qui grossit.
+    """
+    def __init__(self, directory, recording_path, idle_timeout, stop_event):
+        super().__init__(daemon=True)
+        self.directory = directory
+        self.recording_path = recording_path
+        self.idle_timeout = idle_timeout
+        self.stop_event = stop_event
+        self.appended = 0
+        self.error = None
+
+    def run(self):
+        try:
+            self._collect()
+        except Exception as e:
+            self.error = e
+
+    def _collect(self):
+        done = set()
+        last_change = time.monotonic()
+        seen = 0
+        with open(self.recording_path, 'ab') as out:
+            while True:
+                names, ended = list_segments(self.directory)
+                if len(names) != seen:
+                    seen = len(names)
+                    last_change = time.monotonic()
+                finished = ended or self.stop_event.is_set() or time.monotonic() - last_change > self.idle_timeout
+                # Le dernier segment est peut-être encore en cours d'écriture
+                ready = names if finished else names[:-1]
+                for name in ready:
+                    if name in done:
+                        continue
+                    with open(os.path.join(self.directory, name), 'rb') as segment:
+                        shutil.copyfileobj(segment, out)
+                    out.flush()
+                    done.add(name)
+                    self.appended += 1
+                if finished:
+                    return
+                self.stop_event.wait(POLL_INTERVAL)
+
+
+def follow_args(idle_timeout):
+    """Options d'entrée ffmpeg pour lire un fichier encore en cours d'écriture."""
+    return ['-follow', '1', '-rw_timeout', str(int(idle_timeout * 1e6))]
+
+
+# --- 2. Analyse incrémentale ---
+
+class LiveHighlighter:
+    """
+    Mode 'live': suit un enregistrement en cours (fichier .ts/.mkv/.flv qui grossit,
+    ou dossier de segments HLS / MPEG-TS écrit par OBS) et analyse le stream au fil de l'eau:
+    - le volume de chaque nouveau 'bout' est noté dès qu'il est décodé;
+    - Whisper transcrit chaque nouvelle fenêtre (~2 min, coupée dans un silence);
+    - le classement des 'moments' intelligents est recalculé après chaque fenêtre, et
+      les moments définitifs qui seraient sélectionnés sont encodés tout de suite.
+    À la fin du stream, l'analyse est transmise au VideoProcessor (points de reprise):
+    il ne reste que la sélection, la recopie des clips déjà encodés et la concaténation.
+
+    Note: un .mp4 n'est lisible qu'une fois terminé (index en fin de fichier).
+    """
+    def __init__(self, source, output_file, log_callback, progress_callback=None, profile="Moyen",
+                 generate_tiktoks=False, model_name="base", window=DEFAULT_WINDOW, overlap=DEFAULT_OVERLAP,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, emit_clips=True, language=None, **processor_options):
+        self.source = source
+        self.output_file = output_file
+        self.log = log_callback
+        self.model_name = model_name
+        self.window = window
+        self.overlap = overlap
+        self.idle_timeout = idle_timeout
+        self.emit_clips = emit_clips
+        self.language = language
+
+        if os.path.isdir(source):
+            self.recording_path = f"{os.path.splitext(output_file)[0]}_live.ts"
+        else:
+            self.recording_path = source
+        self.clip_store = processor_options.pop('clip_store', None) or ClipStore()
+        processor_options.pop('resume', None) # L'analyse live est transmise via les points de reprise
+        self.processor = VideoProcessor(
+            self.recording_path, output_file, log_callback, progress_callback or (lambda value: None),
+            profile=profile, generate_tiktoks=generate_tiktoks, model_name=model_name,
+            clip_store=self.clip_store, resume=True, **processor_options
+        )
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._peaks, self._sumsqs, self._counts = [], [], []
+        # Flux spectral, calculé au fil du décodage si le scoring le pondère
+        self._fluxes = [] if self.processor.scoring.needs_spectral else None
+        self._previous_spectrum = None
+        self.decoded = 0.0            # Secondes d'audio décodées
+        self.transcribed_until = 0.0  # Horizon de la transcription
+        self.parts = []               # Transcript de chaque fenêtre (timeline du stream, dans l'ordre)
+        self.ranking = []             # Moments intelligents courants, triés par score
+        self.emitted = {}             # (start, end) -> clip déjà encodé (partagé avec l'encodage: self._lock)
+        self._emitter = None
+        self._extract = None
+
+    def stop(self):
+        """Demande la fin du suivi (ex: fin du stream connue): le traitement final est lancé."""
+        self._stop.set()
+
+    def frame_levels(self):
+        with self._lock:
+            fluxes = None if self._fluxes is None else list(self._fluxes)
+            return audio.concat_levels(list(self._peaks), list(self._sumsqs), list(self._counts), fluxes=fluxes)
+
+    def run(self):
+        """Suit le stream jusqu'à sa fin, puis produit le Highlight. Bloquant (à lancer dans un thread)."""
+        if transcription.whisper is None or audio.np is None:
+            raise ImportError("Le mode live requiert 'openai-whisper' et 'numpy'.")
+
+        collector = None
+        if os.path.isdir(self.source):
+            os.makedirs(os.path.dirname(os.path.abspath(self.recording_path)), exist_ok=True)
+            open(self.recording_path, 'wb').close() # Nouveau stream: on repart d'un fichier vide
+            collector = SegmentCollector(self.source, self.recording_path, self.idle_timeout, self._stop)
+            collector.start()
+            self.log(f"Live: suivi des segments de '{self.source}' -> '{self.recording_path}'")
+        else:
+            self.log(f"Live: suivi de '{self.recording_path}' (fin après {self.idle_timeout}s sans données)")
+
+        if self.emit_clips:
+            os.makedirs(self.get_live_clips_dir(), exist_ok=True)
+            self._emitter = ThreadPoolExecutor(max_workers=1)
+        windows = queue.Queue()
+        errors = []
+        transcriber = threading.Thread(target=self._transcribe_loop, args=(windows, errors), daemon=True)
+        transcriber.start()
+
+        try:
+            self._decode_loop(windows)
+        finally:
+            self._stop.set()
+            windows.put(None)
+            transcriber.join()
+            if collector is not None:
+                collector.join()
+            if self._emitter is not None:
+                self._emitter.shutdown(wait=True)
+        if errors:
+            raise errors[0]
+        if collector is not None and collector.error:
+            raise collector.error
+        self._finish()
+
+    def _decode_loop(self, windows):
+        """Décode l'audio au fil de l'eau, note les niveaux et envoie les fenêtres à Whisper."""
+        sr = audio.SAMPLE_RATE
+        frame_samples = int(round(audio.FRAME_DURATION * sr))
+        block_samples = frame_samples * int(round(self.processor.chunk_size / audio.FRAME_DURATION))
+        pending, pending_start = [], 0.0 # Audio pas encore transcrit (+ recouvrement)
+        own_start = 0.0
+
+        try:
+            for block in audio.iter_pcm_blocks(self.recording_path, block_samples, sr,
+                                               popen=self.processor._popen,
+                                               input_args=follow_args(self.idle_timeout)):
+                peak, sumsq, count = audio.block_levels(block, frame_samples)
+                if self._fluxes is not None:
+                    flux, self._previous_spectrum = audio.block_flux(block, frame_samples, self._previous_spectrum)
+                with self._lock:
+                    self._peaks.append(peak)
+                    self._sumsqs.append(sumsq)
+                    self._counts.append(count)
+                    if self._fluxes is not None:
+                        self._fluxes.append(flux)
+                    self.decoded += len(block) / sr
+                pending.append(block)
+
+                nominal = own_start + self.window
+                if self.decoded >= nominal + transcription.SILENCE_SEARCH + self.overlap / 2:
+                    lo = max(own_start + self.overlap, nominal - transcription.SILENCE_SEARCH)
+                    cut = transcription._quietest_time(self.frame_levels(), lo, nominal + transcription.SILENCE_SEARCH)
+                    samples = audio.np.concatenate(pending)
+                    start = max(0.0, own_start - self.overlap / 2)
+                    end = cut + self.overlap / 2
+                    i0 = int((start - pending_start) * sr)
+                    i1 = int((end - pending_start) * sr)
+                    windows.put((start, end, own_start, cut, samples[i0:i1].copy()))
+                    # On garde l'audio à partir du début de la prochaine fenêtre
+                    keep_from = cut - self.overlap / 2
+                    pending = [samples[int((keep_from - pending_start) * sr):]]
+                    pending_start = keep_from
+                    own_start = cut
+                if self._stop.is_set():
+                    break
+        except subprocess.CalledProcessError as e:
+            self.processor.supervisor.check() # ffmpeg tué par un arrêt du traitement
+            # '-rw_timeout' termine ffmpeg en erreur quand plus rien n'arrive: fin normale du stream
+            if self.decoded == 0:
+                raise Exception(f"Impossible de lire le stream: {e.stderr}")
+
+        if pending:
+            samples = audio.np.concatenate(pending)
+            start = max(0.0, own_start - self.overlap / 2)
+            i0 = int((start - pending_start) * sr)
+            windows.put((start, self.decoded, own_start, float('inf'), samples[i0:].copy()))
+        self.log(f"Live: fin du stream ({self.decoded / 60:.1f} min décodées).")
+
+    def _transcribe_loop(self, windows, errors):
+        """Thread Whisper: transcrit les fenêtres dans l'ordre et met le classement à jour."""
+        while True:
+            item = windows.get()
+            if item is None:
+                return
+            if errors:
+                continue # Une erreur a déjà eu lieu: on vide la file
+            start, end, own_start, own_end, samples = item
+            try:
+                if len(samples):
+                    with model_pool.use(self.model_name) as model:
+                        result = model.transcribe(samples, verbose=None, word_timestamps=True,
+                                                  language=self.language)
+                    # La langue détectée sur la première fenêtre est imposée aux suivantes
+                    self.language = self.language or result.get('language')
+                    owned = Transcript.from_whisper({'language': self.language, 'segments': [
+                        seg for seg in (transcription._offset_segment(s, start) for s in result['segments'])
+                        if own_start <= (seg['start'] + seg['end']) / 2 < own_end
+                    ]})
+                else:
+                    owned = None
+                with self._lock:
+                    if owned is not None:
+                        self.parts.append(owned)
+                    self.transcribed_until = min(end, self.decoded)
+                self.log(f"Live: transcription jusqu'à {self.transcribed_until / 60:.1f} min "
+                         f"(retard {self.decoded - self.transcribed_until:.0f}s).")
+                self._update_ranking()
+            except Exception as e:
+                self.log(f"Erreur (live, Whisper): {e}")
+                errors.append(e)
+
+    def _scored_chunks(self, levels, complete_only, transcript, scene_times=None):
+        """
+        Notes de tous les 'bouts' décodés (uniquement les complets pendant le stream), avec
+        les mêmes signaux que l'analyse complète: débit de parole d'après la transcription
+        déjà faite, changements de plan seulement en fin de stream ('scene_times').
+        L'état du VideoProcessor n'est pas modifié: le thread d'encodage l'utilise en même temps.
+        """
+        processor = self.processor
+        sliding = processor.window_mode == "sliding" # Même découpage que l'analyse complète
+        if sliding:
+            chunks = processor.generate_windows(processor.chunk_size, processor.window_hop, levels.duration)
+        else:
+            chunks = processor.generate_chunks(processor.chunk_size, levels.duration)
+        if complete_only:
+            chunks = [(s, e) for s, e in chunks if e - s >= processor.chunk_size]
+        scored_chunks = processor.score_from_levels(chunks, scene_times, peaks=sliding, levels=levels)
+        if processor.scoring.needs_words:
+            scored_chunks = processor.scoring.add_speech(scored_chunks, transcript)
+        return scored_chunks
+
+    def _transcript(self):
+        with self._lock:
+            parts = list(self.parts)
+        return Transcript.concat(parts, self.language)
+
+    def _update_ranking(self):
+        """Recalcule le classement des moments et encode ceux qui sont définitifs et sélectionnés."""
+        transcript = self._transcript()
+        if not len(transcript):
+            return
+        levels = self.frame_levels()
+        scored_chunks = self._scored_chunks(levels, complete_only=True, transcript=transcript)
+        self.ranking = self.processor.find_intelligent_segments(transcript, scored_chunks)
+        target_duration = self.processor.calculate_target_duration(levels.duration)
+        selected = self.processor.select_best_segments(self.ranking, target_duration)
+        if self.ranking:
+            best = self.ranking[0]
+            self.log(f"Live: {len(self.ranking)} moments, {len(selected)} sélectionnés "
+                     f"(meilleur: {int(best[0] // 60)}m{int(best[0] % 60):02d}s, score {best[3]:.1f}).")
+
+        # Définitif = la transcription a largement dépassé sa fin (phrases complètes connues)
+        horizon = self.transcribed_until - FINAL_MARGIN
+        if self._emitter is not None:
+            for seg in selected:
+                key = (seg[0], seg[1])
+                with self._lock:
+                    if seg[1] > horizon or key in self.emitted:
+                        continue
+                    self.emitted[key] = None
+                self._emitter.submit(self._emit_clip, seg)
+
+    def _emit_clip(self, segment_info, pad=0.3):
+        """Encode un moment définitif tout de suite; il sera recopié dans le dérushage final."""
+        if self._extract is None: # Seul ce thread (un seul worker) touche au mode d'extraction
+            self._extract = self.processor.get_extractor()
+        start = segment_info[0]
+        time_str = f"{int(start // 60)}m{int(start % 60):02d}s"
+        clip_path = os.path.join(self.get_live_clips_dir(), f"live_{time_str}_{start:.1f}.mp4")
+        _, threads = self.processor.get_extraction_budget()
+        mode = self._extract(segment_info, clip_path, pad, threads)
+        if mode:
+            with self._lock:
+                self.emitted[(segment_info[0], segment_info[1])] = clip_path
+            self.clip_store.register(self.processor._clip_key(segment_info, pad, mode), clip_path)
+            self.log(f"Live: clip prêt ({time_str}) -> {clip_path}")
+
+    def _finish(self):
+        """Fin du stream: analyse complète transmise au VideoProcessor, puis sélection + concaténation."""
+        levels = self.frame_levels()
+        transcript = self._transcript()
+        scene_times = None
+        if self.processor.scoring.needs_scene:
+            # L'enregistrement est complet: la passe vidéo des changements de plan est possible
+            self.log("Live: détection des changements de plan (passe vidéo)...")
+            try:
+                scene_times = scoring.scene_change_times(self.processor.input_file, run=self.processor._run)
+            except subprocess.CalledProcessError as e:
+                self.processor.supervisor.check()
+                self.log(f"Avertissement: détection des changements de plan impossible ({e.stderr})")
+        scored_chunks = self._scored_chunks(levels, complete_only=False, transcript=transcript,
+                                            scene_times=scene_times)
+        # Threads de transcription / d'encodage terminés: le VideoProcessor reprend la main
+        self.processor.frame_levels = levels
+        duration = self.processor.get_video_duration() or levels.duration
+        self.processor.seed_analysis(duration, transcript, scored_chunks)
+        ready = sum(1 for path in self.emitted.values() if path)
+        self.log(f"Live: analyse transmise ({ready} clip(s) déjà encodés). Assemblage du Highlight...")
+        self.processor.process()
+
+    def get_live_clips_dir(self):
+        """Helper: 'C:/vid/highlight.mp4' -> 'C:/vid/highlight_live_clips'"""
+        return os.path.join(self.processor.get_base_output_dir(),
+                            f"{self.processor.get_output_name_no_ext()}_live_clips")
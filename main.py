@@ -6,9 +6,12 @@ import shutil # Pour vérifier FFmpeg
 
 # Importer notre logique métier depuis l'autre fichier
 from processor import VideoProcessor
+from models import model_pool
+from supervisor import Cancelled
+from uibridge import UIBridge, MAX_LOG_LINES
 
 class CutGUI:
-    def __init__(self, root):
+    def __init__(self, root, preload_model="base"):
         self.root = root
         self.root.title("AutoEditor Video - Pro Highlight Generator")
         
@@ -17,6 +20,13 @@ class CutGUI:
         self.output_file = tk.StringVar(value="highlight.mp4") # Fichier de sortie
         self.profile_var = tk.StringVar(value="Moyen") # Profil
         self.tiktok_var = tk.BooleanVar(value=True) # Checkbox Tiktok
+        self.tiktok_count_var = tk.IntVar(value=5) # Nombre de Tiktoks
+        self.full_log_var = tk.BooleanVar(value=False) # Journal complet sur disque
+        
+        # Dernier traitement réussi: son analyse permet de re-planifier sans tout relancer
+        self.processor = None
+        self.analysis = None
+        self.running_processor = None # Traitement en cours (bouton 'Arrêter')
         
         # --- Configuration de l'interface ---
         
@@ -46,10 +56,17 @@ class CutGUI:
         profile_combo.grid(row=2, column=1, sticky="ew", padx=5, pady=5)
         
         # Ligne 4: Options (Tiktok)
-        tiktok_check = ttk.Checkbutton(main_frame, 
+        tiktok_frame = ttk.Frame(main_frame)
+        tiktok_frame.grid(row=3, column=1, sticky="w", padx=5, pady=5)
+        tiktok_check = ttk.Checkbutton(tiktok_frame, 
                                        text="Générer aussi les clips Tiktok (9:16)", 
                                        variable=self.tiktok_var)
-        tiktok_check.grid(row=3, column=1, sticky="w", padx=5, pady=5)
+        tiktok_check.grid(row=0, column=0, sticky="w")
+        ttk.Label(tiktok_frame, text="Nombre:").grid(row=0, column=1, sticky="e", padx=(15, 5))
+        ttk.Spinbox(tiktok_frame, from_=1, to=20, width=4, textvariable=self.tiktok_count_var,
+                    state="readonly").grid(row=0, column=2, sticky="w")
+        ttk.Checkbutton(tiktok_frame, text="Enregistrer le journal complet (<sortie>_log.txt)",
+                        variable=self.full_log_var).grid(row=1, column=0, columnspan=3, sticky="w")
         
         # Ligne 5: Barre de progression
         progress_frame = ttk.Frame(main_frame)
@@ -75,9 +92,43 @@ class CutGUI:
         self.log_text.grid(row=0, column=0, sticky="nsew")
         scrollbar.grid(row=0, column=1, sticky="ns")
         
-        # Ligne 7: Bouton Démarrer
-        self.start_button = ttk.Button(main_frame, text="Démarrer", command=self.start_process)
-        self.start_button.grid(row=6, column=1, pady=10)
+        # Ligne 7: Boutons Démarrer / Re-planifier
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=6, column=1, pady=10)
+        self.start_button = ttk.Button(button_frame, text="Démarrer", command=self.start_process)
+        self.start_button.grid(row=0, column=0, padx=5)
+        # Re-planifier: nouveau profil / nombre de Tiktoks, sans relancer Whisper ni l'analyse
+        self.replan_button = ttk.Button(button_frame, text="Re-planifier", command=self.start_replan,
+                                        state="disabled")
+        self.replan_button.grid(row=0, column=1, padx=5)
+        # Arrêter: tue les processus ffmpeg en cours, le traitement s'arrête à l'étape suivante
+        self.stop_button = ttk.Button(button_frame, text="Arrêter", command=self.stop_process, state="disabled")
+        self.stop_button.grid(row=0, column=2, padx=5)
+        
+        # Fermer la fenêtre arrête aussi le traitement (plus d'ffmpeg orphelin)
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Logs et progression des threads de traitement: regroupés et affichés
+        # ~15 fois par seconde au lieu d'un événement Tk par message
+        self.bridge = UIBridge(root, self._insert_log, self._set_progress)
+        self.bridge.start()
+        
+        # Précharger le modèle Whisper en arrière-plan pour que le premier
+        # clic sur "Démarrer" ne bloque pas sur le chargement
+        if preload_model:
+            self.preload_model(preload_model)
+    
+    def preload_model(self, model_name):
+        """Charge le modèle Whisper dans un thread, sans bloquer l'interface."""
+        self.log(f"Préchargement du modèle Whisper '{model_name}' en arrière-plan...")
+        
+        def on_done(error):
+            if error is None:
+                self.log(f"Modèle Whisper '{model_name}' prêt.")
+            else:
+                self.log(f"Avertissement: préchargement du modèle impossible ({error})")
+        
+        model_pool.preload(model_name, on_done=on_done)
     
     def browse_input(self):
         filename = filedialog.askopenfilename(title="Sélectionnez le fichier vidéo",
@@ -98,25 +149,32 @@ class CutGUI:
             self.output_file.set(filename)
 
     def log(self, message):
-        """Callback pour afficher les logs dans le Text widget."""
-        self.root.after(0, self._insert_log, message)
+        """Callback pour afficher les logs dans le Text widget (depuis n'importe quel thread)."""
+        self.bridge.log(message)
         
-    def _insert_log(self, message):
-        """Méthode interne pour l'insertion de log (appelée par self.log)."""
+    def _insert_log(self, lines):
+        """
+        Méthode interne: insère un lot de lignes (appelée par le pont, dans le thread de Tk).
+        La zone ne garde que les MAX_LOG_LINES dernières lignes.
+        """
         self.log_text.config(state="normal")
-        self.log_text.insert(tk.END, message + "\n")
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - MAX_LOG_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
         self.log_text.see(tk.END)
         self.log_text.config(state="disabled")
     
     def _clear_log(self):
         """Méthode interne pour vider la zone de log."""
+        self.bridge.flush()
         self.log_text.config(state="normal")
         self.log_text.delete("1.0", tk.END)
         self.log_text.config(state="disabled")
     
     def update_progress(self, value):
-        """Callback pour mettre à jour la barre de progression."""
-        self.root.after(0, self._set_progress, value)
+        """Callback pour mettre à jour la barre de progression (seule la dernière valeur est affichée)."""
+        self.bridge.update_progress(value)
         
     def _set_progress(self, value):
         """Méthode interne pour la progression (appelée par update_progress)."""
@@ -141,10 +199,11 @@ class CutGUI:
             messagebox.showerror("Erreur", "Le fichier d'entrée n'existe pas.")
             return
             
-        self.start_button.config(state="disabled")
+        self._set_running(True)
         self.progress['value'] = 0
         self.progress_label.config(text="0.0%")
         self._clear_log()
+        self._open_full_log(out_file)
         
         # Créer l'instance du processeur
         processor = VideoProcessor(
@@ -153,25 +212,107 @@ class CutGUI:
             log_callback=self.log,
             progress_callback=self.update_progress,
             profile=profile,
-            generate_tiktoks=generate_tiktoks
+            generate_tiktoks=generate_tiktoks,
+            num_tiktoks=self.tiktok_count_var.get()
         )
+        self.processor = None
+        self.analysis = None
         
         # Démarrer le processus dans un thread
+        self.running_processor = processor
         threading.Thread(target=self.run_process_thread, args=(processor,), daemon=True).start()
+    
+    def start_replan(self):
+        """
+        Recalcule la sélection (profil, Tiktoks) à partir de la dernière analyse:
+        instantané, et seuls les clips qui ont changé sont encodés.
+        """
+        processor = self.processor
+        if processor is None or self.analysis is None:
+            return
+        if (self.input_file.get() != processor.input_file or self.output_file.get() != processor.output_file):
+            messagebox.showerror("Erreur", "Les fichiers ont changé depuis l'analyse: cliquez sur 'Démarrer'.")
+            return
+        
+        processor.profile = self.profile_var.get()
+        processor.generate_tiktoks = self.tiktok_var.get()
+        processor.num_tiktoks = self.tiktok_count_var.get()
+        self._set_running(True)
+        self._open_full_log(processor.output_file, append=True)
+        self.log("\n" + ("=" * 30))
+        self.running_processor = processor
+        threading.Thread(target=self.run_process_thread, args=(processor, True), daemon=True).start()
         
-    def run_process_thread(self, processor):
+    def run_process_thread(self, processor, replan=False):
         """
         Wrapper pour le thread qui exécute le processeur.
-        Gère les erreurs et réactive le bouton à la fin.
+        Gère les erreurs et réactive les boutons à la fin.
         """
         try:
-            processor.process()
+            if replan:
+                processor.replan(self.analysis)
+            else:
+                analysis = processor.process()
+                self.processor, self.analysis = processor, analysis
+        except Cancelled:
+            pass # Arrêt demandé par l'utilisateur: déjà indiqué dans les logs
         except Exception as e:
             # Afficher l'erreur dans l'UI
             self.root.after(0, lambda e=e: messagebox.showerror("Erreur de traitement", f"Une erreur est survenue:\n{e}"))
         finally:
-            # Réactiver le bouton, quoi qu'il arrive
-            self.root.after(0, lambda: self.start_button.config(state="normal"))
+            self.running_processor = None
+            # Réactiver les boutons, quoi qu'il arrive
+            self.root.after(0, self._finish_run)
+    
+    def _open_full_log(self, out_file, append=False):
+        """Option 'journal complet': tous les logs vont aussi dans <sortie>_log.txt."""
+        if self.full_log_var.get():
+            self.bridge.open_log_file(os.path.splitext(out_file)[0] + "_log.txt", append=append)
+    
+    def _finish_run(self):
+        """Fin d'un traitement (thread de Tk): ferme le journal et réactive les boutons."""
+        self.bridge.close_log_file()
+        self._set_running(False)
+        if model_pool.busy():
+            # Traitement arrêté pendant Whisper (non interruptible): un nouveau 'Démarrer'
+            # attendrait sans rien afficher que la transcription orpheline se termine
+            self.start_button.config(state="disabled")
+            self.log("Whisper termine la transcription arrêtée: 'Démarrer' sera réactivé à sa fin.")
+            self._wait_for_whisper()
+
+    def _wait_for_whisper(self):
+        """Réactive 'Démarrer' quand plus aucune transcription n'utilise le modèle."""
+        if self.running_processor is not None:
+            return # Re-planification lancée entre-temps: son _finish_run reprend l'attente
+        if model_pool.busy():
+            self.root.after(500, self._wait_for_whisper)
+            return
+        self.start_button.config(state="normal")
+        self.log("Transcription arrêtée terminée: 'Démarrer' est réactivé.")
+    
+    def stop_process(self):
+        """Arrête le traitement en cours: les processus ffmpeg sont tués immédiatement."""
+        processor = self.running_processor
+        if processor is not None:
+            processor.cancel()
+            self.stop_button.config(state="disabled")
+    
+    def on_close(self):
+        """Fermeture de la fenêtre: arrête le traitement en cours avant de quitter."""
+        if self.running_processor is not None:
+            self.running_processor.cancel()
+        self.bridge.stop()
+        self.root.destroy()
+    
+    def is_running(self):
+        return self.running_processor is not None
+    
+    def _set_running(self, running):
+        """Méthode interne: (dés)active les boutons pendant un traitement."""
+        self.start_button.config(state="disabled" if running else "normal")
+        self.stop_button.config(state="normal" if running else "disabled")
+        can_replan = not running and self.analysis is not None
+        self.replan_button.config(state="normal" if can_replan else "disabled")
 
 def setup_dark_theme(root):
     """Configure un thème sombre complet pour l'application."""
@@ -280,3 +421,7 @@ if __name__ == "__main__":
             
         app = CutGUI(root)
         root.mainloop()
+        if app.is_running():
+            # Fenêtre fermée pendant un traitement: les processus enfants sont déjà tués, mais
+            # une transcription Whisper en cours (non interruptible) retiendrait le processus
+            os._exit(0)
@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+
+# DÉPENDANCE OPTIONNELLE: psutil donne la mémoire et les E/S sur toutes les plateformes.
+# Sans lui: /proc (Linux) puis 'resource' (POSIX), sinon ces mesures valent None.
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+SAMPLE_INTERVAL = 0.5 # Échantillonnage de la mémoire (secondes)
+
+
+# --- 1. Mesures système (best effort, selon la plateforme) ---
+
+def _current_rss():
+    """Mémoire résidente actuelle du processus (octets), ou None."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        return _maxrss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return None
+
+
+def _maxrss_bytes(value):
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return value if sys.platform == 'darwin' else value * 1024
+
+
+def _self_io():
+    """(octets lus, octets écrits) par ce processus (fichiers + pipes), ou (None, None)."""
+    if psutil is not None:
+        try:
+            io = psutil.Process().io_counters()
+            return io.read_chars if hasattr(io, 'read_chars') else io.read_bytes, \
+                io.write_chars if hasattr(io, 'write_chars') else io.write_bytes
+        except (AttributeError, psutil.Error):
+            pass
+    try:
+        values = {}
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                values[key.strip()] = int(value)
+        return values.get('rchar'), values.get('wchar')
+    except (OSError, ValueError):
+        return None, None
+
+
+def _children_usage():
+    """(CPU s, octets lus, octets écrits, pic RSS) cumulés des processus enfants terminés."""
+    if resource is None:
+        return None, None, None, None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (usage.ru_utime + usage.ru_stime, usage.ru_inblock * 512, usage.ru_oublock * 512,
+            _maxrss_bytes(usage.ru_maxrss))
+
+
+def _delta(after, before):
+    if after is None or before is None:
+        return None
+    return after - before
+
+
+def _tool_name(cmd):
+    return os.path.splitext(os.path.basename(str(cmd[0])))[0] if cmd else '?'
+
+
+def _output_path(cmd):
+    """Dernier argument d'une commande ffmpeg = fichier de sortie (sauf '-' / pipe)."""
+    if not cmd or _tool_name(cmd) != 'ffmpeg':
+        return None
+    last = str(cmd[-1])
+    return None if last in ('-', 'pipe:', 'pipe:1') else last
+
+
+# --- 2. Rapport d'exécution ---
+
+class StageStats:
+    """Mesures d'une étape du pipeline."""
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu_self = None
+        self.cpu_children = None
+        self.peak_rss = None
+        self.subprocesses = {}     # outil -> nombre d'appels
+        self.subprocess_wall = 0.0
+        self.bytes_read = None
+        self.bytes_written = None
+        self.output_bytes = 0      # Taille des fichiers écrits par ffmpeg
+
+    def to_dict(self):
+        return {
+            'wall_s': round(self.wall, 3),
+            'cpu_self_s': None if self.cpu_self is None else round(self.cpu_self, 3),
+            'cpu_children_s': None if self.cpu_children is None else round(self.cpu_children, 3),
+            'peak_rss_mb': None if self.peak_rss is None else round(self.peak_rss / 1024**2, 1),
+            'subprocesses': dict(self.subprocesses),
+            'subprocess_wall_s': round(self.subprocess_wall, 3),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'output_bytes': self.output_bytes,
+        }
+
+
+class RunReport:
+    """
+    Instrumentation d'un traitement: temps (réel / CPU), pic mémoire, appels
+    ffmpeg/ffprobe et octets lus/écrits, par étape. Exporté en JSON.
+
+    Les étapes peuvent se chevaucher (ex: Whisper et volume en parallèle): le CPU
+    et les E/S sont ceux du processus entier pendant l'étape. Un sous-processus est
+    attribué à l'étape ouverte dans son thread, sinon à la dernière étape ouverte.
+    """
+    def __init__(self, label=None):
+        self.label = label
+        self.stages = {}
+        self._active = []            # Étapes en cours (ordre d'ouverture)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._children0 = _children_usage()
+        self._io0 = _self_io()
+        self.subprocess_log = []     # Détail de chaque appel (outil, durée, code retour)
+        self._sampler = None
+        self._stop = threading.Event()
+
+    # --- Étapes ---
+
+    @contextmanager
+    def stage(self, name):
+        stats = StageStats(name)
+        with self._lock:
+            self.stages[name] = stats
+            self._active.append(stats)
+        previous = getattr(self._local, 'stage', None)
+        self._local.stage = stats
+        self._ensure_sampler()
+
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        children0, io0 = _children_usage(), _self_io()
+        rss = _current_rss()
+        stats.peak_rss = rss
+        try:
+            yield stats
+        finally:
+            children1, io1 = _children_usage(), _self_io()
+            stats.wall = time.perf_counter() - t0
+            stats.cpu_self = time.process_time() - cpu0
+            stats.cpu_children = _delta(children1[0], children0[0])
+            read_self, written_self = _delta(io1[0], io0[0]), _delta(io1[1], io0[1])
+            read_children, written_children = _delta(children1[1], children0[1]), _delta(children1[2], children0[2])
+            stats.bytes_read = _sum_known(read_self, read_children)
+            stats.bytes_written = _sum_known(written_self, written_children)
+            self._update_peak(stats, _current_rss())
+            self._local.stage = previous
+            with self._lock:
+                if stats in self._active:
+                    self._active.remove(stats)
+
+    def current_stage(self):
+        """Étape à laquelle attribuer un sous-processus lancé depuis ce thread."""
+        return self._current_stage()
+
+    def _current_stage(self):
+        stats = getattr(self._local, 'stage', None)
+        if stats is not None:
+            return stats
+        with self._lock:
+            return self._active[-1] if self._active else None
+
+    @staticmethod
+    def _update_peak(stats, rss):
+        if rss is not None and (stats.peak_rss is None or rss > stats.peak_rss):
+            stats.peak_rss = rss
+
+    def _ensure_sampler(self):
+        """Thread d'échantillonnage mémoire: le pic par étape, même pour les étapes parallèles."""
+        with self._lock:
+            if self._sampler is not None:
+                return
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            rss = _current_rss()
+            with self._lock:
+                for stats in self._active:
+                    self._update_peak(stats, rss)
+
+    # --- Sous-processus ---
+
+    def record_subprocess(self, cmd, wall, returncode, stage=None):
+        stage = stage or self._current_stage()
+        tool = _tool_name(cmd)
+        output = _output_path(cmd)
+        size = 0
+        if output and returncode == 0:
+            try:
+                size = os.path.getsize(output)
+            except OSError:
+                pass
+        with self._lock:
+            self.subprocess_log.append({
+                'tool': tool, 'stage': stage.name if stage else None,
+                'wall_s': round(wall, 3), 'returncode': returncode,
+            })
+            if stage is not None:
+                stage.subprocesses[tool] = stage.subprocesses.get(tool, 0) + 1
+                stage.subprocess_wall += wall
+                stage.output_bytes += size
+
+    def run(self, cmd, runner=subprocess.run, **kwargs):
+        """Remplaçant instrumenté de subprocess.run ('runner': ex. supervisor.ProcessSupervisor.run)."""
+        stage = self._current_stage()
+        t0 = time.perf_counter()
+        returncode = None
+        try:
+            result = runner(cmd, **kwargs)
+            returncode = result.returncode
+            return result
+        except subprocess.CalledProcessError as e:
+            returncode = e.returncode
+            raise
+        finally:
+            self.record_subprocess(cmd, time.perf_counter() - t0, returncode, stage)
+
+    def popen(self, cmd, **kwargs):
+        """Remplaçant instrumenté de subprocess.Popen (mesure à la fin du processus)."""
+        return _TrackedPopen(self, self._current_stage(), cmd, **kwargs)
+
+    # --- Export ---
+
+    def close(self):
+        """Arrête l'échantillonnage mémoire (fin du traitement)."""
+        self._stop.set()
+
+    def to_dict(self):
+        children = _children_usage()
+        io = _self_io()
+        total = {
+            'wall_s': round(time.perf_counter() - self._t0, 3),
+            'cpu_self_s': round(time.process_time() - self._cpu0, 3),
+            'cpu_children_s': _round(_delta(children[0], self._children0[0])),
+            'peak_rss_mb': _round(_mb(_maxrss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+                                  if resource is not None else _mb(_current_rss())),
+            'peak_child_rss_mb': _round(_mb(children[3])),
+            'bytes_read': _sum_known(_delta(io[0], self._io0[0]), _delta(children[1], self._children0[1])),
+            'bytes_written': _sum_known(_delta(io[1], self._io0[1]), _delta(children[2], self._children0[2])),
+        }
+        calls = {}
+        for entry in self.subprocess_log:
+            calls[entry['tool']] = calls.get(entry['tool'], 0) + 1
+        total['subprocesses'] = calls
+        return {
+            'label': self.label,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._started)),
+            'python': sys.version.split()[0],
+            'platform': sys.platform,
+            'cpu_count': os.cpu_count(),
+            'total': total,
+            'stages': {name: stats.to_dict() for name, stats in self.stages.items()},
+            'subprocess_calls': self.subprocess_log,
+        }
+
+    def write(self, path):
+        data = self.to_dict()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return data
+
+    def summary_lines(self):
+        """Résumé lisible (une ligne par étape) pour les logs de fin de traitement."""
+        lines = []
+        for name, stats in self.stages.items():
+            calls = sum(stats.subprocesses.values())
+            cpu = (stats.cpu_self or 0) + (stats.cpu_children or 0)
+            rss = f", pic {stats.peak_rss / 1024**2:.0f} Mo" if stats.peak_rss else ""
+            lines.append(f"  {name:<14} {stats.wall:8.1f} s (CPU {cpu:.1f} s, {calls} appel(s) ffmpeg{rss})")
+        return lines
+
+
+class _TrackedPopen(subprocess.Popen):
+    """Popen qui s'enregistre dans le rapport quand le processus se termine."""
+    def __init__(self, report, stage, cmd, **kwargs):
+        self._report = report
+        self._stage = stage
+        self._t0 = time.perf_counter()
+        self._recorded = False
+        super().__init__(cmd, **kwargs)
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        if not self._recorded:
+            self._recorded = True
+            self._report.record_subprocess(self.args, time.perf_counter() - self._t0, returncode, self._stage)
+        return returncode
+
+
+def _sum_known(a, b):
+    if a is None and b is None:
+        return None
+    return (a or 0) + (b or 0)
+
+
+def _mb(value):
+    return None if value is None else value / 1024**2
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
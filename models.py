@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import whisper
+except ImportError:
+    whisper = None
+
+DEFAULT_MAX_LOADED = 2 # Nombre de tailles de modèles gardées en mémoire en même temps
+
+
+class WhisperModelPool:
+    """
+    Registre des modèles Whisper, partagé par tout le processus.
+    Un modèle n'est chargé depuis le disque qu'une seule fois puis reste en mémoire;
+    au-delà de 'max_loaded' tailles différentes, le moins récemment utilisé est libéré.
+    """
+    def __init__(self, max_loaded=DEFAULT_MAX_LOADED):
+        self.max_loaded = max(1, max_loaded)
+        self._models = OrderedDict() # name -> modèle (ordre = LRU)
+        self._load_locks = {}        # name -> Lock (un seul chargement à la fois par modèle)
+        self._use_locks = {}         # name -> Lock (une seule transcription à la fois par modèle)
+        self._lock = threading.Lock()
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._models
+
+    def _locks_for(self, name):
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+            use_lock = self._use_locks.setdefault(name, threading.Lock())
+        return load_lock, use_lock
+
+    def get(self, name):
+        """Retourne le modèle 'name', en le chargeant si nécessaire."""
+        if whisper is None:
+            raise ImportError("Le module 'openai-whisper' est requis pour l'analyse intelligente.")
+
+        load_lock, _ = self._locks_for(name)
+        with load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name]
+
+            model = whisper.load_model(name)
+
+            with self._lock:
+                self._models[name] = model
+                self._models.move_to_end(name)
+                while len(self._models) > self.max_loaded:
+                    self._models.popitem(last=False)
+            return model
+
+    def busy(self, name=None):
+        """Vrai si une transcription utilise le modèle 'name' (None: n'importe lequel)."""
+        with self._lock:
+            if name is None:
+                locks = list(self._use_locks.values())
+            else:
+                locks = [self._use_locks[name]] if name in self._use_locks else []
+        return any(lock.locked() for lock in locks)
+
+    @contextmanager
+    def use(self, name, on_wait=None):
+        """
+        Prête le modèle pour une transcription. Whisper installe des 'hooks'
+        sur le modèle pendant le décodage: deux transcriptions simultanées sur
+        la même instance se marcheraient dessus, on les sérialise donc.
+        'on_wait()' est appelé si le modèle est occupé (l'appelant va attendre).
+        """
+        model = self.get(name)
+        _, use_lock = self._locks_for(name)
+        if not use_lock.acquire(blocking=False):
+            if on_wait:
+                on_wait()
+            use_lock.acquire()
+        try:
+            yield model
+        finally:
+            use_lock.release()
+
+    def preload(self, name, on_done=None):
+        """
+        Charge le modèle en arrière-plan (thread daemon).
+        'on_done(error)' est appelé à la fin, avec None si tout s'est bien passé.
+        """
+        def _worker():
+            error = None
+            try:
+                self.get(name)
+            except Exception as e:
+                error = e
+            if on_done:
+                on_done(error)
+
+        thread = threading.Thread(target=_worker, daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        """Libère tous les modèles chargés."""
+        with self._lock:
+            self._models.clear()
+
+
+# Instance unique partagée par tous les VideoProcessor du processus
+model_pool = WhisperModelPool()
@@ -0,0 +1,123 @@
+import os
+import re
+import math
+
+FPS = 60                  # Comme le dérushage clip par clip (-r 60 -vsync cfr)
+SAMPLE_RATE = 48000
+HALF_FRAME = 0.5 / FPS    # Les coupures visent le milieu entre deux images (pas d'arrondi ambigu)
+CLIP_PATTERN = "clip_%03d.mp4"
+CLIP_NAME = re.compile(r"clip_(\d+)\.mp4$")
+# Format des clips de ce rendu (le dérushage clip par clip du mode 'onepass' applique les mêmes
+# filtres): ils ne sont recollés par copie qu'avec des clips au même format audio / vidéo
+VIDEO_FILTER = f"fps={FPS},setsar=1"
+AUDIO_FILTER = f"aresample={SAMPLE_RATE},aformat=channel_layouts=stereo"
+
+
+def frame_ranges(ranges, origin=0.0):
+    """
+    Arrondit chaque [start, end] (secondes) à la grille des images, relativement à 'origin'.
+    Retourne des (première image, image de fin exclue): chaque clip a un nombre entier
+    d'images, donc les coupures du Highlight tombent exactement entre deux clips.
+    """
+    frames = []
+    for start, end in ranges:
+        first = max(0, int(round((start - origin) * FPS)))
+        last = max(first + 1, int(round((end - origin) * FPS)))
+        frames.append((first, last))
+    return frames
+
+
+def clip_boundaries(frames):
+    """Instants (s) des débuts de clips 2..N sur la timeline du Highlight."""
+    boundaries = []
+    elapsed = 0
+    for first, last in frames[:-1]:
+        elapsed += last - first
+        boundaries.append(elapsed / FPS)
+    return boundaries
+
+
+def build_filter_graph(frames):
+    """
+    Un seul graphe: la vidéo (60 fps) et l'audio sont dupliqués (split/asplit), chaque
+    branche garde son intervalle (trim/atrim), puis tout est concaténé. Les intervalles
+    étant chronologiques, chaque image n'est mise en attente que le temps de son clip.
+    """
+    n = len(frames)
+    filters = [
+        f"[0:v]{VIDEO_FILTER},split={n}" + "".join(f"[sv{i}]" for i in range(n)),
+        f"[0:a]{AUDIO_FILTER},asplit={n}"
+        + "".join(f"[sa{i}]" for i in range(n)),
+    ]
+    concat_inputs = ""
+    for i, (first, last) in enumerate(frames):
+        filters.append(f"[sv{i}]trim=start_frame={first}:end_frame={last},setpts=PTS-STARTPTS[v{i}]")
+        filters.append(f"[sa{i}]atrim=start={first / FPS:.6f}:end={last / FPS:.6f},asetpts=PTS-STARTPTS[a{i}]")
+        concat_inputs += f"[v{i}][a{i}]"
+    filters.append(f"{concat_inputs}concat=n={n}:v=1:a=1[v][a]")
+    return ";".join(filters)
+
+
+def produced_clips(clips_dir):
+    """Clips écrits par le muxer 'segment', dans l'ordre numérique (clip_1000 après clip_999)."""
+    numbered = []
+    for name in os.listdir(clips_dir):
+        match = CLIP_NAME.match(name)
+        if match:
+            numbered.append((int(match.group(1)), name))
+    return [name for _, name in sorted(numbered)]
+
+
+def _tee_escape(path):
+    """Chemin utilisable dans une sortie 'tee' ('\\', '|', '[' et ']' y sont spéciaux)."""
+    if os.name == 'nt':
+        path = path.replace('\\', '/')
+    for char in '\\|[]':
+        path = path.replace(char, '\\' + char)
+    return path
+
+
+def build_command(input_file, ranges, output_file, clips_dir, graph_path, crf=18, threads=None):
+    """
+    Commande ffmpeg du rendu en une passe: une lecture séquentielle de la source (à partir
+    du premier clip), un seul encodage, et deux sorties via 'tee':
+    - le Highlight complet ('output_file');
+    - les clips du dérushage ('clips_dir/clip_001.mp4', ...) via le muxer 'segment',
+      coupé sur des keyframes forcés aux frontières des clips.
+    'ranges': [(start, end)] chronologiques (padding compris).
+    Le graphe (~170 caractères par clip) est écrit dans 'graph_path' et passé par
+    -filter_complex_script: en ligne, il dépasserait la limite de longueur d'une ligne
+    de commande Windows (32767 caractères) dès ~200 clips.
+    Retourne (cmd, durée du Highlight en secondes).
+    """
+    origin = int(ranges[0][0] * FPS) / FPS # Recherche rapide jusqu'au premier clip
+    end = ranges[-1][1]
+    frames = frame_ranges(ranges, origin)
+    boundaries = clip_boundaries(frames)
+    # Un demi-frame avant chaque frontière: la première image du clip suivant est ciblée sans ambiguïté
+    cuts = ",".join(f"{t - HALF_FRAME:.6f}" for t in boundaries)
+    with open(graph_path, "w", encoding='utf-8') as f:
+        f.write(build_filter_graph(frames))
+
+    cmd = ['ffmpeg', '-y', '-ss', f"{origin:.6f}", '-t', f"{end - origin + 1.0:.6f}", '-i', input_file,
+           '-filter_complex_script', graph_path,
+           '-map', '[v]', '-map', '[a]',
+           '-c:v', 'libx264', '-preset', 'superfast', '-crf', str(crf)]
+    if threads:
+        cmd += ['-threads', str(threads)]
+    if cuts:
+        cmd += ['-force_key_frames', cuts]
+    segment_options = "f=segment:segment_format=mp4:reset_timestamps=1:segment_start_number=1" \
+                      ":segment_format_options=movflags=+faststart"
+    duration = sum(last - first for first, last in frames) / FPS
+    # Sans 'segment_times', le muxer couperait toutes les 2 s: un seul clip = un seul segment
+    segment_options += f":segment_times={cuts}" if cuts else f":segment_time={math.ceil(duration) + 1}"
+    cmd += [
+        '-c:a', 'aac', '-b:a', '192k',
+        '-flags', '+global_header', # Requis par 'tee' (en-têtes partagés par les deux sorties)
+        '-loglevel', 'error',
+        '-f', 'tee',
+        f"[f=mp4:movflags=+faststart]{_tee_escape(output_file)}"
+        f"|[{segment_options}]{_tee_escape(os.path.join(clips_dir.replace('%', '%%'), CLIP_PATTERN))}",
+    ]
+    return cmd, duration
@@ -1,9 +1,43 @@
 import subprocess
-import re
 import threading
 import os
 import math
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_EXCEPTION
+
+import audio
+from cache import AnalysisCache, file_fingerprint
+from models import model_pool
+from transcription import transcribe_parallel
+import vad
+from timeline import SpeechIndex
+from transcript import Transcript, FILE_SUFFIX as TRANSCRIPT_SUFFIX
+import selection
+import scoring
+from scoring import ScoringEngine
+import smartcut
+import onepass
+from clipstore import ClipStore
+from checkpoint import Checkpoint
+from analysis import AnalysisResult
+from metrics import RunReport
+from supervisor import ProcessSupervisor, Cancelled
+from ffjobs import FFmpegRunner, VolumeDetect
+
+PROBE_TIMEOUT = 60          # ffprobe: 1 min max
+JOB_TIMEOUT_MIN = 300       # Un encodage (clip, Tiktok, concat) a au moins 5 min...
+JOB_TIMEOUT_FACTOR = 20     # ...et 20 s par seconde de vidéo produite
+
+# Mode réel d'un clip (clé ClipStore) -> clips interchangeables dans un même Highlight:
+# les clips 'smart cut' gardent les paramètres de la source, les autres sont en 60 fps x264
+# (audio de la source, ou 48 kHz stéréo pour le mode 'onepass', cf. onepass.AUDIO_FILTER)
+CLIP_MODES = {
+    'reencode': ('reencode',),
+    'onepass': ('onepass',),
+    'smartcut': ('smartcut', 'copy', 'reencode-source'),
+}
+ALL_CLIP_MODES = CLIP_MODES['reencode'] + CLIP_MODES['onepass'] + CLIP_MODES['smartcut']
 
 # DÉPENDANCE NON-OPTIONNELLE:
 # Whisper est maintenant requis pour l'analyse intelligente.
@@ -12,12 +46,45 @@ try:
 except ImportError:
     whisper = None
 
+class StageProgress:
+    """
+    Agrège la progression de plusieurs tâches qui tournent en même temps
+    dans une seule plage [start, end] de la barre de progression.
+    Chaque tâche a son propre compteur (0-100) et un poids.
+    """
+    def __init__(self, update_progress, start, end, weights):
+        self.update_progress = update_progress
+        self.start = start
+        self.end = end
+        self.weights = dict(weights)
+        self.parts = {name: 0.0 for name in self.weights}
+        self._lock = threading.Lock()
+
+    def callback(self, name):
+        """Retourne un 'step_progress_cb' dédié à la tâche 'name'."""
+        return lambda p: self.report(name, p)
+
+    def report(self, name, percent):
+        with self._lock:
+            self.parts[name] = max(self.parts[name], min(100.0, percent))
+            total_weight = sum(self.weights.values())
+            done = sum(self.weights[n] * self.parts[n] for n in self.parts) / total_weight
+            value = self.start + (self.end - self.start) * done / 100
+        self.update_progress(value)
+
+
 class VideoProcessor:
     """
     Cette classe gère toute la logique de traitement vidéo, indépendamment de l'interface.
     Elle utilise des callbacks pour rapporter la progression et les logs.
     """
-    def __init__(self, input_file, output_file, log_callback, progress_callback, profile="Moyen", generate_tiktoks=False):
+    def __init__(self, input_file, output_file, log_callback, progress_callback, profile="Moyen", generate_tiktoks=False,
+                 num_tiktoks=5, model_name="base", use_cache=True, cache_dir=None,
+                 transcription_workers=1, transcription_window=600,
+                 transcription_gate=None, gate_margin=vad.DEFAULT_MARGIN,
+                 extract_workers=None, encoder_threads=None, extraction_mode="reencode",
+                 clip_store=None, resume=True, scoring_weights=None,
+                 window_mode="fixed", window_hop=1.0, spill_dir=None):
         self.input_file = input_file
         self.output_file = output_file # Fichier de sortie (ex: highlights.mp4)
         
@@ -28,100 +95,276 @@ class VideoProcessor:
         # Options
         self.profile = profile
         self.generate_tiktoks = generate_tiktoks
+        self.num_tiktoks = num_tiktoks
+        self.model_name = model_name # Modèle Whisper ("tiny", "base", "small", ...)
+        # > 1: transcription par fenêtres de 'transcription_window' s sur N processus (CPU)
+        self.transcription_workers = transcription_workers
+        self.transcription_window = transcription_window
+        # Filtre avant Whisper: None (tout transcrire), "speech" (VAD énergie)
+        # ou "hype" (uniquement autour des 'bouts' les plus intenses), +/- 'gate_margin' s
+        self.transcription_gate = transcription_gate
+        self.gate_margin = gate_margin
+        # Dérushage: nombre d'encodages simultanés et threads x264 par encodage
+        # (None = automatique, pour que encodages x threads ~= nombre de cœurs)
+        self.extract_workers = extract_workers
+        self.encoder_threads = encoder_threads
+        # "reencode" (tout ré-encoder en 60 fps), "smartcut" (copie + tête ré-encodée)
+        # ou "onepass" (Highlight + clips en un seul décodage / encodage de la source)
+        self.extraction_mode = extraction_mode
+        self.clip_mode = "reencode" # Mode réellement utilisé (smart cut impossible: ré-encodage)
+        # Signaux du scoring et leurs poids (None = formule de volume historique)
+        self.scoring = ScoringEngine(scoring_weights)
+        # Clips déjà encodés, réutilisés par les Tiktoks (peut être partagé entre instances)
+        self.clip_store = clip_store if clip_store is not None else ClipStore()
+        
+        # Cache disque des analyses (Whisper + volume), clé = empreinte du fichier
+        self.cache = AnalysisCache(cache_dir) if use_cache else None
+        self.input_fingerprint = None
+        
+        # Reprise après crash: manifeste des étapes / clips terminés ('<sortie>_work')
+        self.resume = resume
+        self.checkpoint = None
         
         self.video_duration = 0.0
         self.chunk_size = 10 # Analyse par "bouts" de 10s
+        # "fixed" ('bouts' consécutifs) ou "sliding" (fenêtres de 'chunk_size' s tous les
+        # 'window_hop' s, puis on garde les pics): un cri à 9.8 s n'est plus coupé en deux
+        self.window_mode = window_mode
+        self.window_hop = window_hop
+        self.frame_levels = None # Niveaux audio fins (100 ms), remplis par l'analyse de volume
+        # Si défini: les colonnes de la transcription y sont écrites et relues en mémoire mappée
+        self.spill_dir = spill_dir
+        self._spill_path = None # Dossier de ce traitement dans 'spill_dir', supprimé à la fin
+        # Audio décodé une seule fois (fichier PCM mappé), partagé par Whisper / volume / VAD
+        self.pcm_buffer = None
+        self._pcm_lock = threading.Lock()
+        self._decode_progress_cb = None # Le décodage partagé avance la part 'volume' de la barre
+        self.analysis = None # Dernière analyse (AnalysisResult), réutilisée par replan()
+        
+        # Instrumentation (temps, CPU, mémoire, appels ffmpeg) -> '<sortie>_report.json'
+        self.report = RunReport(label=os.path.basename(input_file))
+        # Tous les processus enfants: délais, relances, arrêt (cf. cancel())
+        self.supervisor = ProcessSupervisor(log=log_callback)
+        # Encodages ffmpeg: progression '-progress' en direct, processus simultanés bornés
+        self.ffmpeg = FFmpegRunner(self.supervisor, log=log_callback)
 
     def process(self):
         """
         Orchestre l'ensemble du processus de découpage vidéo.
         C'est la fonction principale à appeler dans un thread.
+        Retourne l'analyse (AnalysisResult), réutilisable par replan().
         """
+        self.report = RunReport(label=os.path.basename(self.input_file))
+        self.supervisor.reset()
         try:
             self.log("Démarrage du processus...")
             self.update_progress(0)
             
-            if whisper is None:
-                raise ImportError("Le module 'openai-whisper' est requis pour l'analyse intelligente."
-                                  "Veuillez l'installer avec : pip install openai-whisper")
-
-            # Étape 1: Obtenir la durée
-            self.log("Analyse de la vidéo...")
-            self.video_duration = self.get_video_duration()
-            if self.video_duration == 0:
-                raise Exception("Impossible d'obtenir la durée de la vidéo.")
-            self.log(f"Durée totale du stream : {self.video_duration:.2f} s")
-            self.update_progress(5)
-
-            # ÉTAPE 2: Double Analyse (Cœur de la logique)
-            # 2a. Analyse Sémantique (Whisper) - (5% -> 45%)
-            self.log("Étape 2a: Analyse sémantique (via Whisper)...")
-            self.log("(Ceci est long et identifie toutes les phrases)")
-            whisper_result = self.run_transcription()
-            self.log("Analyse sémantique terminée.")
-            self.update_progress(45)
-
-            # 2b. Analyse de Volume (Scoring) - (45% -> 70%)
-            self.log("Étape 2b: Analyse de volume (Recherche de 'hype')...")
-            chunks = self.generate_chunks(self.chunk_size)
-            scored_chunks = self.score_segments_parallel(
-                chunks,
-                step_progress_cb=lambda p: self.update_progress(45 + p * 0.25) # 25% de la barre
-            )
-            self.log(f"{len(scored_chunks)} 'bouts' intenses (volume) trouvés.")
-            self.update_progress(70)
-
-            # ÉTAPE 3: Le "Cerveau" - Fusion des analyses
-            self.log("Étape 3: Fusion (Cerveau) - Trouve les 'moments' intelligents...")
-            intelligent_segments = self.find_intelligent_segments(whisper_result, scored_chunks)
-            if not intelligent_segments:
-                raise Exception("Aucun 'moment' intelligent (parole + hype) n'a été trouvé.")
-            self.log(f"{len(intelligent_segments)} 'moments' intelligents identifiés.")
+            analysis = self.analyze()
+            self.render(analysis)
+            
+            # Tout est terminé: plus besoin du manifeste de reprise
+            if self.checkpoint is not None:
+                self.checkpoint.clear()
+            self.update_progress(100)
+            return analysis
+
+        except Cancelled:
+            self.log("Traitement arrêté.")
+            raise
+        except Exception as e:
+            self.log(f"ERREUR FATALE: {e}")
+            raise e
+        finally:
+            self.ffmpeg.close()
+            self._release_spill()
+            self._write_report()
+
+    def replan(self, analysis=None):
+        """
+        Re-sélection à partir d'une analyse déjà faite (profil ou nombre de Tiktoks modifiés):
+        ni Whisper ni analyse de volume, et seuls les clips / Tiktoks qui ont changé sont encodés.
+        """
+        analysis = analysis or self.analysis
+        if analysis is None:
+            raise Exception("Aucune analyse disponible: lancez d'abord le traitement complet.")
+        if os.path.abspath(analysis.input_file) != os.path.abspath(self.input_file):
+            raise Exception("L'analyse ne correspond pas au fichier d'entrée: relancez le traitement complet.")
+
+        self.report = RunReport(label=os.path.basename(self.input_file))
+        self.supervisor.reset()
+        try:
+            self.log("Re-planification (analyse réutilisée)...")
             self.update_progress(75)
+            self.analysis = analysis
+            self.video_duration = analysis.video_duration
+            self.render(analysis, reuse_previous=True)
+            if self.checkpoint is not None:
+                self.checkpoint.clear()
+            self.update_progress(100)
+        except Cancelled:
+            self.log("Re-planification arrêtée.")
+            raise
+        except Exception as e:
+            self.log(f"ERREUR FATALE: {e}")
+            raise e
+        finally:
+            self.ffmpeg.close()
+            self._write_report()
 
-            # ÉTAPE 4: Dérushage + Création du Highlight (75% -> 90%)
-            target_duration = self.calculate_target_duration()
-            self.log(f"Profil: '{self.profile}'. Durée cible: {target_duration/60:.1f} min")
-            
-            selected_segments = self.select_best_segments(intelligent_segments, target_duration)
-            self.log(f"Sélection de {len(selected_segments)} moments pour le Highlight.")
+    def analyze(self):
+        """Étapes 1 à 3 (0% -> 75%): durée, transcription + volume, fusion. Retourne un AnalysisResult."""
+        if whisper is None:
+            raise ImportError("Le module 'openai-whisper' est requis pour l'analyse intelligente."
+                              "Veuillez l'installer avec : pip install openai-whisper")
+
+        # Étape 1: Empreinte (cache + reprise) et durée
+        self.log("Analyse de la vidéo...")
+        with self.report.stage('duration'):
+            self._open_checkpoint()
+            self.video_duration = self._run_stage('duration', {}, self.get_video_duration)
+        if self.video_duration == 0:
+            raise Exception("Impossible d'obtenir la durée de la vidéo.")
+        self.log(f"Durée totale du stream : {self.video_duration:.2f} s")
+        self.update_progress(5)
 
-            self.extract_and_concatenate_segments(
-                selected_segments,
-                step_progress_cb=lambda p: self.update_progress(75 + p * 0.15) # 15% de la barre
-            )
+        # ÉTAPE 2: Double Analyse EN PARALLÈLE (Cœur de la logique) - (5% -> 70%)
+        # 2a. Analyse Sémantique (Whisper) et 2b. Analyse de Volume (Scoring)
+        # tournent en même temps: le temps total est max(whisper, volume).
+        progress = StageProgress(self.update_progress, 5, 70, {'whisper': 40, 'volume': 25})
+        # Le décodage audio partagé fait partie de l'analyse de volume, même s'il est
+        # lancé par le thread de Whisper (premier arrivé): il rapporte toujours à 'volume'
+        self._decode_progress_cb = progress.callback('volume')
+        speech_params = self._speech_params()
+        volume_params = self._volume_params()
+        analyze_speech = lambda scored=None: self._timed('transcription', lambda: self._run_stage(
+            'transcription', speech_params,
+            lambda: self._analyze_speech(progress.callback('whisper'), scored),
+            load=Transcript.load
+        ))
+        analyze_volume = lambda: self._timed('volume', lambda: self._run_stage(
+            'volume', volume_params,
+            lambda: self._analyze_volume(progress.callback('volume'))
+        ))
+        try:
+            if self.transcription_gate:
+                # Le filtre VAD a besoin de l'analyse de volume: elle passe donc avant Whisper
+                scored_chunks = analyze_volume()
+                transcript = analyze_speech([tuple(c) for c in scored_chunks])
+            else:
+                executor = ThreadPoolExecutor(max_workers=2)
+                speech_future = executor.submit(analyze_speech)
+                try:
+                    transcript, scored_chunks = self._wait_all([speech_future, executor.submit(analyze_volume)])
+                finally:
+                    # Succès: tout est déjà fini. Arrêt ou échec (ex: décodage): on n'attend pas
+                    # Whisper (non interruptible), qui se termine en arrière-plan
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    if not speech_future.done():
+                        self.log("INFO: Whisper ne peut pas être interrompu: la transcription en cours "
+                                 "se termine en arrière-plan (le modèle reste occupé jusque-là).")
+        finally:
+            # Whisper et le volume ont lu tout ce dont ils avaient besoin: le mappage est libéré
+            self._decode_progress_cb = None
+            self._release_pcm_buffer()
+        transcript = self._load_transcript(transcript)
+        scored_chunks = [tuple(c) for c in scored_chunks]
+        if self.scoring.needs_words:
+            # Signaux issus de la transcription (débit de parole): ajoutés une fois Whisper terminé
+            scored_chunks = self.scoring.add_speech(scored_chunks, transcript)
+        self.update_progress(70)
+
+        # ÉTAPE 3: Le "Cerveau" - Fusion des analyses
+        self.log("Étape 3: Fusion (Cerveau) - Trouve les 'moments' intelligents...")
+        analysis_params = dict(speech_params, **volume_params)
+        intelligent_segments = [tuple(s) for s in self._timed('fusion', lambda: self._run_stage(
+            'fusion', analysis_params,
+            lambda: self.find_intelligent_segments(transcript, scored_chunks)
+        ))]
+        if not intelligent_segments:
+            raise Exception("Aucun 'moment' intelligent (parole + hype) n'a été trouvé.")
+        self.log(f"{len(intelligent_segments)} 'moments' intelligents identifiés.")
+        self.update_progress(75)
+
+        self.analysis = AnalysisResult(self.input_file, self.video_duration, transcript,
+                                       scored_chunks, intelligent_segments, analysis_params)
+        return self.analysis
+
+    def plan(self, analysis):
+        """
+        Sélection du Highlight et compilation des Tiktoks (fonctions pures de l'analyse).
+        Retourne (segments du Highlight, listes de segments des Tiktoks).
+        """
+        intelligent_segments = analysis.intelligent_segments
+        target_duration = self.calculate_target_duration()
+        self.log(f"Profil: '{self.profile}'. Durée cible: {target_duration/60:.1f} min")
+        
+        selected_segments = [tuple(s) for s in self._timed('selection', lambda: self._run_stage(
+            'selection', dict(analysis.params, profile=self.profile),
+            lambda: self.select_best_segments(intelligent_segments, target_duration)
+        ))]
+        if not selected_segments:
+            raise Exception("Aucun 'moment' n'a pu être sélectionné pour le Highlight.")
+        self.log(f"Sélection de {len(selected_segments)} moments pour le Highlight.")
+
+        tiktok_lists = []
+        if self.generate_tiktoks:
+            # NOUVELLE LOGIQUE: On compile des 'best-of' Tiktoks
+            tiktok_lists = [[tuple(s) for s in tiktok] for tiktok in self._timed('tiktok_plan', lambda: self._run_stage(
+                'tiktok_plan', dict(analysis.params, count=self.num_tiktoks),
+                lambda: self.compile_tiktoks(intelligent_segments, num_tiktoks_to_create=self.num_tiktoks)
+            ))]
+        return selected_segments, tiktok_lists
+
+    def render(self, analysis, reuse_previous=False):
+        """
+        Étapes 4 à 6 (75% -> 100%): sélection, dérushage + Highlight, Tiktoks, résumé.
+        'reuse_previous': les clips / Tiktoks du rendu précédent sont mis de côté et
+        repris s'ils font encore partie du plan; les autres sont supprimés.
+        """
+        selected_segments, tiktok_lists = self.plan(analysis)
+
+        # ÉTAPE 4: Dérushage + Création du Highlight (75% -> 90%)
+        stashed = []
+        if reuse_previous:
+            stashed = [self._stash_dir(self.get_clips_dir()), self._stash_dir(self.get_tiktoks_dir())]
+        try:
+            with self.report.stage('extraction'):
+                self.extract_and_concatenate_segments(
+                    selected_segments,
+                    step_progress_cb=lambda p: self.update_progress(75 + p * 0.15) # 15% de la barre
+                )
             
             # ÉTAPE 5: Création des Tiktoks (Optionnel) (90% -> 100%)
-            tiktok_moments_found = 0
             if self.generate_tiktoks:
                 self.log("Étape 5: Compilation des Tiktoks (9:16)...")
-                
-                # NOUVELLE LOGIQUE: On compile des 'best-of' Tiktoks
-                tiktok_lists = self.compile_tiktoks(intelligent_segments)
-                tiktok_moments_found = len(tiktok_lists)
-                
-                if tiktok_moments_found > 0:
-                    self.create_tiktok_clips(
-                        tiktok_lists, # On passe la liste de listes
-                        step_progress_cb=lambda p: self.update_progress(90 + p * 0.10) # 10% de la barre
-                    )
+                if tiktok_lists:
+                    with self.report.stage('tiktoks'):
+                        self.create_tiktok_clips(
+                            tiktok_lists, # On passe la liste de listes
+                            step_progress_cb=lambda p: self.update_progress(90 + p * 0.10) # 10% de la barre
+                        )
                 else:
                     self.log("Aucun 'moment' (45-75s) trouvé pour les Tiktoks.")
-            
-            # ÉTAPE 6: Résumé final
-            self.log("\n" + ("-" * 30))
-            self.log("PROCESSUS TERMINÉ AVEC SUCCÈS")
-            self.log(f"  > Vidéo Highlight : {self.output_file}")
-            self.log(f"  > Clips de Dérushage : '{self.get_clips_dir()}' ({len(selected_segments)} clips)")
-            if self.generate_tiktoks:
-                self.log(f"  > Clips Tiktok : '{self.get_tiktoks_dir()}' ({tiktok_moments_found} clips)")
-            self.log(("-") * 30)
-            
-            self.update_progress(100)
-
-        except Exception as e:
-            self.log(f"ERREUR FATALE: {e}")
-            raise e
+        finally:
+            for stash in stashed:
+                if stash:
+                    self.clip_store.forget_dir(stash)
+                    shutil.rmtree(stash, ignore_errors=True)
+        
+        # ÉTAPE 6: Résumé final
+        self.log("\n" + ("-" * 30))
+        self.log("PROCESSUS TERMINÉ AVEC SUCCÈS")
+        self.log(f"  > Vidéo Highlight : {self.output_file}")
+        self.log(f"  > Clips de Dérushage : '{self.get_clips_dir()}' ({len(selected_segments)} clips)")
+        if self.generate_tiktoks:
+            self.log(f"  > Clips Tiktok : '{self.get_tiktoks_dir()}' ({len(tiktok_lists)} clips)")
+        self.log("  > Temps par étape :")
+        for line in self.report.summary_lines():
+            self.log(line)
+        self.log(f"  > Rapport détaillé : {self.get_report_path()}")
+        self.log(("-") * 30)
+        return selected_segments, tiktok_lists
 
     # --- 1. Fonctions d'Analyse (Volume + Parole) ---
 
@@ -134,52 +377,251 @@ class VideoProcessor:
             self.input_file
         ]
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = self._run(cmd, capture_output=True, text=True, check=True, timeout=PROBE_TIMEOUT)
             return float(result.stdout.strip())
         except subprocess.CalledProcessError as e:
             self.log(f"Erreur ffprobe (get_video_duration): {e.stderr}")
             return 0
+        except Cancelled:
+            raise
         except Exception:
             return 0
 
-    def run_transcription(self):
-        """Exécute Whisper sur TOUTE la vidéo."""
+    def run_transcription(self, step_progress_cb=None, scored_chunks=None):
+        """
+        Exécute Whisper sur TOUTE la vidéo.
+        - 1 worker: une seule transcription, avec le modèle partagé ('model_pool').
+        - N workers: fenêtres qui se recouvrent, transcrites sur N processus puis recollées.
+        - Filtre VAD ('transcription_gate'): seules les zones utiles sont transcrites.
+        """
         try:
-            self.log("Chargement du modèle de transcription 'base'...")
-            self.log("(La première fois, cela téléchargera le modèle, soyez patient)")
-            model = whisper.load_model("base")
-            self.log("Modèle chargé. Démarrage de l'analyse sémantique...")
-            result = model.transcribe(self.input_file, verbose=False, word_timestamps=True)
+            if self.transcription_gate:
+                return self._transcribe_gated(scored_chunks, step_progress_cb or (lambda p: None))
+
+            if self.transcription_workers > 1 and self.video_duration > self.transcription_window:
+                self.log(f"Chargement du modèle '{self.model_name}' dans {self.transcription_workers} processus...")
+                buffer = self._ensure_pcm_buffer()
+                return transcribe_parallel(
+                    self.input_file, self.video_duration, self.model_name,
+                    workers=self.transcription_workers,
+                    window=self.transcription_window,
+                    frame_levels=self.frame_levels,
+                    log=self.log,
+                    progress_cb=step_progress_cb,
+                    run=self._run,
+                    pcm_path=buffer.path if buffer is not None else None,
+                    supervisor=self.supervisor
+                )
+
+            if not model_pool.is_loaded(self.model_name):
+                self.log(f"Chargement du modèle de transcription '{self.model_name}'...")
+                self.log("(La première fois, cela téléchargera le modèle, soyez patient)")
+            # Whisper accepte un tableau: l'audio déjà décodé lui est passé sans copie
+            buffer = self._ensure_pcm_buffer()
+            source = buffer.samples if buffer is not None else self.input_file
+            with model_pool.use(self.model_name, on_wait=self._log_model_wait) as model:
+                self.log("Modèle prêt. Démarrage de l'analyse sémantique...")
+                result = model.transcribe(source, verbose=False, word_timestamps=True)
             return result
         except Exception as e:
+            self.supervisor.check() # Workers / ffmpeg tués par un arrêt: pas une erreur
             self.log(f"Erreur pendant l'analyse (Whisper): {e}")
             raise Exception(f"L'analyse sémantique a échoué. {e}")
 
-    def generate_chunks(self, chunk_size):
-        """Découpe la vidéo en 'bouts' (chunks) de 'chunk_size' secondes."""
+    def _transcribe_gated(self, scored_chunks, step_progress_cb):
+        """
+        Ne transcrit que les zones retenues par le filtre (parole ou 'hype'):
+        elles sont mises bout à bout, transcrites en une fois, puis les timestamps
+        sont remis sur la timeline d'origine.
+        """
+        if self.transcription_gate == "hype":
+            regions = vad.hype_regions(scored_chunks or [], margin=self.gate_margin,
+                                       duration=self.video_duration)
+        else:
+            regions = vad.speech_regions(self._ensure_frame_levels(), margin=self.gate_margin,
+                                         duration=self.video_duration)
+
+        kept = sum(end - start for start, end in regions)
+        self.log(f"Filtre '{self.transcription_gate}': {len(regions)} zones, "
+                 f"{kept / max(self.video_duration, 1):.0%} de la vidéo sera transcrite.")
+        if not regions:
+            return {'text': '', 'segments': [], 'language': None}
+
+        samples, time_map = vad.extract_regions_audio(
+            self.input_file, regions,
+            progress_cb=lambda p: step_progress_cb(p * 0.2), # 20% pour l'extraction
+            total_duration=self.video_duration,
+            popen=self._popen,
+            buffer=self._ensure_pcm_buffer()
+        )
+        if not model_pool.is_loaded(self.model_name):
+            self.log(f"Chargement du modèle de transcription '{self.model_name}'...")
+        with model_pool.use(self.model_name, on_wait=self._log_model_wait) as model:
+            self.log("Modèle prêt. Transcription des zones retenues...")
+            result = model.transcribe(samples, verbose=False, word_timestamps=True)
+        return vad.remap_result(result, time_map)
+
+    def _ensure_frame_levels(self):
+        """Niveaux audio fins (100 ms): réutilise ceux de l'analyse de volume, sinon les calcule."""
+        if self.frame_levels is None and self._ensure_pcm_buffer() is None:
+            self.log("Calcul des niveaux audio (une passe)...")
+            self.frame_levels = audio.compute_frame_levels(self.input_file, total_duration=self.video_duration,
+                                                           popen=self._popen)
+        return self.frame_levels
+
+    def _ensure_pcm_buffer(self, progress_cb=None):
+        """
+        Décode l'audio UNE fois dans '<sortie>_work' (PCM 16 kHz float32, mappé en mémoire)
+        et calcule les niveaux 100 ms dans la même passe. Appelé par le premier qui en a
+        besoin (Whisper ou volume); l'autre attend puis lit le même fichier. Quel que soit le
+        thread qui décode, la progression va à l'analyse de volume (cf. analyze).
+        Retourne None si NumPy est absent ou si le fichier ne peut pas être écrit.
+        """
+        if audio.np is None:
+            return None
+        with self._pcm_lock:
+            if self.pcm_buffer is not None:
+                return self.pcm_buffer
+            name = f"audio_{self.input_fingerprint[:16]}.f32" if self.input_fingerprint else "audio.f32"
+            path = os.path.join(self.get_work_dir(), name)
+            spectral = self.scoring.needs_spectral
+            try:
+                # Sans empreinte, un fichier existant pourrait venir d'une autre source
+                if self.input_fingerprint and os.path.isfile(path):
+                    self.log("Reprise: audio déjà décodé, réutilisé.")
+                    self.pcm_buffer = audio.PcmBuffer(path)
+                    if self.frame_levels is None:
+                        self.frame_levels = self.pcm_buffer.frame_levels(spectral=spectral)
+                else:
+                    self.log("Décodage de l'audio (une seule passe, partagée par toutes les analyses)...")
+                    os.makedirs(self.get_work_dir(), exist_ok=True)
+                    with self.report.stage('decode_audio'):
+                        self.pcm_buffer, self.frame_levels = audio.decode_to_buffer(
+                            self.input_file, path,
+                            total_duration=self.video_duration,
+                            progress_cb=progress_cb or self._decode_progress_cb,
+                            popen=self._popen,
+                            spectral=spectral
+                        )
+            except OSError as e:
+                self.log(f"Avertissement: audio décodé non partagé ({e})")
+                return None
+            return self.pcm_buffer
+
+    def _release_pcm_buffer(self):
+        """Libère le mappage; sans point de reprise, le fichier décodé est aussi supprimé."""
+        with self._pcm_lock:
+            if self.pcm_buffer is None:
+                return
+            path = self.pcm_buffer.path
+            self.pcm_buffer.close()
+            self.pcm_buffer = None
+        if self.checkpoint is None:
+            try:
+                os.remove(path)
+                os.rmdir(os.path.dirname(path)) # Seulement s'il est vide
+            except OSError:
+                pass
+
+    def _analyze_speech(self, step_progress_cb, scored_chunks=None):
+        """Étape 2a: Analyse sémantique (Whisper). Tourne dans son propre thread. Retourne un Transcript."""
+        cache_key = self._cache_key('transcription', **self._speech_params())
+        cached = self._cache_load(cache_key, load=Transcript.load)
+        if cached is not None:
+            self.log("Étape 2a: Transcription trouvée en cache, Whisper n'est pas relancé.")
+            step_progress_cb(100)
+            return cached
+
+        self.log("Étape 2a: Analyse sémantique (via Whisper)...")
+        self.log("(Ceci est long et identifie toutes les phrases)")
+        step_progress_cb(0)
+        # Conversion immédiate en colonnes: les dicts de Whisper sont libérés tout de suite
+        transcript = Transcript.from_whisper(self.run_transcription(step_progress_cb, scored_chunks))
+        self.log(f"Analyse sémantique terminée ({len(transcript)} phrases, {transcript.n_words} mots).")
+        self._cache_save(cache_key, transcript, binary=True)
+        step_progress_cb(100)
+        return transcript
+
+    def _analyze_volume(self, step_progress_cb):
+        """Étape 2b: Analyse de volume (Scoring). Tourne dans son propre thread."""
+        cache_key = self._cache_key('volume', **self._volume_params())
+        cached = self._cache_load(cache_key)
+        if cached is not None:
+            self.log("Étape 2b: Analyse de volume trouvée en cache.")
+            step_progress_cb(100)
+            return [tuple(chunk) for chunk in cached]
+
+        self.log("Étape 2b: Analyse de volume (Recherche de 'hype')...")
+        if self.window_mode == "sliding" and audio.np is not None:
+            windows = self.generate_windows(self.chunk_size, self.window_hop)
+            scored_chunks = self.score_segments_parallel(windows, step_progress_cb=step_progress_cb, peaks=True)
+        else:
+            if self.window_mode == "sliding":
+                self.log("(NumPy absent: fenêtres glissantes indisponibles, analyse par 'bouts' fixes)")
+            chunks = self.generate_chunks(self.chunk_size)
+            scored_chunks = self.score_segments_parallel(chunks, step_progress_cb=step_progress_cb)
+        self.log(f"{len(scored_chunks)} 'bouts' intenses (volume) trouvés.")
+        if scored_chunks:
+            self._cache_save(cache_key, scored_chunks)
+        return scored_chunks
+
+    def _load_transcript(self, data):
+        """Transcript à partir du résultat de l'étape (relu du point de reprise), mappé en mémoire si demandé."""
+        transcript = Transcript.from_dict(data)
+        if self.spill_dir:
+            self._release_spill()
+            try:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                # Un dossier par traitement: jamais celui, encore mappé, d'un autre traitement
+                self._spill_path = tempfile.mkdtemp(prefix=f"{self.get_output_name_no_ext()}_transcript_",
+                                                    dir=self.spill_dir)
+                transcript = transcript.spill(self._spill_path)
+            except OSError as e:
+                self.log(f"Avertissement: transcription gardée en mémoire ({e})")
+        return transcript
+
+    def _release_spill(self):
+        """Supprime les colonnes déchargées (cf. _load_transcript) à la fin du traitement."""
+        if self._spill_path is not None:
+            # Sous Windows, un fichier encore mappé (analyse gardée par l'appelant) reste en place
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+    def generate_chunks(self, chunk_size, duration=None):
+        """Découpe la vidéo (ou ses 'duration' premières secondes) en 'bouts' de 'chunk_size' secondes."""
+        duration = self.video_duration if duration is None else duration
         chunks = []
-        for start in range(0, int(self.video_duration), chunk_size):
+        for start in range(0, int(duration), chunk_size):
             end = start + chunk_size
-            if end > self.video_duration:
-                end = self.video_duration
+            if end > duration:
+                end = duration
             if end - start > 1:
                 chunks.append((start, end))
         return chunks
 
+    def generate_windows(self, window, hop, duration=None):
+        """
+        Fenêtres glissantes de 'window' secondes, tous les 'hop' secondes (elles se chevauchent).
+        Notées en une passe sur les niveaux 100 ms (sommes préfixes + max glissant).
+        """
+        duration = self.video_duration if duration is None else duration
+        if duration <= window:
+            return [(0.0, duration)] if duration > 1 else []
+        count = int((duration - window) / hop + 1e-9) + 1
+        return [(round(i * hop, 3), round(i * hop + window, 3)) for i in range(count)]
+
     def _score_segment(self, start, duration):
         """Calcule le score de 'volume/hype' pour un seul segment."""
         cmd = [
             'ffmpeg', '-hide_banner', '-ss', str(start), '-t', str(duration),
             '-i', self.input_file, '-af', 'volumedetect', '-f', 'null', '-'
         ]
+        volume = VolumeDetect()
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            stderr = result.stderr
-            m = re.search(r"max_volume: (-?\d+\.?\d*) dB", stderr)
-            n = re.search(r"mean_volume: (-?\d+\.?\d*) dB", stderr)
-            if m and n:
-                max_vol = float(m.group(1))
-                mean_vol = float(n.group(1))
+            self._run_ffmpeg(cmd, duration, parsers=[volume], timeout=self._job_timeout(duration))
+            if volume.max_volume is not None and volume.mean_volume is not None:
+                max_vol = volume.max_volume
+                mean_vol = volume.mean_volume
                 if max_vol <= -40: return 0
                 vol_factor = (max_vol + 40) / 40
                 dyn_factor = abs(mean_vol - max_vol) / abs(mean_vol) if mean_vol != 0 else 1
@@ -188,8 +630,70 @@ class VideoProcessor:
             return 0
         return 0
 
-    def score_segments_parallel(self, segments, step_progress_cb):
-        """Scanne les 'bouts' en parallèle pour trouver le volume."""
+    def score_segments_parallel(self, segments, step_progress_cb, peaks=False):
+        """
+        Note les 'bouts' (volume). L'audio est décodé UNE seule fois (pipe ffmpeg)
+        et tous les signaux audio (niveaux, flux spectral...) sont calculés avec NumPy
+        dans cette même passe, puis combinés par le moteur de scoring (cf. scoring.py).
+        'peaks': les segments sont des fenêtres glissantes, on ne garde que les pics.
+        """
+        if audio.np is None:
+            self.log("(NumPy absent: analyse de volume 'bout par bout', plus lente)")
+            if not self.scoring.is_legacy:
+                self.log("Avertissement: sans NumPy, seul le signal 'volume' est utilisé.")
+            return self._score_segments_per_chunk(segments, step_progress_cb)
+
+        try:
+            if self._ensure_pcm_buffer(step_progress_cb) is None:
+                self.frame_levels = audio.compute_frame_levels(
+                    self.input_file,
+                    total_duration=self.video_duration,
+                    progress_cb=step_progress_cb,
+                    popen=self._popen,
+                    spectral=self.scoring.needs_spectral
+                )
+        except subprocess.CalledProcessError as e:
+            self.supervisor.check()
+            self.log(f"Erreur ffmpeg (analyse de volume): {e.stderr}")
+            return []
+
+        scene_times = None
+        if self.scoring.needs_scene:
+            self.log("Détection des changements de plan (passe vidéo)...")
+            try:
+                scene_times = scoring.scene_change_times(self.input_file, run=self._run)
+            except subprocess.CalledProcessError as e:
+                self.supervisor.check()
+                self.log(f"Avertissement: détection des changements de plan impossible ({e.stderr})")
+
+        scored_segments = self.score_from_levels(segments, scene_times, peaks)
+        step_progress_cb(100)
+        return scored_segments
+
+    def score_from_levels(self, segments, scene_times=None, peaks=False, levels=None):
+        """
+        Note les 'bouts' à partir des niveaux déjà calculés ('levels', sinon self.frame_levels),
+        triés par score. 'peaks': fenêtres glissantes, seules les meilleures fenêtres sans
+        chevauchement sont gardées.
+        """
+        levels = self.frame_levels if levels is None else levels
+        scores = self.scoring.score_chunks(segments, levels, scene_times)
+        if peaks:
+            radius = max(0, int(math.ceil(self.chunk_size / self.window_hop - 1e-9)) - 1)
+            kept = scoring.pick_peaks(scores, radius)
+        else:
+            kept = range(len(segments))
+
+        scored_segments = [
+            (segments[i][0], segments[i][1], segments[i][1] - segments[i][0], float(scores[i]))
+            for i in kept
+            if scores[i] > 0
+        ]
+        scored_segments.sort(key=lambda x: x[3], reverse=True)
+        return scored_segments
+
+    def _score_segments_per_chunk(self, segments, step_progress_cb):
+        """Ancienne méthode: un processus ffmpeg 'volumedetect' par 'bout', en parallèle."""
         scored_segments = []
         total_segments = len(segments)
         completed_count = 0
@@ -206,6 +710,8 @@ class VideoProcessor:
                     score = future.result()
                     if score > 0:
                         scored_segments.append((s_start, s_end, seg_dur, score))
+                except Cancelled:
+                    raise
                 except Exception as e:
                     self.log(f"Erreur de scoring sur segment {s_start}-{s_end}: {e}")
                 
@@ -218,8 +724,8 @@ class VideoProcessor:
 
     # --- 2. Fonctions "Cerveau" (Sélection & Fusion) ---
 
-    def calculate_target_duration(self):
-        """Calcule la durée cible en fonction de la durée de la vidéo et du profil."""
+    def calculate_target_duration(self, duration=None):
+        """Calcule la durée cible en fonction de la durée de la vidéo ('duration' si donnée) et du profil."""
         INPUT_DURATION_MIN = 2 * 3600 # 2h
         INPUT_DURATION_MAX = 5 * 3600 # 5h
         
@@ -230,56 +736,49 @@ class VideoProcessor:
         else: # "Moyen"
             min_target, max_target = 10 * 60, 20 * 60
         
-        duration = self.video_duration
+        duration = self.video_duration if duration is None else duration
         if duration <= INPUT_DURATION_MIN: return min_target
         if duration >= INPUT_DURATION_MAX: return max_target
         ratio = (duration - INPUT_DURATION_MIN) / (INPUT_DURATION_MAX - INPUT_DURATION_MIN)
         return min_target + ratio * (max_target - min_target)
 
-    def find_intelligent_segments(self, whisper_result, scored_chunks):
+    def find_intelligent_segments(self, transcript, scored_chunks):
         """
-        LE "CERVEAU". Fusionne l'analyse de volume et l'analyse de parole.
+        LE "CERVEAU". Fusionne l'analyse de volume et l'analyse de parole (Transcript).
         Ne coupe pas les phrases.
         """
-        whisper_segments = whisper_result['segments']
-        if not whisper_segments:
+        transcript = Transcript.from_dict(transcript)
+        if not len(transcript):
             self.log("AVERTISSEMENT: Whisper n'a détecté aucune parole. Le 'cerveau' est désactivé.")
             self.log("L'outil va se baser *uniquement* sur le volume (ancienne méthode).")
             # Mode dégradé: on retourne les chunks de volume tels quels
             return [(s[0], s[1], s[2], s[3]) for s in scored_chunks]
 
-        # Créer une liste de (start, end) pour tous les segments de parole
-        speech_timeline = [(seg['start'], seg['end']) for seg in whisper_segments]
+        # Index des segments de parole: chevauchements trouvés par dichotomie,
+        # les phrases déjà utilisées sont sautées (une phrase ne sert qu'une fois)
+        speech_index = SpeechIndex(transcript.segment_starts.tolist(), transcript.segment_ends.tolist())
         
         intelligent_segments = []
-        # Utiliser un set pour éviter d'ajouter le même segment de parole plusieurs fois
-        used_speech_segments_indices = set() 
 
         # Parcourir les 'bouts' les plus bruyants (déjà triés par score)
         for chunk_start, chunk_end, _, chunk_score in scored_chunks:
             
-            overlapping_indices = []
-            for i, (speech_start, speech_end) in enumerate(speech_timeline):
-                # Vérifier s'il y a chevauchement
-                if chunk_start < speech_end and chunk_end > speech_start:
-                    if i not in used_speech_segments_indices:
-                        overlapping_indices.append(i)
+            overlapping_indices = speech_index.overlapping_unused(chunk_start, chunk_end)
 
             if overlapping_indices:
                 # On a trouvé de la parole dans ce "bout" bruyant !
                 # Maintenant, on étend le clip pour inclure les phrases ENTIÈRES.
                 
                 # Trouver le début de la première phrase et la fin de la dernière
-                first_index = min(overlapping_indices)
-                last_index = max(overlapping_indices)
+                first_index = overlapping_indices[0]
+                last_index = overlapping_indices[-1]
                 
-                new_start = speech_timeline[first_index][0]
-                new_end = speech_timeline[last_index][1]
+                new_start = speech_index.starts[first_index]
+                new_end = speech_index.ends[last_index]
                 new_duration = new_end - new_start
                 
                 # Ajouter tous ces segments à la liste des 'utilisés'
-                for i in range(first_index, last_index + 1):
-                    used_speech_segments_indices.add(i)
+                speech_index.mark_used(first_index, last_index)
                 
                 # Ajouter ce nouveau 'moment' intelligent
                 intelligent_segments.append((new_start, new_end, new_duration, chunk_score))
@@ -289,28 +788,22 @@ class VideoProcessor:
         return intelligent_segments
 
     def select_best_segments(self, intelligent_segments, target_duration):
-        """Sélectionne les meilleurs segments (intelligents) pour le Highlight."""
-        selected = []
-        current_total_duration = 0
-        
-        # Parcourir les segments (déjà triés par score)
-        for start, end, duration, score in intelligent_segments:
-            if current_total_duration >= target_duration:
-                break
-                
-            # S'il reste de la place, on ajoute le segment
-            # On ne coupe PAS le segment, on le prend en entier (c'est l'IA)
-            selected.append((start, end, duration))
-            current_total_duration += duration
-            
-        # Trier par ordre d'apparition pour la vidéo finale
-        selected.sort(key=lambda x: x[0]) 
-        return selected
+        """
+        Sélectionne les meilleurs segments (intelligents) pour le Highlight:
+        le plus de 'hype' possible sans dépasser la durée cible (cf. selection.py).
+        On ne coupe PAS les segments, on les prend en entier (c'est l'IA).
+        """
+        return selection.select_segments(intelligent_segments, target_duration, log=self.log)
 
     # --- 3. Fonctions de Sortie (Highlight + Dérushage) ---
 
-    def _extract_single_segment(self, segment_info, output_filepath, pad=0.3):
-        """Extrait un segment vidéo unique (encodage)."""
+    def _extract_single_segment(self, segment_info, output_filepath, pad=0.3, threads=None, on_progress=None,
+                                mode="reencode"):
+        """
+        Extrait un segment vidéo unique (encodage). 'threads' limite les threads x264.
+        'on_progress': avancement de l'encodage (0-1), rapporté pendant le job.
+        'mode' "onepass": mêmes filtres que le rendu en une passe (clips interchangeables).
+        """
         # CORRECTION: segment_info peut être (start, end, duration)
         # OU (start, end, duration, score).
         # On ne prend que les deux premiers éléments par leur index.
@@ -325,20 +818,106 @@ class VideoProcessor:
             '-ss', str(s_start),
             '-t', str(s_duration),
             '-i', self.input_file,
-            '-r', '60', '-vsync', 'cfr',
+        ]
+        if mode == "onepass":
+            cmd += ['-vf', onepass.VIDEO_FILTER, '-af', onepass.AUDIO_FILTER]
+        else:
+            cmd += ['-r', '60', '-vsync', 'cfr']
+        cmd += [
             '-c:v', 'libx264', '-preset', 'superfast', '-crf', '18',
+        ]
+        if threads:
+            cmd += ['-threads', str(threads)]
+        cmd += [
             '-movflags', '+faststart',
             '-c:a', 'aac', '-b:a', '192k',
             '-loglevel', 'error',
             output_filepath
         ]
         try:
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
-            return True
+            self._run_ffmpeg(cmd, s_duration, on_progress, timeout=self._job_timeout(s_duration))
+            return mode
         except subprocess.CalledProcessError as e:
             self.log(f"Erreur d'extraction (clip) {s_start}: {e.stderr}")
             return False
 
+    def get_extractor(self):
+        """
+        Fonction d'extraction d'un clip (seg, chemin, pad, threads[, on_progress]) selon
+        'extraction_mode'. Le smart cut (plusieurs petits jobs) ne rapporte que sa fin.
+        Elle retourne le mode réellement utilisé (cf. CLIP_MODES), ou False en cas d'échec.
+        """
+        self.clip_mode = "reencode"
+        if self.extraction_mode == "smartcut":
+            stream_info = self._probe_for_smart_cut()
+            if stream_info is not None:
+                self.clip_mode = "smartcut"
+                return lambda seg, path, pad, threads, on_progress=None: \
+                    self._smart_cut_segment(stream_info, seg, path, pad, threads)
+        elif self.extraction_mode == "onepass":
+            # Clip par clip (reprise partielle, échec du rendu en une passe): même format
+            self.clip_mode = "onepass"
+            return lambda seg, path, pad, threads, on_progress=None: \
+                self._extract_single_segment(seg, path, pad, threads, on_progress, mode="onepass")
+        return self._extract_single_segment
+
+    def _reuse_clip(self, segment_info, output_filepath, pad):
+        """
+        Place un clip déjà encodé (ClipStore) à 'output_filepath' (lien dur, sinon copie),
+        s'il est compatible avec les clips de ce rendu. Retourne son mode, ou False.
+        """
+        for mode in CLIP_MODES[self.clip_mode]:
+            if self._reuse_file(self._clip_key(segment_info, pad, mode), output_filepath):
+                return mode
+        return False
+
+    def _reuse_file(self, key, output_filepath):
+        source = self.clip_store.lookup(key)
+        if source is None:
+            return False
+        if os.path.abspath(source) == os.path.abspath(output_filepath):
+            return True
+        try:
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+            os.link(source, output_filepath)
+        except OSError:
+            try:
+                shutil.copyfile(source, output_filepath)
+            except OSError as e:
+                self.log(f"Avertissement: clip déjà encodé inutilisable ({e})")
+                return False
+        return True
+
+    def _probe_for_smart_cut(self):
+        """Vérifie que la source peut être recopiée (H.264 + AAC). Sinon: None (ré-encodage complet)."""
+        try:
+            stream_info = smartcut.probe_streams(
+                self.input_file, run=lambda cmd, **kwargs: self._run(cmd, timeout=PROBE_TIMEOUT, **kwargs))
+        except (subprocess.CalledProcessError, ValueError) as e:
+            self.log(f"Avertissement: analyse des flux impossible, ré-encodage complet ({e})")
+            return None
+        if not stream_info.can_stream_copy:
+            self.log(f"INFO: Codecs '{stream_info.video.get('codec_name')}' / "
+                     f"'{stream_info.audio.get('codec_name')}' non recopiables, ré-encodage complet.")
+            return None
+        self.log("INFO: Mode 'smart cut': copie directe + ré-encodage des seules têtes de GOP.")
+        return stream_info
+
+    def _smart_cut_segment(self, stream_info, segment_info, output_filepath, pad=0.3, threads=None):
+        """Extrait un segment en 'smart cut' (cf. smartcut.py)."""
+        s_start = max(0, segment_info[0] - pad)
+        s_end = segment_info[1] + pad
+        try:
+            timeout = self._job_timeout(s_end - s_start)
+            mode = smartcut.smart_cut(self.input_file, s_start, s_end, output_filepath, stream_info, threads,
+                                      run=lambda cmd, **kwargs: self._run(cmd, timeout=timeout, **kwargs))
+            # Ré-encodé aux paramètres de la source: ne remplace pas un clip 60 fps (et inversement)
+            return 'reencode-source' if mode == 'reencode' else mode
+        except subprocess.CalledProcessError as e:
+            self.log(f"Erreur d'extraction (smart cut) {s_start}: {e.stderr}")
+            return False
+
     def extract_and_concatenate_segments(self, segments, step_progress_cb, pad=0.3):
         """
         Crée le DÉRUSHAGE (clips individuels) ET le HIGHLIGHT (vidéo finale).
@@ -348,28 +927,89 @@ class VideoProcessor:
         self.log(f"Création du dossier de dérushage : {clips_dir}")
         self.log(f"INFO: Padding de {pad}s appliqué pour des transitions douces.")
 
-        processed_files = []
         total_segments = len(segments)
+        workers, threads = self.get_extraction_budget()
+        self.log(f"INFO: {workers} encodage(s) en parallèle, {threads} thread(s) x264 chacun.")
 
-        # 1. Dérushage (Extraction)
+        extract = self.get_extractor()
+
+        # 1. Dérushage (Extraction) - pool borné, numérotation fixée AVANT l'encodage
+        jobs = []
         for i, seg in enumerate(segments):
-            start_time, _, _ = seg
+            start_time = seg[0]
             time_str = f"{int(start_time // 60)}m{int(start_time % 60):02d}s"
             clip_filename = f"clip_{i+1:03d}_{time_str}.mp4"
-            clip_filepath = os.path.join(clips_dir, clip_filename)
-            
-            self.log(f"Dérushage - Clip {i+1}/{total_segments} ({time_str})")
+            jobs.append((seg, os.path.join(clips_dir, clip_filename), time_str))
+
+        # Reprise: les clips déjà extraits (et dont le fichier est valide) sont sautés,
+        # ceux déjà encodés ailleurs (ClipStore, ex: mode live) sont recopiés
+        results = [False] * total_segments
+        pending = []
+        reused = 0
+        for i, (seg, clip_filepath, _) in enumerate(jobs):
+            if self._unit_done('clips', clip_filepath, self._clip_params(seg, pad), self._padded_duration(seg, pad)):
+                results[i] = self.clip_mode # Même configuration que le rendu interrompu
+                continue
+            results[i] = self._reuse_clip(seg, clip_filepath, pad)
+            if results[i]:
+                reused += 1
+                self._mark_unit('clips', clip_filepath, self._clip_params(seg, pad))
+            else:
+                pending.append(i)
+        completed_count = total_segments - len(pending)
+        if completed_count - reused:
+            self.log(f"Reprise: {completed_count - reused} clip(s) déjà extraits, ignorés.")
+        if reused:
+            self.log(f"{reused} clip(s) déjà encodés réutilisés sans ré-extraction.")
+
+        # Rendu en une passe (tout le Highlight à refaire): sinon, ou en cas d'échec, clip par clip
+        if self.extraction_mode == "onepass" and len(pending) == total_segments:
+            if self._render_one_pass(jobs, step_progress_cb, pad):
+                return
+            self.log("Avertissement: rendu en une passe impossible, retour au dérushage clip par clip.")
 
-            success = self._extract_single_segment(seg, clip_filepath, pad)
-            if success:
+        # Progression pondérée par la durée des clips, mise à jour pendant les encodages
+        progress = StageProgress(step_progress_cb, completed_count / total_segments * 90, 90, # Garde 10% pour la suite
+                                 {i: self._padded_duration(jobs[i][0], pad) for i in pending})
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(extract, jobs[i][0], jobs[i][1], pad, threads,
+                                lambda f, i=i: progress.report(i, f * 100)): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Cancelled:
+                    raise
+                except Exception as e:
+                    self.log(f"Erreur d'extraction (clip {i+1}): {e}")
+                if results[i]:
+                    self._mark_unit('clips', jobs[i][1], self._clip_params(jobs[i][0], pad))
+                completed_count += 1
+                self.log(f"Dérushage - Clip {i+1}/{total_segments} ({jobs[i][2]}) "
+                         f"[{completed_count}/{total_segments}]")
+                progress.report(i, 100)
+
+        # Ordre chronologique conservé pour 'segments.txt', quel que soit l'ordre de fin
+        processed_files = []
+        for (seg, clip_filepath, _), mode in zip(jobs, results):
+            if mode:
                 processed_files.append(clip_filepath)
-            
-            step_progress_cb((i + 1) / total_segments * 90) # Garde 10% pour la suite
+                self.clip_store.register(self._clip_key(seg, pad, mode), clip_filepath)
 
         if not processed_files:
             raise Exception("Aucun clip n'a pu être extrait avec succès.")
 
         # 2. Highlight (Concaténation)
+        concat_params = {'clips': [os.path.basename(p) for p in processed_files]}
+        expected_duration = sum(self._padded_duration(seg, pad) for (seg, _, _), ok in zip(jobs, results) if ok)
+        if self._unit_done('highlight', self.output_file, concat_params, expected_duration):
+            self.log("Reprise: Highlight déjà assemblé.")
+            step_progress_cb(100)
+            return
+
         self.log("Concaténation des clips pour le Highlight final...")
         list_file = os.path.join(clips_dir, "segments.txt")
         with open(list_file, "w", encoding='utf-8') as f:
@@ -384,80 +1024,97 @@ class VideoProcessor:
         ]
         
         try:
-            subprocess.run(cmd_concat, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
+            if self.clip_mode == "smartcut":
+                self._concat_smart_cut_clips(processed_files, list_file, expected_duration, step_progress_cb)
+            else:
+                self._run_ffmpeg(cmd_concat, expected_duration, lambda f: step_progress_cb(90 + f * 10),
+                                 timeout=self._job_timeout(expected_duration))
             self.log("Vidéo Highlight créée avec succès.")
+            self._mark_unit('highlight', self.output_file, concat_params)
         except subprocess.CalledProcessError as e:
             self.log(f"Erreur lors de la concaténation finale: {e.stderr}")
             raise Exception("La concaténation finale a échoué.")
         
         step_progress_cb(100)
 
-    # --- 4. Fonctions de Sortie (Tiktok) ---
+    def _concat_smart_cut_clips(self, processed_files, list_file, expected_duration, step_progress_cb):
+        """
+        Highlight des clips 'smart cut': leurs paramètres H.264 diffèrent (têtes x264, queues
+        de la source), ils sont recollés via MPEG-TS (cf. smartcut.concat_clips) puis les raccords
+        entre clips sont vérifiés (quelques secondes décodées par raccord).
+        Assemblage illisible: le Highlight est ré-encodé à partir des clips.
+        """
+        timeout = self._job_timeout(expected_duration)
+        run = lambda cmd, **kwargs: self._run(cmd, timeout=timeout, **kwargs)
+        joins = smartcut.concat_clips(processed_files, self.output_file, run=run)
+        if smartcut.verify_joins(self.output_file, joins, run=run):
+            return
+        self.log("Avertissement: Highlight recopié illisible, ré-encodage de l'assemblage...")
+        cmd = [
+            'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_file,
+            '-c:v', 'libx264', '-preset', 'superfast', '-crf', '18',
+            '-c:a', 'aac', '-b:a', '192k',
+            '-movflags', '+faststart', '-loglevel', 'error',
+            self.output_file
+        ]
+        self._run_ffmpeg(cmd, expected_duration, lambda f: step_progress_cb(90 + f * 10), timeout=timeout)
 
-    def compile_tiktoks(self, intelligent_segments_pool, max_duration_per_tiktok=60, num_tiktoks_to_create=5):
+    def _render_one_pass(self, jobs, step_progress_cb, pad=0.3):
         """
-        NOUVELLE FONCTION "CERVEAU" TIKTOK:
-        Compile des Tiktoks de ~1 minute en assemblant les MEILLEURS 
-        segments intelligents (parole + hype) disponibles.
+        Highlight ET clips du dérushage en un seul appel ffmpeg (cf. onepass.py): une
+        lecture séquentielle de la source au lieu d'une recherche + un encodage par clip,
+        puis d'une concaténation. Retourne False si le rendu a échoué (rien n'est marqué).
         """
-        tiktoks = [] # Une liste de listes: [[segA, segB], [segC, segD, segE], ...]
-        
-        # Copier la liste (qui est triée par score) pour pouvoir la consommer
-        segment_pool = list(intelligent_segments_pool) 
+        clips_dir = self.get_clips_dir()
+        tmp_dir = os.path.join(clips_dir, ".onepass")
+        ranges = [(max(0, seg[0] - pad), seg[1] + pad) for seg, _, _ in jobs]
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir, exist_ok=True)
+            cmd, duration = onepass.build_command(self.input_file, ranges, self.output_file, tmp_dir,
+                                                  os.path.join(tmp_dir, "graph.txt"))
+            self.log(f"INFO: Rendu en une passe ({len(jobs)} clips, {duration/60:.1f} min): "
+                     f"une seule lecture de la source.")
+            self._run_ffmpeg(cmd, duration, lambda f: step_progress_cb(f * 100),
+                             timeout=self._job_timeout(duration))
+            produced = onepass.produced_clips(tmp_dir)
+            if len(produced) != len(jobs):
+                raise ValueError(f"{len(produced)} clip(s) écrits au lieu de {len(jobs)}")
+            for (seg, clip_filepath, _), name in zip(jobs, produced):
+                os.replace(os.path.join(tmp_dir, name), clip_filepath)
+                self._mark_unit('clips', clip_filepath, self._clip_params(seg, pad))
+                self.clip_store.register(self._clip_key(seg, pad, "onepass"), clip_filepath)
+        except (subprocess.CalledProcessError, OSError, ValueError) as e:
+            self.log(f"Erreur du rendu en une passe: {getattr(e, 'stderr', None) or e}")
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True) # Graphe compris
 
-        for _ in range(num_tiktoks_to_create):
-            if not segment_pool:
-                break # Il n'y a plus de segments à utiliser
-            
-            current_tiktok_clips = []
-            current_tiktok_duration = 0
+        self._mark_unit('highlight', self.output_file, {'clips': [os.path.basename(path) for _, path, _ in jobs]})
+        self.log("Vidéo Highlight et clips créés en une passe.")
+        step_progress_cb(100)
+        return True
 
-            # On "remplit" le Tiktok de 60s avec les meilleurs segments disponibles
-            
-            # On utilise un index pour parcourir la 'pool' sans la modifier
-            # pendant l'itération, ce qui est plus sûr.
-            indices_to_remove = []
-            
-            for i, segment in enumerate(segment_pool):
-                segment_duration = segment[2] # Durée
-                
-                # Si le clip est vide, on force l'ajout du premier (meilleur) segment
-                if not current_tiktok_clips:
-                    current_tiktok_clips.append(segment)
-                    current_tiktok_duration += segment_duration
-                    indices_to_remove.append(i)
-                # Sinon, on vérifie si ça rentre
-                elif current_tiktok_duration + segment_duration <= max_duration_per_tiktok:
-                    current_tiktok_clips.append(segment)
-                    current_tiktok_duration += segment_duration
-                    indices_to_remove.append(i)
-                
-                # Si on est plein, on s'arrête pour ce Tiktok
-                if current_tiktok_duration >= max_duration_per_tiktok:
-                    break
-            
-            # Retirer les segments utilisés de la 'pool' (en ordre inverse pour les indices)
-            for i in sorted(indices_to_remove, reverse=True):
-                segment_pool.pop(i)
-
-            if current_tiktok_clips:
-                # IMPORTANT: Trier les clips par ordre chronologique
-                current_tiktok_clips.sort(key=lambda x: x[0])
-                tiktoks.append(current_tiktok_clips)
-        
-        return tiktoks
+    # --- 4. Fonctions de Sortie (Tiktok) ---
 
+    def compile_tiktoks(self, intelligent_segments_pool, max_duration_per_tiktok=60, num_tiktoks_to_create=5):
+        """
+        NOUVELLE FONCTION "CERVEAU" TIKTOK:
+        Compile des Tiktoks de ~1 minute: chacun part du MEILLEUR segment intelligent
+        restant, puis est complété avec la combinaison de segments qui apporte le
+        plus de 'hype' sans dépasser la durée max (cf. selection.pack_tiktoks).
+        """
+        return selection.pack_tiktoks(intelligent_segments_pool, num_tiktoks_to_create, max_duration_per_tiktok)
 
     def create_tiktok_clips(self, list_of_tiktok_lists, step_progress_cb, pad=0.3):
         """
-        NOUVELLE LOGIQUE (COMPLEXE):
         Crée des Tiktoks qui sont des *compilations* de plusieurs 'cuts'.
         
-        Processus pour 1 Tiktok:
-        1. Extrait chaque 'cut' (ex: cut_A, cut_B) en fichier 16:9 temporaire.
-        2. Concatène ces 'cuts' (temp_A + temp_B) en un fichier 16:9 (temp_concat).
-        3. Applique le "crop" 9:16 sur 'temp_concat' pour créer le Tiktok final.
-        4. Nettoie les fichiers temporaires.
+        Processus pour 1 Tiktok (UN seul appel ffmpeg, UN seul encodage):
+        1. Chaque 'cut' est lu depuis le clip déjà encodé pour le Highlight (ClipStore)
+           s'il existe, sinon directement depuis la source (-ss/-t).
+        2. Un seul filter graph: normalisation, crop 9:16 + scale de chaque 'cut',
+           puis concat, encodé directement dans le Tiktok final.
         """
         tiktok_dir = self.get_tiktoks_dir()
         os.makedirs(tiktok_dir, exist_ok=True)
@@ -470,72 +1127,304 @@ class VideoProcessor:
 
         for i, tiktok_clips_list in enumerate(list_of_tiktok_lists):
             time_str = f"{int(tiktok_clips_list[0][0] // 60)}m{int(tiktok_clips_list[0][0] % 60):02d}s"
-            self.log(f"Génération Tiktok {i+1}/{total_tiktoks} (basé sur {time_str})...")
+            final_tiktok_path = os.path.join(tiktok_dir, f"tiktok_{i+1:03d}_{time_str}.mp4")
 
-            temp_files_for_this_tiktok = []
-            temp_files_to_delete = []
+            tiktok_params = {'segments': [[seg[0], seg[1]] for seg in tiktok_clips_list], 'pad': pad}
+            tiktok_key = self._tiktok_key(tiktok_clips_list, pad)
+            expected_duration = sum(self._padded_duration(seg, pad) for seg in tiktok_clips_list)
+            if self._unit_done('tiktoks', final_tiktok_path, tiktok_params, expected_duration):
+                self.log(f"Reprise: Tiktok {i+1}/{total_tiktoks} déjà créé.")
+                self.clip_store.register(tiktok_key, final_tiktok_path)
+                step_progress_cb((i + 1) / total_tiktoks * 100)
+                continue
+            if self._reuse_file(tiktok_key, final_tiktok_path):
+                self.log(f"Tiktok {i+1}/{total_tiktoks} inchangé, repris tel quel.")
+                self.clip_store.register(tiktok_key, final_tiktok_path)
+                step_progress_cb((i + 1) / total_tiktoks * 100)
+                continue
 
+            cmd, reused = self._build_tiktok_command(tiktok_clips_list, final_tiktok_path, pad)
+            self.log(f"Génération Tiktok {i+1}/{total_tiktoks} (basé sur {time_str}, "
+                     f"{reused}/{len(tiktok_clips_list)} cuts déjà encodés réutilisés)...")
             try:
-                # --- 1. Extraire chaque 'cut' en fichier 16:9 temporaire ---
-                for j, segment_info in enumerate(tiktok_clips_list):
-                    temp_clip_path = os.path.join(tiktok_dir, f"temp_clip_{i+1}_{j+1}.mp4")
-                    temp_files_to_delete.append(temp_clip_path)
-                    
-                    # On réutilise la fonction d'extraction 16:9
-                    success = self._extract_single_segment(segment_info, temp_clip_path, pad)
-                    if success:
-                        temp_files_for_this_tiktok.append(temp_clip_path)
-
-                if not temp_files_for_this_tiktok:
-                    self.log(f"Avertissement: Echec de l'extraction des cuts pour Tiktok {i+1}.")
-                    continue # Passer au Tiktok suivant
-
-                # --- 2. Concaténer ces 'cuts' (toujours en 16:9) ---
-                temp_concat_path = os.path.join(tiktok_dir, f"temp_concat_{i+1}.mp4")
-                temp_files_to_delete.append(temp_concat_path)
-                
-                list_file_path = os.path.join(tiktok_dir, f"temp_list_{i+1}.txt")
-                temp_files_to_delete.append(list_file_path)
-                
-                with open(list_file_path, "w", encoding='utf-8') as f:
-                    for temp_file in temp_files_for_this_tiktok:
-                        f.write(f"file '{os.path.abspath(temp_file)}'\n")
-                
-                cmd_concat = [
-                    'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
-                    '-i', list_file_path,
-                    '-c', 'copy', # Rapide
-                    temp_concat_path
-                ]
-                subprocess.run(cmd_concat, check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
-
-                # --- 3. Appliquer le "crop" 9:16 final ---
-                final_tiktok_path = os.path.join(tiktok_dir, f"tiktok_{i+1:03d}_{time_str}.mp4")
-                crop_filter = "crop=ih*9/16:ih,scale=1080:1920,setsar=1"
-                
-                cmd_crop = [
-                    'ffmpeg', '-y',
-                    '-i', temp_concat_path, # Entrée: le clip 16:9 concaténé
-                    '-vf', crop_filter,
-                    '-c:v', 'libx264', '-preset', 'superfast', '-crf', '20',
-                    '-c:a', 'aac', '-b:a', '192k',
-                    '-movflags', '+faststart', '-loglevel', 'error',
-                    final_tiktok_path # Sortie: le clip 9:16 final
-                ]
-                subprocess.run(cmd_crop, check=True, capture_output=True, text=True)
+                self._run_ffmpeg(cmd, expected_duration,
+                                 lambda f, i=i: step_progress_cb((i + f) / total_tiktoks * 100),
+                                 timeout=self._job_timeout(expected_duration))
                 self.log(f"  > Tiktok {i+1} créé: {final_tiktok_path}")
-
+                self._mark_unit('tiktoks', final_tiktok_path, tiktok_params)
+                self.clip_store.register(tiktok_key, final_tiktok_path)
             except subprocess.CalledProcessError as e:
                 self.log(f"Erreur lors de la création du Tiktok {i+1}: {e.stderr}")
-            finally:
-                # --- 4. Nettoyer tous les fichiers temporaires ---
-                for temp_file in temp_files_to_delete:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
             
             step_progress_cb((i + 1) / total_tiktoks * 100)
 
-    # --- 5. Fonctions "Helper" (Chemins) ---
+    def _build_tiktok_command(self, tiktok_clips_list, output_filepath, pad=0.3):
+        """
+        Construit la commande ffmpeg (trim/concat/crop/scale) d'un Tiktok.
+        Retourne (cmd, nombre de 'cuts' lus depuis des clips déjà encodés).
+        """
+        cmd = ['ffmpeg', '-y']
+        filters = []
+        concat_inputs = ""
+        reused = 0
+        for j, segment_info in enumerate(tiktok_clips_list):
+            # Tout clip déjà découpé convient: le Tiktok est ré-encodé de toute façon
+            clip_path = next(filter(None, (self.clip_store.lookup(self._clip_key(segment_info, pad, mode))
+                                           for mode in ALL_CLIP_MODES)), None)
+            if clip_path:
+                cmd += ['-i', clip_path] # Déjà découpé (avec le padding)
+                reused += 1
+            else:
+                s_start = max(0, segment_info[0] - pad)
+                s_duration = (segment_info[1] + pad) - s_start
+                cmd += ['-ss', str(s_start), '-t', str(s_duration), '-i', self.input_file]
+            # Chaque 'cut' est normalisé (60 fps, 9:16, audio stéréo 48 kHz) pour le concat
+            filters.append(f"[{j}:v]fps=60,crop=ih*9/16:ih,scale=1080:1920,setsar=1[v{j}]")
+            filters.append(f"[{j}:a]aformat=sample_rates=48000:channel_layouts=stereo[a{j}]")
+            concat_inputs += f"[v{j}][a{j}]"
+        filters.append(f"{concat_inputs}concat=n={len(tiktok_clips_list)}:v=1:a=1[v][a]")
+
+        cmd += [
+            '-filter_complex', ";".join(filters),
+            '-map', '[v]', '-map', '[a]',
+            '-c:v', 'libx264', '-preset', 'superfast', '-crf', '20',
+            '-c:a', 'aac', '-b:a', '192k',
+            '-movflags', '+faststart', '-loglevel', 'error',
+            output_filepath
+        ]
+        return cmd, reused
+
+    # --- 5. Fonctions "Helper" (Reprise + Cache + Chemins) ---
+
+    def cancel(self):
+        """
+        Arrête le traitement en cours (appelable depuis un autre thread): les processus
+        ffmpeg / workers sont tués immédiatement, le pipeline s'arrête à la prochaine étape.
+        """
+        if not self.supervisor.cancelled:
+            self.log("Arrêt demandé...")
+        self.supervisor.cancel()
+
+    def _run(self, cmd, timeout=None, **kwargs):
+        """
+        subprocess.run supervisé (délai + relance, arrêt) et instrumenté:
+        chaque appel ffmpeg/ffprobe est compté dans le rapport.
+        """
+        return self.report.run(cmd, runner=self.supervisor.run, timeout=timeout, **kwargs)
+
+    def _run_ffmpeg(self, cmd, duration, on_progress=None, parsers=(), timeout=None):
+        """
+        Job ffmpeg via l'exécuteur asynchrone (cf. ffjobs.py): progression en direct
+        ('on_progress', 0-1), stderr lu ligne par ligne ('parsers'), compté dans le rapport.
+        """
+        report, stage = self.report, self.report.current_stage()
+        return self.ffmpeg.run(cmd, duration=duration, on_progress=on_progress, parsers=parsers, timeout=timeout,
+                               on_exit=lambda returncode, wall: report.record_subprocess(cmd, wall, returncode, stage))
+
+    def _popen(self, cmd, **kwargs):
+        """subprocess.Popen supervisé et instrumenté (décodage audio en pipe)."""
+        return self.supervisor.popen(cmd, factory=self.report.popen, **kwargs)
+
+    def _job_timeout(self, media_duration):
+        """Délai d'un encodage qui produit 'media_duration' secondes de vidéo."""
+        return max(JOB_TIMEOUT_MIN, media_duration * JOB_TIMEOUT_FACTOR)
+
+    def _log_model_wait(self):
+        self.log(f"Modèle '{self.model_name}' occupé par une autre transcription (ex: arrêtée, "
+                 f"Whisper ne peut pas être interrompu): en attente de sa fin...")
+
+    def _wait_all(self, futures):
+        """
+        Résultats de 'futures' (dans l'ordre). L'attente reste réactive à l'arrêt: une
+        transcription Whisper dans ce processus ne peut pas être interrompue, on ne l'attend pas.
+        """
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    raise future.exception()
+            self.supervisor.check()
+        return [future.result() for future in futures]
+
+    def _timed(self, stage, compute):
+        """Exécute 'compute' dans une étape mesurée du rapport."""
+        with self.report.stage(stage):
+            return compute()
+
+    def _write_report(self):
+        """Écrit le rapport JSON du traitement (même en cas d'échec, pour le diagnostic)."""
+        self.report.close()
+        try:
+            os.makedirs(self.get_base_output_dir() or ".", exist_ok=True)
+            self.report.write(self.get_report_path())
+        except OSError as e:
+            self.log(f"Avertissement: impossible d'écrire le rapport ({e})")
+
+    def _open_checkpoint(self):
+        """Calcule l'empreinte de la source puis ouvre (ou reprend) le manifeste de reprise."""
+        try:
+            self.input_fingerprint = file_fingerprint(self.input_file)
+        except OSError as e:
+            self.log(f"Avertissement: cache et reprise désactivés ({e})")
+            return
+        if self.resume:
+            self.checkpoint = Checkpoint(self.get_work_dir(), self.input_fingerprint)
+
+    def seed_analysis(self, video_duration, transcript, scored_chunks):
+        """
+        Enregistre une analyse faite ailleurs (ex: mode live, cf. live.py) comme étapes
+        terminées du point de reprise: process() ne refait alors que la fusion,
+        la sélection et le rendu.
+        """
+        self._open_checkpoint()
+        if self.checkpoint is None:
+            raise Exception("Le point de reprise (resume=True) est requis pour réutiliser une analyse.")
+        self.checkpoint.set('duration', {}, video_duration)
+        self.checkpoint.set_file('transcription', self._speech_params(), TRANSCRIPT_SUFFIX,
+                                 Transcript.from_dict(transcript).save)
+        self.checkpoint.set('volume', self._volume_params(), [list(chunk) for chunk in scored_chunks])
+
+    def _speech_params(self):
+        """Helper: paramètres qui définissent la transcription (cache + reprise)."""
+        params = {'model': self.model_name, 'gate': self.transcription_gate, 'margin': self.gate_margin}
+        if self.transcription_gate == "hype":
+            # Zones transcrites = 'bouts' les mieux notés: elles dépendent du scoring
+            params.update(self._volume_params())
+        return params
+
+    def _volume_params(self):
+        """Helper: paramètres qui définissent l'analyse de volume (cache + reprise)."""
+        params = {'chunk_size': self.chunk_size}
+        if self.window_mode == "sliding" and audio.np is not None:
+            params['window_hop'] = self.window_hop
+        if not self.scoring.is_legacy:
+            params['scoring'] = self.scoring.signature()
+        return params
+
+    def _run_stage(self, stage, params, compute, load=None):
+        """
+        Étape 'reprenable': si elle a déjà été terminée (mêmes paramètres) lors d'un
+        traitement interrompu, son résultat est relu; sinon il est calculé puis enregistré.
+        'load': résultat binaire (Transcript), écrit par value.save() et relu par load(chemin).
+        """
+        self.supervisor.check()
+        if self.checkpoint is not None:
+            value = self._checkpoint_get(stage, params, load)
+            if value is not None:
+                self.log(f"Reprise: étape '{stage}' déjà terminée, résultat réutilisé.")
+                return value
+        value = compute()
+        if self.checkpoint is not None and (value is not None if load else value):
+            try:
+                if load:
+                    self.checkpoint.set_file(stage, params, TRANSCRIPT_SUFFIX, value.save)
+                else:
+                    self.checkpoint.set(stage, params, value)
+            except (OSError, TypeError, ValueError) as e:
+                self.log(f"Avertissement: impossible d'écrire le point de reprise ({e})")
+        return value
+
+    def _checkpoint_get(self, stage, params, load=None):
+        if load is None:
+            return self.checkpoint.get(stage, params)
+        path = self.checkpoint.get_path(stage, params, TRANSCRIPT_SUFFIX)
+        try:
+            return load(path) if path else None
+        except (OSError, ValueError):
+            return None
+
+    def _unit_done(self, stage, path, params, expected_duration):
+        """Vrai si l'unité (clip, Tiktok) est déjà faite ET que son fichier est valide."""
+        if self.checkpoint is None or not self.checkpoint.unit_done(stage, os.path.basename(path), params):
+            return False
+        return self._is_valid_media(path, expected_duration)
+
+    def _mark_unit(self, stage, path, params):
+        if self.checkpoint is not None:
+            try:
+                self.checkpoint.mark_unit(stage, os.path.basename(path), params)
+            except OSError as e:
+                self.log(f"Avertissement: impossible d'écrire le point de reprise ({e})")
+
+    def _is_valid_media(self, path, expected_duration, tolerance=1.0):
+        """Vérifie (ffprobe) qu'un fichier de sortie est lisible et a la durée attendue."""
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return False
+        cmd = [
+            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+            '-of', 'default=noprint_wrappers=1:nokey=1', path
+        ]
+        try:
+            result = self._run(cmd, capture_output=True, text=True, check=True, timeout=PROBE_TIMEOUT)
+            duration = float(result.stdout.strip())
+        except (subprocess.CalledProcessError, ValueError):
+            return False
+        return abs(duration - expected_duration) <= max(tolerance, expected_duration * 0.1)
+
+    def _cache_key(self, kind, **params):
+        """Clé de cache pour une analyse, ou None si le cache est désactivé."""
+        if self.cache is None or self.input_fingerprint is None:
+            return None
+        return self.cache.make_key(kind, self.input_fingerprint, **params)
+
+    def _cache_load(self, key, load=None):
+        """'load': entrée binaire (Transcript.load), sinon JSON."""
+        if not key:
+            return None
+        return self.cache.load_file(key, TRANSCRIPT_SUFFIX, load) if load else self.cache.load(key)
+
+    def _cache_save(self, key, data, binary=False):
+        """Écrit dans le cache sans jamais faire échouer le traitement ('binary': data.save())."""
+        if not key:
+            return
+        try:
+            if binary:
+                self.cache.save_file(key, TRANSCRIPT_SUFFIX, data.save)
+            else:
+                self.cache.save(key, data)
+        except (OSError, TypeError, ValueError) as e:
+            self.log(f"Avertissement: impossible d'écrire dans le cache ({e})")
+
+    def _clip_params(self, segment_info, pad):
+        """Helper: paramètres qui définissent un clip (pour la reprise)."""
+        return {'start': segment_info[0], 'end': segment_info[1], 'pad': pad, 'mode': self.extraction_mode}
+
+    def _padded_duration(self, segment_info, pad):
+        """Helper: durée réelle d'un clip une fois le padding appliqué."""
+        return (segment_info[1] + pad) - max(0, segment_info[0] - pad)
+
+    def _clip_key(self, segment_info, pad, mode):
+        """Helper: clé 'ClipStore' d'un segment, pour la source et le mode réellement utilisé."""
+        return ClipStore.make_key(self.input_file, segment_info[0], segment_info[1], pad, mode)
+
+    def _tiktok_key(self, tiktok_clips_list, pad):
+        """Helper: clé 'ClipStore' d'un Tiktok (même source, mêmes 'cuts')."""
+        cuts = tuple((round(seg[0], 3), round(seg[1], 3)) for seg in tiktok_clips_list)
+        return ('tiktok', os.path.abspath(self.input_file), cuts, round(pad, 3))
+
+    def _stash_dir(self, directory):
+        """
+        Re-plan: met de côté un dossier de sortie ('<dossier>_prev'). Les fichiers encore
+        utiles y sont repris (ClipStore), le reste disparaît avec lui à la fin du rendu.
+        """
+        if not os.path.isdir(directory) or not len(self.clip_store):
+            return None
+        stash = f"{directory}_prev"
+        shutil.rmtree(stash, ignore_errors=True)
+        os.replace(directory, stash)
+        self.clip_store.relocate(directory, stash)
+        return stash
+
+    def get_extraction_budget(self):
+        """
+        Helper: (encodages simultanés, threads x264 par encodage).
+        Par défaut ~4 threads par encodage: x264 'superfast' passe mal à l'échelle au-delà.
+        """
+        cores = os.cpu_count() or 1
+        workers = self.extract_workers or max(1, cores // 4)
+        threads = self.encoder_threads or max(1, cores // workers)
+        return workers, threads
 
     def get_output_name_no_ext(self):
         """Helper: 'C:/vid/highlight.mp4' -> 'highlight'"""
@@ -545,6 +1434,14 @@ class VideoProcessor:
         """Helper: 'C:/vid/highlight.mp4' -> 'C:/vid'"""
         return os.path.dirname(self.output_file)
 
+    def get_report_path(self):
+        """Rapport d'exécution: 'C:/vid/highlight_report.json'"""
+        return os.path.join(self.get_base_output_dir(), f"{self.get_output_name_no_ext()}_report.json")
+
+    def get_work_dir(self):
+        """Dossier de reprise: 'C:/vid/highlight_work'"""
+        return os.path.join(self.get_base_output_dir(), f"{self.get_output_name_no_ext()}_work")
+
     def get_clips_dir(self):
         """Dossier Dérushage: 'C:/vid/highlight_clips'"""
         return os.path.join(self.get_base_output_dir(), f"{self.get_output_name_no_ext()}_clips")
@@ -0,0 +1,262 @@
+import re
+import subprocess
+
+import audio
+
+LEGACY_WEIGHTS = {'volume': 1.0} # Formule historique seule (comportement par défaut)
+SILENCE_DB = -40.0               # Un 'bout' dont le pic est sous -40 dB n'est jamais retenu
+SPEECH_RATE_SMOOTHING = 1.0      # Débit de parole lissé sur 1 s
+SCENE_SMOOTHING = 2.0            # Changements de plan lissés sur 2 s
+SCENE_THRESHOLD = 0.3            # Seuil du filtre 'scene' de ffmpeg
+
+
+# --- 1. Signaux (un tableau NumPy par frame de 100 ms) ---
+
+_FEATURES = {} # nom -> (fonction(contexte) -> np.array[n_frames], besoin)
+
+
+def register_feature(name, needs=None):
+    """
+    Décorateur: ajoute un signal au moteur de scoring. La fonction reçoit un
+    FeatureContext et retourne une valeur par frame. 'needs' indique une donnée
+    supplémentaire: 'spectral' (flux calculé au décodage), 'scene' (passe vidéo)
+    ou 'words' (transcription Whisper, ajoutée après coup par add_speech).
+    """
+    def decorator(fn):
+        _FEATURES[name] = (fn, needs)
+        return fn
+    return decorator
+
+
+class FeatureContext:
+    """
+    Données disponibles pour calculer les signaux d'une vidéo. Sans niveaux audio
+    (levels=None), seule la grille des frames est connue (signaux issus de Whisper).
+    """
+    def __init__(self, levels, scene_times=None, words=None, n_frames=None, frame_duration=audio.FRAME_DURATION):
+        self.levels = levels            # audio.FrameLevels, ou None
+        self.scene_times = scene_times  # Instants des changements de plan (s), ou None
+        self.words = words              # Transcript (mots Whisper), ou None
+        self.n_frames = len(levels) if levels is not None else n_frames
+        self.frame_duration = levels.frame_duration if levels is not None else frame_duration
+
+    def event_rate(self, times, smoothing):
+        """Événements par seconde sur la grille des frames, lissés sur 'smoothing' secondes."""
+        np = audio.np
+        counts = np.zeros(self.n_frames)
+        if times is not None and len(times) and self.n_frames:
+            idx = np.clip((np.asarray(times) / self.frame_duration).astype(np.int64), 0, self.n_frames - 1)
+            counts = np.bincount(idx, minlength=self.n_frames).astype(np.float64)
+        width = max(1, int(round(smoothing / self.frame_duration)))
+        return np.convolve(counts, np.ones(width) / (width * self.frame_duration), mode='same')
+
+
+@register_feature('rms')
+def rms_envelope(ctx):
+    """Niveau RMS (dB) de chaque frame."""
+    np = audio.np
+    return audio.to_db(np.sqrt(ctx.levels.sumsq / np.maximum(ctx.levels.counts, 1)))
+
+
+@register_feature('dynamics')
+def peak_to_mean(ctx):
+    """Écart pic / RMS (dB): les cris et impacts ressortent d'un fond régulier."""
+    return audio.to_db(ctx.levels.peak.astype(audio.np.float64)) - rms_envelope(ctx)
+
+
+@register_feature('flux', needs='spectral')
+def spectral_flux(ctx):
+    """Flux spectral (changements brusques du timbre), calculé pendant le décodage."""
+    if ctx.levels.flux is None:
+        return audio.np.zeros(ctx.n_frames)
+    return ctx.levels.flux
+
+
+@register_feature('speech_rate', needs='words')
+def speech_rate(ctx):
+    """Mots par seconde (milieu de chaque mot Whisper)."""
+    times = None if ctx.words is None else (ctx.words.word_starts + ctx.words.word_ends) / 2
+    return ctx.event_rate(times, SPEECH_RATE_SMOOTHING)
+
+
+@register_feature('scene', needs='scene')
+def scene_rate(ctx):
+    """Changements de plan par seconde (vidéo)."""
+    return ctx.event_rate(ctx.scene_times, SCENE_SMOOTHING)
+
+
+def scene_change_times(input_file, threshold=SCENE_THRESHOLD, run=subprocess.run):
+    """
+    Instants des changements de plan (filtre 'scene' de ffmpeg). L'image est réduite
+    avant l'analyse: c'est une passe vidéo à part, mais légère.
+    """
+    cmd = [
+        'ffmpeg', '-hide_banner', '-nostdin', '-i', input_file, '-an',
+        '-vf', f"scale=160:-2,select='gt(scene,{threshold})',showinfo",
+        '-f', 'null', '-'
+    ]
+    result = run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True)
+    return [float(t) for t in re.findall(r"pts_time:\s*(-?\d+\.?\d*)", result.stderr)]
+
+
+# --- 2. Combinaison ---
+
+def _rank(values):
+    """Rang centile dans [0, 1] (ex-aequo = rang moyen): les signaux deviennent comparables."""
+    np = audio.np
+    n = len(values)
+    if n <= 1:
+        return np.full(n, 0.5)
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    average_rank = np.cumsum(counts) - (counts + 1) / 2
+    return average_rank[inverse] / (n - 1)
+
+
+def _chunk_means(frame_values, ctx, chunks):
+    """Moyenne d'un signal par frame sur chaque (start, end), via sommes préfixes."""
+    np = audio.np
+    bounds = np.array(chunks, dtype=np.float64).reshape(-1, 2)
+    i0 = np.clip(np.round(bounds[:, 0] / ctx.frame_duration).astype(np.int64), 0, ctx.n_frames)
+    i1 = np.clip(np.round(bounds[:, 1] / ctx.frame_duration).astype(np.int64), i0, ctx.n_frames)
+    cum = np.concatenate(([0.0], np.cumsum(frame_values, dtype=np.float64)))
+    lengths = i1 - i0
+    return np.where(lengths > 0, (cum[i1] - cum[i0]) / np.maximum(lengths, 1), 0.0)
+
+
+class ScoringEngine:
+    """
+    Moteur de scoring multi-signaux: chaque signal est calculé par frame (100 ms),
+    moyenné par 'bout', converti en rang centile puis pondéré:
+        score = durée * somme(poids * rang) / somme(poids)
+    'volume' est la formule historique (pic / moyenne, cf. audio.volume_scores); avec
+    les poids par défaut ({'volume': 1}) les scores sont identiques à l'ancienne méthode.
+    """
+    def __init__(self, weights=None):
+        weights = dict(LEGACY_WEIGHTS if weights is None else weights)
+        unknown = set(weights) - set(_FEATURES) - {'volume'}
+        if unknown:
+            raise ValueError(f"Signal(s) de scoring inconnu(s): {', '.join(sorted(unknown))} "
+                             f"(disponibles: {', '.join(self.available())})")
+        self.weights = {name: float(w) for name, w in weights.items() if w}
+        if not self.weights:
+            raise ValueError("Au moins un signal de scoring doit avoir un poids non nul.")
+
+    @staticmethod
+    def available():
+        return ['volume'] + sorted(_FEATURES)
+
+    def _needs(self, need):
+        return any(_FEATURES[name][1] == need for name in self.weights if name in _FEATURES)
+
+    @property
+    def is_legacy(self):
+        return set(self.weights) == {'volume'}
+
+    @property
+    def needs_spectral(self):
+        return self._needs('spectral')
+
+    @property
+    def needs_scene(self):
+        return self._needs('scene')
+
+    @property
+    def needs_words(self):
+        return self._needs('words')
+
+    def signature(self):
+        """Représentation stable des poids (clés de cache / de reprise)."""
+        return sorted(self.weights.items())
+
+    def frame_features(self, ctx, include_words=False):
+        """{signal: np.array[n_frames]} pour les signaux pondérés (hors 'volume')."""
+        return {
+            name: fn(ctx)
+            for name, (fn, needs) in _FEATURES.items()
+            if name in self.weights and (include_words or needs != 'words')
+        }
+
+    def score_chunks(self, chunks, levels, scene_times=None):
+        """
+        Scores des 'bouts' (np.array), sans les signaux qui dépendent de la transcription
+        (ajoutés ensuite par add_speech, une fois Whisper terminé).
+        """
+        np = audio.np
+        durations = np.array([e - s for s, e in chunks], dtype=np.float64)
+        max_db, mean_db = audio.chunk_levels(levels, chunks)
+        legacy = audio.volume_scores(durations, max_db, mean_db)
+        if self.is_legacy or len(chunks) == 0:
+            return legacy
+
+        combined = np.zeros(len(chunks))
+        if 'volume' in self.weights:
+            per_second = np.where(durations > 0, legacy / np.maximum(durations, 1e-9), 0.0)
+            combined += self.weights['volume'] * _rank(per_second)
+        ctx = FeatureContext(levels, scene_times=scene_times)
+        for name, values in self.frame_features(ctx).items():
+            combined += self.weights[name] * _rank(_chunk_means(values, ctx, chunks))
+
+        scores = durations * combined / sum(self.weights.values())
+        # Un 'bout' non silencieux garde un score > 0 (même au rang 0, ou si seul
+        # le débit de parole est pondéré): il reste candidat pour add_speech
+        return np.where(max_db <= SILENCE_DB, 0.0, np.maximum(scores, durations * 1e-6))
+
+    def add_speech(self, scored_chunks, transcript):
+        """
+        Ajoute aux scores (start, end, durée, score) la part des signaux issus de Whisper
+        (débit de parole, d'après le Transcript). Retourne la liste re-triée par score.
+        """
+        np = audio.np
+        speech_weights = {n: w for n, w in self.weights.items() if n in _FEATURES and _FEATURES[n][1] == 'words'}
+        if not speech_weights or not scored_chunks or np is None:
+            return scored_chunks
+
+        end = max(c[1] for c in scored_chunks)
+        ctx = FeatureContext(None, words=transcript, n_frames=int(np.ceil(end / audio.FRAME_DURATION)))
+
+        chunks = [(c[0], c[1]) for c in scored_chunks]
+        durations = np.array([c[2] for c in scored_chunks], dtype=np.float64)
+        extra = np.zeros(len(chunks))
+        for name, w in speech_weights.items():
+            extra += w * _rank(_chunk_means(_FEATURES[name][0](ctx), ctx, chunks))
+        extra = durations * extra / sum(self.weights.values())
+
+        rescored = [(c[0], c[1], c[2], float(c[3] + x)) for c, x in zip(scored_chunks, extra)]
+        rescored.sort(key=lambda x: x[3], reverse=True)
+        return rescored
+
+
+# --- 3. Fenêtres glissantes ---
+
+def pick_peaks(scores, radius):
+    """
+    Choix des 'moments' parmi des fenêtres glissantes régulières (triées par début):
+    par score décroissant, on garde une fenêtre et on écarte ses voisines à moins de
+    'radius' indices (celles qui la chevauchent). Les fenêtres retenues ne se
+    chevauchent donc pas; un long passage intense donne plusieurs fenêtres contiguës.
+    Retourne les indices retenus (score > 0), par score décroissant.
+    """
+    np = audio.np
+    scores = np.asarray(scores, dtype=np.float64)
+    blocked = np.zeros(len(scores), dtype=bool)
+    chosen = []
+    for i in np.argsort(-scores, kind='stable'):
+        if scores[i] <= 0:
+            break
+        if blocked[i]:
+            continue
+        chosen.append(int(i))
+        blocked[max(0, i - radius):i + radius + 1] = True
+    return chosen
+
+
+def parse_weights(text):
+    """'rms=1,flux=0.5,speech_rate=1' -> {'rms': 1.0, 'flux': 0.5, 'speech_rate': 1.0}"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, value = item.partition('=')
+        try:
+            weights[name.strip()] = float(value) if value else 1.0
+        except ValueError:
+            raise ValueError(f"Poids invalide pour '{name.strip()}': '{value}'") from None
+    return weights
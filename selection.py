@@ -0,0 +1,129 @@
+import math
+import time
+
+# DÉPENDANCE OPTIONNELLE: sans NumPy, la sélection retombe sur le remplissage glouton.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RESOLUTION = 0.5          # Les durées sont comptées par pas de 0.5 s (arrondies au-dessus)
+TIME_BUDGET = 2.0         # Au-delà de 2 s de calcul, on retombe sur le glouton
+MAX_CELLS = 50_000_000    # Taille max. de la table (segments x pas de durée), ~50 Mo
+
+
+# --- 1. Solveurs ---
+
+def greedy_fill(durations, scores, capacity):
+    """
+    Remplissage glouton: par score décroissant, on prend chaque segment qui rentre
+    encore (sans jamais dépasser 'capacity'). Retourne les indices choisis.
+    """
+    order = sorted(range(len(durations)), key=lambda i: scores[i], reverse=True)
+    chosen, total = [], 0.0
+    for i in order:
+        if total + durations[i] <= capacity:
+            chosen.append(i)
+            total += durations[i]
+    return chosen
+
+
+def knapsack(durations, scores, capacity, resolution=RESOLUTION, time_budget=TIME_BUDGET):
+    """
+    Sac à dos 0/1 (programmation dynamique vectorisée): indices qui maximisent la somme
+    des scores, avec une durée totale <= capacity. Retourne None si le problème est trop
+    gros ou dépasse 'time_budget' (l'appelant retombe alors sur greedy_fill).
+    """
+    if np is None:
+        return None
+    cells = int(capacity / resolution + 1e-9)
+    n = len(durations)
+    if n == 0 or cells <= 0:
+        return []
+    if n * (cells + 1) > MAX_CELLS:
+        return None
+
+    # Durées arrondies AU-DESSUS: la durée réelle choisie ne dépasse jamais la cible
+    weights = [int(math.ceil(d / resolution - 1e-9)) for d in durations]
+    best = np.zeros(cells + 1)                       # best[c] = score max pour une durée <= c pas
+    taken = np.zeros((n, cells + 1), dtype=bool)     # taken[i, c]: le segment i améliore best[c]
+    t0 = time.perf_counter()
+    for i, (w, value) in enumerate(zip(weights, scores)):
+        if w > cells:
+            continue
+        candidate = best[:cells + 1 - w] + value
+        better = candidate > best[w:]
+        taken[i, w:] = better
+        best[w:] = np.where(better, candidate, best[w:])
+        if time.perf_counter() - t0 > time_budget:
+            return None
+
+    chosen = []
+    c = cells
+    for i in range(n - 1, -1, -1):
+        if taken[i, c]:
+            chosen.append(i)
+            c -= weights[i]
+    chosen.reverse()
+    return chosen
+
+
+def solve(durations, scores, capacity, resolution=RESOLUTION, time_budget=TIME_BUDGET):
+    """(indices choisis, méthode): sac à dos si possible, sinon glouton."""
+    chosen = knapsack(durations, scores, capacity, resolution, time_budget)
+    if chosen is None:
+        return greedy_fill(durations, scores, capacity), "glouton"
+    return chosen, "optimal"
+
+
+# --- 2. Highlight + Tiktoks ---
+
+def select_segments(segments, target_duration, log=None):
+    """
+    Highlight: segments (start, end, durée, score) dont la somme des scores est
+    maximale sans dépasser 'target_duration'. Retourne des (start, end, durée)
+    dans l'ordre chronologique.
+    """
+    durations = [seg[2] for seg in segments]
+    scores = [seg[3] for seg in segments]
+    chosen, method = solve(durations, scores, target_duration)
+    if not chosen and segments:
+        # Tous plus longs que la cible: comme avant, on garde au moins le meilleur 'moment'
+        chosen, method = [max(range(len(segments)), key=lambda i: scores[i])], "meilleur segment seul"
+    if log:
+        total = sum(durations[i] for i in chosen)
+        log(f"Sélection ({method}): {len(chosen)} segments, {total/60:.1f} min "
+            f"pour {target_duration/60:.1f} min visées.")
+    selected = [(segments[i][0], segments[i][1], segments[i][2]) for i in chosen]
+    selected.sort(key=lambda x: x[0])
+    return selected
+
+
+def pack_tiktoks(segments, count, max_duration=60):
+    """
+    Tiktoks: chacun part du meilleur segment restant, puis est complété (sac à dos)
+    avec les segments qui maximisent le score sans dépasser 'max_duration'.
+    Un segment ne sert qu'une fois. Retourne une liste de listes (ordre chronologique).
+    """
+    ranked = sorted(segments, key=lambda seg: seg[3], reverse=True)
+    used = [False] * len(ranked)
+    tiktoks = []
+    for _ in range(count):
+        seed = next((i for i, u in enumerate(used) if not u), None)
+        if seed is None:
+            break # Il n'y a plus de segments à utiliser
+        used[seed] = True
+        clips = [ranked[seed]]
+
+        remaining = max_duration - ranked[seed][2]
+        if remaining > 0:
+            pool = [i for i, u in enumerate(used) if not u and ranked[i][2] <= remaining]
+            chosen, _ = solve([ranked[i][2] for i in pool], [ranked[i][3] for i in pool], remaining)
+            for j in chosen:
+                used[pool[j]] = True
+                clips.append(ranked[pool[j]])
+
+        # IMPORTANT: Trier les clips par ordre chronologique
+        clips.sort(key=lambda x: x[0])
+        tiktoks.append(clips)
+    return tiktoks
@@ -0,0 +1,286 @@
+import os
+import json
+import subprocess
+
+# Codecs que l'on sait recopier tels quels dans un .mp4 (sortie du dérushage)
+COPYABLE_VIDEO_CODECS = ('h264',)
+COPYABLE_AUDIO_CODECS = ('aac',)
+KEYFRAME_TOLERANCE = 0.05 # Un keyframe à moins de 50 ms du début: pas de tête à ré-encoder
+DEFAULT_FRAME_DURATION = 1 / 60 # Si la cadence de la source est inconnue
+JOIN_LEAD = 0.5           # Vérification d'un raccord: décodage de 0.5 s avant...
+JOIN_WINDOW = 2.0         # ...à 2 s après (premier GOP du morceau suivant)
+# Erreurs du décodeur H.264 typiques d'un raccord raté (SPS/PPS absents ou incompatibles).
+# Les autres messages (ex: AAC ou horodatages d'un enregistrement Twitch) sont ignorés.
+JOIN_ERRORS = ('non-existing PPS', 'non-existing SPS', 'PPS id out of range', 'SPS id out of range',
+               'decode_slice_header error', 'no frame!', 'missing picture in access unit')
+
+X264_PROFILES = {
+    'Baseline': 'baseline', 'Constrained Baseline': 'baseline',
+    'Main': 'main', 'High': 'high', 'High 10': 'high10',
+    'High 4:2:2': 'high422', 'High 4:4:4 Predictive': 'high444',
+}
+
+
+class StreamInfo:
+    """Caractéristiques des flux de la source, nécessaires pour un 'smart cut' compatible."""
+    def __init__(self, video, audio, start_time=0.0):
+        self.video = video or {}
+        self.audio = audio or {}
+        self.start_time = start_time # Les pts des paquets sont décalés de start_time (ex: MPEG-TS)
+
+    @property
+    def can_stream_copy(self):
+        return (self.video.get('codec_name') in COPYABLE_VIDEO_CODECS
+                and self.audio.get('codec_name') in COPYABLE_AUDIO_CODECS)
+
+    def video_encode_args(self, mp4=True):
+        """Options x264 qui reproduisent au mieux le flux source (pour raccorder tête + copie)."""
+        args = ['-c:v', 'libx264', '-preset', 'superfast', '-crf', '18']
+        if self.video.get('pix_fmt'):
+            args += ['-pix_fmt', self.video['pix_fmt']]
+        profile = X264_PROFILES.get(self.video.get('profile'))
+        if profile:
+            args += ['-profile:v', profile]
+        level = self.video.get('level')
+        if isinstance(level, int) and level > 0:
+            args += ['-level', f"{level / 10:.1f}"]
+        rate = self.video.get('r_frame_rate')
+        if rate and rate != '0/0':
+            args += ['-r', rate]
+        if mp4 and self.video.get('time_base'): # Option du muxer MP4 (refusée en MPEG-TS)
+            args += ['-video_track_timescale', self.video['time_base'].split('/')[-1]]
+        return args
+
+    @property
+    def frame_duration(self):
+        """Durée d'une image de la source (secondes)."""
+        num, _, den = str(self.video.get('r_frame_rate') or '').partition('/')
+        try:
+            rate = float(num) / float(den or 1)
+        except (ValueError, ZeroDivisionError):
+            rate = 0
+        return 1 / rate if rate > 0 else DEFAULT_FRAME_DURATION
+
+    def audio_encode_args(self):
+        args = ['-c:a', 'aac', '-b:a', '192k']
+        if self.audio.get('sample_rate'):
+            args += ['-ar', str(self.audio['sample_rate'])]
+        if self.audio.get('channels'):
+            args += ['-ac', str(self.audio['channels'])]
+        return args
+
+
+def probe_streams(input_file, run=subprocess.run):
+    """Lit (ffprobe) le codec, profil, format de pixel, cadence... des flux audio/vidéo."""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,profile,level,pix_fmt,'
+                         'r_frame_rate,time_base,sample_rate,channels:format=start_time',
+        '-of', 'json', input_file
+    ]
+    result = run(cmd, capture_output=True, text=True, check=True)
+    data = json.loads(result.stdout)
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    try:
+        start_time = float(data.get('format', {}).get('start_time', 0.0))
+    except (TypeError, ValueError):
+        start_time = 0.0
+    return StreamInfo(video, audio, start_time)
+
+
+def keyframes_between(input_file, start, end, offset=0.0, run=subprocess.run):
+    """
+    Instants des keyframes vidéo dans [start, end] (timeline de la vidéo, qui commence à 0).
+    Lit uniquement les paquets (pas de décodage), sur l'intervalle demandé.
+    """
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-read_intervals', f"{max(0, start + offset)}%{end + offset}",
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0', input_file
+    ]
+    result = run(cmd, capture_output=True, text=True, check=True)
+    keyframes = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(',')
+        if len(parts) < 2 or 'K' not in parts[1]:
+            continue
+        try:
+            t = float(parts[0]) - offset
+        except ValueError:
+            continue
+        if start <= t <= end:
+            keyframes.append(t)
+    return sorted(keyframes)
+
+
+# Les morceaux sont écrits en MPEG-TS / Annex-B: les SPS/PPS sont dans le flux (à chaque
+# keyframe), donc une tête encodée par x264 et une queue recopiée de la source restent
+# décodables une fois recollées (en MP4, seul l'avcC du premier morceau serait gardé).
+TS_ARGS = ['-bsf:v', 'h264_mp4toannexb', '-f', 'mpegts']
+
+
+def _encode_cmd(input_file, start, duration, output, info, threads, ts=False):
+    cmd = ['ffmpeg', '-y', '-ss', str(start), '-t', str(duration), '-i', input_file]
+    cmd += info.video_encode_args(mp4=not ts)
+    if threads:
+        cmd += ['-threads', str(threads)]
+    cmd += info.audio_encode_args()
+    if ts:
+        cmd += TS_ARGS
+    cmd += ['-loglevel', 'error', output]
+    return cmd
+
+
+def _concat_ts_cmd(list_path, output):
+    """Recolle des morceaux MPEG-TS (liste du demuxer concat) en un MP4, sans ré-encodage."""
+    return [
+        'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy', '-bsf:a', 'aac_adtstoasc',
+        '-movflags', '+faststart', '-loglevel', 'error', output
+    ]
+
+
+def _write_list(list_path, parts):
+    with open(list_path, "w", encoding='utf-8') as f:
+        for part in parts:
+            f.write(f"file '{os.path.abspath(part)}'\n")
+
+
+def verify(path, run=subprocess.run, start=0.0, duration=None):
+    """
+    Décode la vidéo de 'path' sur [start, start + duration] (tout le fichier si None):
+    False si ffmpeg échoue ou si le décodeur signale un raccord H.264 raté (JOIN_ERRORS).
+    """
+    cmd = ['ffmpeg', '-v', 'error']
+    if start > 0:
+        cmd += ['-ss', f"{start:.6f}"]
+    cmd += ['-i', path]
+    if duration is not None:
+        cmd += ['-t', f"{duration:.6f}"]
+    cmd += ['-map', '0:v:0', '-f', 'null', '-']
+    try:
+        result = run(cmd, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    except subprocess.CalledProcessError:
+        return False
+    if result.returncode != 0:
+        return False
+    return not any(error in result.stderr for error in JOIN_ERRORS)
+
+
+def verify_joins(path, joins, run=subprocess.run):
+    """
+    Vérifie uniquement les raccords de 'path' (instants en secondes), pas tout le fichier.
+    'joins' None (raccords inconnus): tout le fichier est décodé.
+    """
+    if joins is None:
+        return verify(path, run)
+    return all(verify(path, run, start=max(0.0, t - JOIN_LEAD), duration=JOIN_LEAD + JOIN_WINDOW)
+               for t in joins)
+
+
+def media_duration(path, run=subprocess.run):
+    """Durée (ffprobe, sans décodage) d'un fichier."""
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+           '-of', 'default=noprint_wrappers=1:nokey=1', path]
+    result = run(cmd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip())
+
+
+def concat_clips(clips, output, run=subprocess.run):
+    """
+    Concatène sans ré-encodage des clips MP4 dont les paramètres H.264 peuvent différer
+    (têtes x264 + queues de la source): chaque clip passe en MPEG-TS (SPS/PPS dans le
+    flux), puis les morceaux sont recollés en un MP4.
+    Retourne les instants des raccords entre clips (pour verify_joins), None s'ils sont inconnus.
+    """
+    base = os.path.splitext(output)[0]
+    list_path = f"{base}.parts.txt"
+    parts = []
+    try:
+        for i, clip in enumerate(clips):
+            part = f"{base}.part{i:04d}.ts"
+            parts.append(part)
+            run(['ffmpeg', '-y', '-i', clip, '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy']
+                + TS_ARGS + ['-loglevel', 'error', part],
+                check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
+        _write_list(list_path, parts)
+        run(_concat_ts_cmd(list_path, output),
+            check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    finally:
+        for path in parts + [list_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    joins = []
+    elapsed = 0.0
+    for clip in clips[:-1]:
+        try:
+            elapsed += media_duration(clip, run)
+        except ValueError: # Durée 'N/A'
+            return None
+        joins.append(elapsed)
+    return joins
+
+
+def smart_cut(input_file, start, end, output, info, threads=None, run=subprocess.run):
+    """
+    Extrait [start, end] en ne ré-encodant que la 'tête' (du début jusqu'au premier
+    keyframe), le reste étant recopié tel quel (-c copy). Sans keyframe utilisable
+    dans l'intervalle, tout le segment est ré-encodé avec les paramètres de la source
+    (pour rester concaténable avec les autres clips). Le raccord tête / queue est vérifié
+    (décodage de la tête et du premier GOP recopié): illisible, le clip est ré-encodé.
+    Retourne le mode réellement utilisé: 'smartcut', 'copy' ou 'reencode'.
+    """
+    keyframes = keyframes_between(input_file, start, end, info.start_time, run)
+    cut = next((k for k in keyframes if k >= start), None)
+
+    if cut is None or cut >= end - KEYFRAME_TOLERANCE:
+        return _reencode(input_file, start, end, output, info, threads, run)
+
+    base = os.path.splitext(output)[0]
+    head_path = f"{base}.head.ts"
+    tail_path = f"{base}.tail.ts"
+    list_path = f"{base}.parts.txt"
+    parts = []
+    try:
+        if cut - start > KEYFRAME_TOLERANCE:
+            run(_encode_cmd(input_file, start, cut - start, head_path, info, threads, ts=True),
+                check=True, capture_output=True, text=True)
+            parts.append(head_path)
+
+        # pts_time est arrondi à la microseconde par ffprobe: viser un demi-frame après le
+        # keyframe, pour que la recherche tombe bien sur lui et pas sur le GOP précédent
+        seek = cut + info.frame_duration / 2
+        cmd_tail = [
+            'ffmpeg', '-y', '-ss', f"{seek:.6f}", '-i', input_file, '-t', str(end - cut),
+            '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy',
+            '-avoid_negative_ts', 'make_zero'
+        ] + TS_ARGS + ['-loglevel', 'error', tail_path]
+        run(cmd_tail, check=True, capture_output=True, text=True)
+        parts.append(tail_path)
+
+        _write_list(list_path, parts)
+        run(_concat_ts_cmd(list_path, output),
+            check=True, capture_output=True, text=True, encoding='utf-8', errors='replace')
+    finally:
+        for path in (head_path, tail_path, list_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    if len(parts) == 1:
+        return 'copy' # Pas de raccord: la queue est la source, telle quelle
+    next_keyframe = next((k for k in keyframes if k > cut + KEYFRAME_TOLERANCE), end)
+    if not verify(output, run, duration=min(end, next_keyframe + JOIN_LEAD) - start):
+        # Raccord illisible (source atypique): le clip est entièrement ré-encodé
+        return _reencode(input_file, start, end, output, info, threads, run)
+    return 'smartcut'
+
+
+def _reencode(input_file, start, end, output, info, threads, run):
+    """Ré-encode tout [start, end] avec les paramètres de la source (reste concaténable)."""
+    run(_encode_cmd(input_file, start, end - start, output, info, threads),
+        check=True, capture_output=True, text=True)
+    return 'reencode'
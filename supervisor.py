@@ -0,0 +1,193 @@
+import os
+import signal
+import threading
+import subprocess
+import weakref
+from contextlib import contextmanager
+
+# DÉPENDANCE OPTIONNELLE: psutil trouve tous les descendants d'un processus.
+# Sans lui: groupe de processus (POSIX) ou 'taskkill /T' (Windows).
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_RETRIES = 1 # Un job qui dépasse son délai est relancé une fois
+
+_supervisors = weakref.WeakSet() # Pour cancel_all() (ex: Ctrl+C dans la CLI)
+
+
+class Cancelled(Exception):
+    """Le traitement a été arrêté (bouton 'Arrêter', fermeture de la fenêtre, Ctrl+C)."""
+
+
+class JobTimeout(subprocess.CalledProcessError):
+    """
+    Un job a dépassé son délai (après les relances). Hérite de CalledProcessError:
+    il est traité comme un échec ffmpeg ordinaire par le code appelant.
+    """
+    def __init__(self, cmd, timeout):
+        super().__init__(-1, cmd, stderr=f"Délai dépassé ({timeout:.0f}s), processus arrêté.")
+        self.timeout = timeout
+
+
+def kill_tree(proc):
+    """Tue un processus ET ses descendants (ex: workers d'un pool, sous-processus de ffmpeg)."""
+    if proc.poll() is not None:
+        return
+    if psutil is not None:
+        try:
+            parent = psutil.Process(proc.pid)
+            for child in parent.children(recursive=True):
+                child.kill()
+        except psutil.Error:
+            pass
+    elif os.name == 'nt':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(proc.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL) # Lancé dans son propre groupe (cf. popen)
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+class ProcessSupervisor:
+    """
+    Superviseur des processus enfants d'un traitement (ffmpeg, ffprobe, workers Whisper):
+    - chaque enfant est suivi tant qu'il tourne;
+    - run(): délai par job, puis arrêt de tout l'arbre et relance ('retries' fois);
+    - cancel(): tue tout de suite tous les enfants suivis; tout nouveau lancement
+      (et check()) lève Cancelled, ce qui vide rapidement les pools de jobs.
+    """
+    def __init__(self, retries=DEFAULT_RETRIES, log=None):
+        self.retries = retries
+        self.log = log
+        self._children = set()
+        self._hooks = set()
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        _supervisors.add(self)
+
+    # --- Annulation ---
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Arrête le traitement: tue tous les processus suivis (et leurs descendants)."""
+        self._cancelled.set()
+        with self._lock:
+            children = list(self._children)
+            hooks = list(self._hooks)
+        for proc in children:
+            kill_tree(proc)
+        for hook in hooks:
+            try:
+                hook()
+            except Exception:
+                pass
+
+    def reset(self):
+        """Nouveau traitement: l'annulation précédente est oubliée."""
+        self._cancelled.clear()
+
+    def check(self):
+        """Point d'arrêt entre deux étapes: lève Cancelled si le traitement a été arrêté."""
+        if self._cancelled.is_set():
+            raise Cancelled("Traitement arrêté.")
+
+    @contextmanager
+    def on_cancel(self, hook):
+        """
+        'hook' est appelé si cancel() survient pendant le bloc (ex: arrêt d'un
+        ProcessPoolExecutor, dont les processus ne passent pas par popen).
+        """
+        with self._lock:
+            self._hooks.add(hook)
+        try:
+            if self.cancelled:
+                hook()
+            yield
+        finally:
+            with self._lock:
+                self._hooks.discard(hook)
+
+    # --- Lancement ---
+
+    def popen(self, cmd, factory=subprocess.Popen, **kwargs):
+        """
+        Lance un processus suivi, dans son propre groupe (pour pouvoir tuer tout l'arbre).
+        'factory' permet un Popen instrumenté (cf. metrics.RunReport.popen).
+        """
+        self.check()
+        if os.name == 'nt':
+            kwargs['creationflags'] = kwargs.get('creationflags', 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs.setdefault('start_new_session', True)
+        return self.adopt(factory(cmd, **kwargs))
+
+    def adopt(self, proc):
+        """
+        Suit un processus lancé ailleurs (ex: ffjobs, en asyncio): tout objet avec
+        poll() / kill() / pid. À libérer avec release() quand il est terminé.
+        """
+        with self._lock:
+            self._children = {p for p in self._children if p.poll() is None}
+            self._children.add(proc)
+        if self.cancelled: # cancel() est arrivé pendant le lancement
+            kill_tree(proc)
+        return proc
+
+    def release(self, proc):
+        with self._lock:
+            self._children.discard(proc)
+
+    def run(self, cmd, timeout=None, retries=None, input=None, capture_output=False, check=False, **kwargs):
+        """
+        Équivalent de subprocess.run, supervisé. Au-delà de 'timeout' secondes, l'arbre
+        du processus est tué et le job relancé ('retries' fois), puis JobTimeout est levée.
+        """
+        retries = self.retries if retries is None else retries
+        if capture_output:
+            kwargs['stdout'] = subprocess.PIPE
+            kwargs['stderr'] = subprocess.PIPE
+        if input is not None:
+            kwargs['stdin'] = subprocess.PIPE
+
+        for attempt in range(retries + 1):
+            proc = self.popen(cmd, **kwargs)
+            try:
+                stdout, stderr = proc.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                kill_tree(proc)
+                proc.communicate()
+                self.check()
+                if attempt < retries:
+                    if self.log:
+                        self.log(f"Avertissement: '{os.path.basename(cmd[0])}' bloqué depuis {timeout:.0f}s, "
+                                 f"relance ({attempt + 1}/{retries})...")
+                    continue
+                raise JobTimeout(cmd, timeout)
+            except BaseException:
+                kill_tree(proc)
+                proc.wait()
+                raise
+            finally:
+                self.release(proc)
+
+            self.check() # Tué par cancel(): ce n'est pas une erreur ffmpeg
+            result = subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+            if check:
+                result.check_returncode()
+            return result
+
+
+def cancel_all():
+    """Arrête tous les traitements en cours (ex: Ctrl+C)."""
+    for supervisor in list(_supervisors):
+        supervisor.cancel()
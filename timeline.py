@@ -0,0 +1,62 @@
+import bisect
+
+
+class SpeechIndex:
+    """
+    Index des phrases (start, end) de Whisper pour la fusion volume + parole.
+    - Les débuts sont triés: 'bisect' borne à droite les phrases candidates.
+    - Le maximum cumulé des fins borne à gauche (une fin n'est jamais 'perdue',
+      même si Whisper rend des phrases qui se chevauchent).
+    - Les phrases déjà utilisées sont sautées grâce à un 'union-find'
+      (pointeur vers la prochaine phrase libre), en temps quasi constant.
+    Une requête coûte donc O(log n + nombre de phrases qui chevauchent).
+    """
+    def __init__(self, starts, ends):
+        self.starts = list(starts)
+        self.ends = list(ends)
+        n = len(self.starts)
+
+        self._max_end = []
+        running = float('-inf')
+        for end in self.ends:
+            running = max(running, end)
+            self._max_end.append(running)
+
+        # Whisper rend ses phrases dans l'ordre; sinon on retombe sur un parcours complet
+        self._sorted = all(self.starts[i] <= self.starts[i + 1] for i in range(n - 1))
+        self._next_free = list(range(n + 1)) # n = sentinelle "plus de phrase libre"
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _find_free(self, i):
+        """Plus petit indice >= i d'une phrase non utilisée (compression de chemin)."""
+        root = i
+        while self._next_free[root] != root:
+            root = self._next_free[root]
+        while self._next_free[i] != root:
+            self._next_free[i], i = root, self._next_free[i]
+        return root
+
+    def overlapping_unused(self, start, end):
+        """Indices (croissants) des phrases non utilisées qui chevauchent [start, end]."""
+        if self._sorted:
+            lo = bisect.bisect_right(self._max_end, start)
+            hi = bisect.bisect_left(self.starts, end)
+        else:
+            lo, hi = 0, len(self.starts)
+
+        found = []
+        i = self._find_free(lo)
+        while i < hi:
+            if start < self.ends[i] and end > self.starts[i]:
+                found.append(i)
+            i = self._find_free(i + 1)
+        return found
+
+    def mark_used(self, first, last):
+        """Marque toutes les phrases de 'first' à 'last' (inclus) comme utilisées."""
+        i = self._find_free(first)
+        while i <= last:
+            self._next_free[i] = i + 1
+            i = self._find_free(i + 1)
@@ -0,0 +1,207 @@
+import os
+import zipfile
+
+# NumPy est installé avec openai-whisper: il est toujours présent quand il y a une transcription.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SEGMENT_COLUMNS = ('segment_start', 'segment_end', 'segment_text', 'word_offset')
+WORD_COLUMNS = ('word_start', 'word_end', 'word_text')
+FILE_SUFFIX = ".npz" # Format de save() / load() (cache, reprise)
+
+
+class Transcript:
+    """
+    Transcription Whisper sous forme 'colonnes': des tableaux NumPy (début, fin, texte)
+    pour les phrases et pour les mots, au lieu de centaines de milliers de dicts Python
+    sur un stream de 8-10 h. Les textes sont 'internés' (un mot répété n'est stocké
+    qu'une fois) et référencés par leur indice dans 'texts'.
+
+    Les mots de la phrase i sont words[word_offset[i]:word_offset[i + 1]].
+    Les colonnes peuvent être déchargées dans des fichiers mappés en mémoire (spill).
+    """
+    def __init__(self, columns, texts, language=None):
+        if np is None:
+            raise ImportError("La transcription requiert 'numpy' (installé avec openai-whisper).")
+        self.columns = columns   # nom -> np.array (cf. SEGMENT_COLUMNS, WORD_COLUMNS)
+        self.texts = texts       # Table des textes internés
+        self.language = language
+
+    # --- Construction ---
+
+    @classmethod
+    def from_whisper(cls, result):
+        """Convertit un résultat Whisper ({'segments': [{'start', 'end', 'text', 'words'}]})."""
+        if isinstance(result, cls):
+            return result
+        texts, ids = [], {}
+
+        def intern(text):
+            index = ids.get(text)
+            if index is None:
+                index = ids[text] = len(texts)
+                texts.append(text)
+            return index
+
+        seg_start, seg_end, seg_text, offsets = [], [], [], [0]
+        word_start, word_end, word_text = [], [], []
+        for seg in result['segments']:
+            seg_start.append(seg['start'])
+            seg_end.append(seg['end'])
+            seg_text.append(intern(seg.get('text', '')))
+            for w in seg.get('words', []):
+                word_start.append(w['start'])
+                word_end.append(w['end'])
+                word_text.append(intern(w['word']))
+            offsets.append(len(word_start))
+
+        columns = {
+            'segment_start': np.array(seg_start, dtype=np.float64),
+            'segment_end': np.array(seg_end, dtype=np.float64),
+            'segment_text': np.array(seg_text, dtype=np.int32),
+            'word_offset': np.array(offsets, dtype=np.int64),
+            'word_start': np.array(word_start, dtype=np.float64),
+            'word_end': np.array(word_end, dtype=np.float64),
+            'word_text': np.array(word_text, dtype=np.int32),
+        }
+        return cls(columns, texts, result.get('language'))
+
+    @classmethod
+    def concat(cls, parts, language=None):
+        """Met bout à bout plusieurs transcriptions (ex: fenêtres du mode live, dans l'ordre)."""
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.from_whisper({'segments': [], 'language': language})
+        texts, ids = [], {}
+        remapped = []
+        for part in parts:
+            mapping = np.empty(len(part.texts), dtype=np.int32)
+            for i, text in enumerate(part.texts):
+                index = ids.get(text)
+                if index is None:
+                    index = ids[text] = len(texts)
+                    texts.append(text)
+                mapping[i] = index
+            remapped.append(mapping)
+
+        columns = {}
+        for name in ('segment_start', 'segment_end', 'word_start', 'word_end'):
+            columns[name] = np.concatenate([p.columns[name] for p in parts])
+        columns['segment_text'] = np.concatenate([m[p.columns['segment_text']] for p, m in zip(parts, remapped)])
+        columns['word_text'] = np.concatenate([m[p.columns['word_text']] for p, m in zip(parts, remapped)])
+        shifts = np.cumsum([0] + [p.n_words for p in parts[:-1]])
+        columns['word_offset'] = np.concatenate(
+            [[0]] + [p.columns['word_offset'][1:] + shift for p, shift in zip(parts, shifts)]
+        ).astype(np.int64)
+        language = language or next((p.language for p in parts if p.language), None)
+        return cls(columns, texts, language)
+
+    # --- Sérialisation (cache, reprise, analyse) ---
+
+    def to_dict(self):
+        data = {name: values.tolist() for name, values in self.columns.items()}
+        data['texts'] = list(self.texts)
+        data['language'] = self.language
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Relit to_dict(); accepte aussi l'ancien format (dicts Whisper 'compactés')."""
+        if isinstance(data, cls):
+            return data
+        if 'segments' in data:
+            return cls.from_whisper(data)
+        dtypes = {'segment_text': np.int32, 'word_text': np.int32, 'word_offset': np.int64}
+        columns = {
+            name: np.array(data[name], dtype=dtypes.get(name, np.float64))
+            for name in SEGMENT_COLUMNS + WORD_COLUMNS
+        }
+        return cls(columns, list(data['texts']), data.get('language'))
+
+    def save(self, f):
+        """
+        Écrit les colonnes telles quelles dans 'f' (fichier binaire ouvert, format .npz):
+        ni liste ni dict Python intermédiaire. Les textes sont un seul bloc UTF-8 + offsets.
+        """
+        encoded = [text.encode('utf-8') for text in self.texts]
+        text_offset = np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64)
+        np.savez(f, text_data=np.frombuffer(b''.join(encoded), dtype=np.uint8), text_offset=text_offset,
+                 language=np.array(self.language or ''), **self.columns)
+
+    @classmethod
+    def load(cls, path):
+        """Relit save(). Lève ValueError si le fichier est illisible ou incomplet."""
+        try:
+            with np.load(path) as data:
+                columns = {name: data[name] for name in SEGMENT_COLUMNS + WORD_COLUMNS}
+                blob = data['text_data'].tobytes()
+                offsets = data['text_offset'].tolist()
+                language = str(data['language']) or None
+        except (KeyError, zipfile.BadZipFile) as e:
+            raise ValueError(f"Transcription illisible ({e})")
+        texts = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return cls(columns, texts, language)
+
+    def spill(self, directory):
+        """
+        Écrit les colonnes dans 'directory' (un .npy par colonne) et les relit en
+        mémoire mappée: seules les pages réellement lues restent en RAM.
+        """
+        os.makedirs(directory, exist_ok=True)
+        columns = {}
+        for name, values in self.columns.items():
+            path = os.path.join(directory, f"{name}.npy")
+            np.save(path, np.ascontiguousarray(values))
+            columns[name] = np.load(path, mmap_mode='r')
+        return Transcript(columns, self.texts, self.language)
+
+    # --- Accès ---
+
+    def __len__(self):
+        return len(self.columns['segment_start'])
+
+    @property
+    def n_words(self):
+        return len(self.columns['word_start'])
+
+    @property
+    def segment_starts(self):
+        return self.columns['segment_start']
+
+    @property
+    def segment_ends(self):
+        return self.columns['segment_end']
+
+    @property
+    def word_starts(self):
+        return self.columns['word_start']
+
+    @property
+    def word_ends(self):
+        return self.columns['word_end']
+
+    def segment_text(self, i):
+        return self.texts[self.columns['segment_text'][i]]
+
+    def segments(self):
+        """Phrases [(start, end, texte), ...] dans l'ordre."""
+        starts, ends, text_ids = (self.columns[n] for n in ('segment_start', 'segment_end', 'segment_text'))
+        return [(float(s), float(e), self.texts[t]) for s, e, t in zip(starts, ends, text_ids)]
+
+    def _words(self, i0, i1):
+        starts, ends, text_ids = (self.columns[n][i0:i1] for n in WORD_COLUMNS)
+        return [(float(s), float(e), self.texts[t]) for s, e, t in zip(starts, ends, text_ids)]
+
+    def segment_words(self, i):
+        """Mots [(start, end, texte), ...] de la phrase i."""
+        offsets = self.columns['word_offset']
+        return self._words(int(offsets[i]), int(offsets[i + 1]))
+
+    def words_between(self, start, end):
+        """Mots qui commencent dans [start, end[ (ex: sous-titres d'un clip), par dichotomie."""
+        starts = self.columns['word_start']
+        i0 = int(np.searchsorted(starts, start, side='left'))
+        i1 = int(np.searchsorted(starts, end, side='left'))
+        return self._words(i0, i1)
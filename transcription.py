@@ -0,0 +1,198 @@
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+import audio
+
+try:
+    import whisper
+except ImportError:
+    whisper = None
+
+DEFAULT_WINDOW = 600        # Fenêtres de 10 min
+DEFAULT_OVERLAP = 10        # Recouvrement entre deux fenêtres (secondes)
+SILENCE_SEARCH = 15         # On cherche un silence à +/- 15s de la coupure nominale
+
+
+# --- 1. Découpage en fenêtres (coupées dans les silences) ---
+
+def _quietest_time(frame_levels, start, end):
+    """Instant (s) de la frame la plus calme de [start, end] d'après des niveaux déjà calculés."""
+    i0, i1 = frame_levels.frame_range(start, end)
+    if i1 <= i0:
+        return (start + end) / 2
+    energy = frame_levels.sumsq[i0:i1] / audio.np.maximum(frame_levels.counts[i0:i1], 1)
+    return (i0 + int(audio.np.argmin(energy)) + 0.5) * frame_levels.frame_duration
+
+
+def _quietest_time_decoded(input_file, start, end, run=subprocess.run):
+    """Même chose, en décodant uniquement [start, end] (quelques secondes d'audio)."""
+    cmd = audio.pcm_decode_cmd(input_file, start=start, duration=end - start)
+    result = run(cmd, capture_output=True, check=True)
+    samples = audio.np.frombuffer(result.stdout[:len(result.stdout) // 4 * 4], dtype=audio.np.float32)
+    frame = int(audio.FRAME_DURATION * audio.SAMPLE_RATE)
+    n = len(samples) // frame
+    if n == 0:
+        return (start + end) / 2
+    energy = audio.np.square(samples[:n * frame].reshape(n, frame), dtype=audio.np.float64).mean(axis=1)
+    return start + (int(audio.np.argmin(energy)) + 0.5) * audio.FRAME_DURATION
+
+
+def plan_windows(input_file, duration, window=DEFAULT_WINDOW, overlap=DEFAULT_OVERLAP, frame_levels=None,
+                 run=subprocess.run):
+    """
+    Découpe [0, duration] en fenêtres d'environ 'window' secondes.
+    Chaque coupure est déplacée vers le passage le plus calme à proximité
+    (pour ne pas couper une phrase), puis les fenêtres se recouvrent de 'overlap'.
+
+    Retourne une liste de (start, end, own_start, own_end): [start, end] est
+    transcrit, et seuls les segments dont le milieu tombe dans [own_start, own_end[
+    sont gardés lors du recollage (pas de doublons dans les recouvrements).
+    """
+    cuts = [0.0]
+    nominal = window
+    while nominal < duration - window / 4:
+        lo = max(cuts[-1] + overlap, nominal - SILENCE_SEARCH)
+        hi = min(duration, nominal + SILENCE_SEARCH)
+        cut = nominal
+        if audio.np is not None and hi > lo:
+            try:
+                if frame_levels is not None and len(frame_levels):
+                    cut = _quietest_time(frame_levels, lo, hi)
+                else:
+                    cut = _quietest_time_decoded(input_file, lo, hi, run)
+            except (subprocess.CalledProcessError, ValueError):
+                cut = nominal
+        cuts.append(cut)
+        nominal = cut + window
+    cuts.append(float(duration))
+
+    windows = []
+    for own_start, own_end in zip(cuts[:-1], cuts[1:]):
+        start = max(0.0, own_start - overlap / 2)
+        end = min(float(duration), own_end + overlap / 2)
+        windows.append((start, end, own_start, own_end))
+    return windows
+
+
+# --- 2. Workers (un modèle Whisper par processus) ---
+
+_worker_model = None
+
+
+def _init_worker(model_name, torch_threads):
+    """Initialisation d'un processus du pool: limite les threads et charge le modèle une fois."""
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(max(1, torch_threads))
+    except ImportError:
+        pass
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_window(input_file, start, end, language, pcm_path=None):
+    """
+    Transcrit une fenêtre et remet les timestamps sur la timeline de la vidéo.
+    Avec 'pcm_path' (audio déjà décodé, cf. audio.PcmBuffer), la fenêtre est une vue
+    du fichier mappé: rien n'est redécodé et les processus partagent les mêmes pages.
+    """
+    if pcm_path:
+        samples = audio.PcmBuffer(pcm_path).view(start, end)
+    else:
+        cmd = audio.pcm_decode_cmd(input_file, start=start, duration=end - start)
+        result = subprocess.run(cmd, capture_output=True, check=True)
+        # Copie: Whisper convertit le tableau en tenseur, qui doit être modifiable
+        samples = audio.np.frombuffer(result.stdout[:len(result.stdout) // 4 * 4], dtype=audio.np.float32).copy()
+    if len(samples) == 0:
+        return {'segments': [], 'language': language}
+
+    window_result = _worker_model.transcribe(samples, verbose=None, word_timestamps=True, language=language)
+    return {
+        'language': window_result.get('language'),
+        'segments': [_offset_segment(seg, start) for seg in window_result['segments']],
+    }
+
+
+def _offset_segment(seg, offset):
+    """Copie 'légère' d'un segment Whisper, décalé de 'offset' secondes."""
+    return {
+        'start': seg['start'] + offset,
+        'end': seg['end'] + offset,
+        'text': seg.get('text', ''),
+        'words': [
+            {'word': w['word'], 'start': w['start'] + offset, 'end': w['end'] + offset}
+            for w in seg.get('words', [])
+        ],
+    }
+
+
+def _kill_pool(executor):
+    """Arrêt immédiat d'un ProcessPoolExecutor: ses processus sont tués (les futures échouent)."""
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    for process in processes:
+        process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+# --- 3. Orchestration + Recollage ---
+
+def stitch_windows(windows, window_results):
+    """
+    Recolle les résultats des fenêtres en un seul {'segments': [...]}.
+    Un segment n'est gardé que par la fenêtre qui 'possède' son milieu.
+    """
+    segments = []
+    for i, ((_, _, own_start, own_end), result) in enumerate(zip(windows, window_results)):
+        if i == len(windows) - 1:
+            own_end = float('inf') # La dernière fenêtre garde tout ce qui dépasse
+        for seg in result['segments']:
+            middle = (seg['start'] + seg['end']) / 2
+            if own_start <= middle < own_end:
+                segments.append(seg)
+    segments.sort(key=lambda seg: seg['start'])
+
+    language = next((r.get('language') for r in window_results if r.get('language')), None)
+    return {
+        'text': ''.join(seg['text'] for seg in segments),
+        'segments': segments,
+        'language': language,
+    }
+
+
+def transcribe_parallel(input_file, duration, model_name, workers, window=DEFAULT_WINDOW,
+                        overlap=DEFAULT_OVERLAP, language=None, frame_levels=None,
+                        log=None, progress_cb=None, run=subprocess.run, pcm_path=None, supervisor=None):
+    """
+    Transcription d'une longue vidéo par fenêtres, réparties sur 'workers' processus.
+    'pcm_path': fichier PCM déjà décodé (audio.PcmBuffer), lu par les workers sans redécodage.
+    'supervisor' (supervisor.ProcessSupervisor): un arrêt tue les processus du pool.
+    Retourne le même format que model.transcribe(): {'segments': [...], ...}.
+    """
+    if whisper is None or audio.np is None:
+        raise ImportError("La transcription parallèle requiert 'openai-whisper' et 'numpy'.")
+
+    windows = plan_windows(input_file, duration, window, overlap, frame_levels, run)
+    workers = max(1, min(workers, len(windows)))
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    if log:
+        log(f"Transcription parallèle: {len(windows)} fenêtres, {workers} processus "
+            f"({torch_threads} threads chacun).")
+
+    results = [None] * len(windows)
+    completed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_name, torch_threads)) as executor, \
+            (supervisor.on_cancel(lambda: _kill_pool(executor)) if supervisor else nullcontext()):
+        futures = {
+            executor.submit(_transcribe_window, input_file, start, end, language, pcm_path): i
+            for i, (start, end, _, _) in enumerate(windows)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            completed += 1
+            if progress_cb:
+                progress_cb(completed / len(windows) * 100)
+
+    return stitch_windows(windows, results)
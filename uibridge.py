@@ -0,0 +1,89 @@
+import collections
+
+FLUSH_INTERVAL_MS = 66   # ~15 rafraîchissements de l'interface par seconde
+MAX_LOG_LINES = 2000     # Lignes gardées dans la zone de log (les plus anciennes sont supprimées)
+
+
+class UIBridge:
+    """
+    Pont entre les threads de traitement et l'interface Tkinter.
+    log() et update_progress() ne font que déposer dans une file (aucun appel à Tk,
+    aucun verrou partagé avec la boucle principale); un 'tick' dans le thread de Tk
+    vide la file à intervalle fixe: toutes les lignes en attente en une seule
+    insertion, et uniquement la dernière valeur de progression.
+    Optionnel: le journal complet est aussi écrit dans un fichier (cf. open_log_file).
+    """
+    def __init__(self, root, write_lines, set_progress, interval_ms=FLUSH_INTERVAL_MS):
+        self.root = root
+        self.write_lines = write_lines     # Appelé dans le thread de Tk avec une liste de lignes
+        self.set_progress = set_progress   # Appelé dans le thread de Tk avec la dernière valeur
+        self.interval_ms = interval_ms
+        self._lines = collections.deque()  # append / popleft sont sûrs entre threads
+        self._progress = None        # Dernière valeur déposée (jamais effacée: pas de course)
+        self._shown_progress = None  # Dernière valeur affichée
+        self._log_file = None
+        self._after_id = None
+
+    # --- Côté threads de traitement ---
+
+    def log(self, message):
+        self._lines.append(message)
+
+    def update_progress(self, value):
+        self._progress = value # Seule la dernière valeur compte
+
+    # --- Côté thread de Tk ---
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Arrête le rafraîchissement (fermeture de la fenêtre) après un dernier vidage."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self.flush()
+        self.close_log_file()
+
+    def _tick(self):
+        self.flush()
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def flush(self):
+        lines = []
+        while self._lines:
+            lines.append(self._lines.popleft())
+        if lines:
+            self.write_lines(lines)
+            if self._log_file is not None:
+                try:
+                    self._log_file.write("\n".join(lines) + "\n")
+                    self._log_file.flush()
+                except OSError:
+                    self.close_log_file()
+        progress = self._progress # Une seule lecture: une écriture concurrente sera vue au tick suivant
+        if progress is not None and progress != self._shown_progress:
+            self._shown_progress = progress
+            self.set_progress(progress)
+
+    def open_log_file(self, path, append=False):
+        """Écrit aussi le journal complet dans 'path' (la zone de log, elle, est bornée)."""
+        self.close_log_file()
+        try:
+            self._log_file = open(path, 'a' if append else 'w', encoding='utf-8')
+        except OSError as e:
+            self._log_file = None
+            self.log(f"Avertissement: journal '{path}' impossible à écrire ({e})")
+
+    def close_log_file(self):
+        """Ferme le journal après y avoir écrit les lignes encore en attente."""
+        log_file, self._log_file = self._log_file, None
+        if log_file is None:
+            return
+        if self._lines:
+            self._log_file = log_file
+            self.flush()
+            log_file, self._log_file = self._log_file, None
+        if log_file is not None:
+            log_file.close()
@@ -0,0 +1,137 @@
+import bisect
+import subprocess
+
+import audio
+
+DEFAULT_MARGIN = 2.0        # Secondes ajoutées autour de chaque zone gardée
+MIN_SPEECH = 0.3            # Une zone 'active' plus courte est ignorée (clic, bruit)
+MIN_GAP = 1.0               # Deux zones séparées de moins de 1s sont fusionnées
+THRESHOLD_OVER_FLOOR = 12.0 # dB au-dessus du bruit de fond pour être considéré 'actif'
+MIN_THRESHOLD_DB = -50.0
+
+
+# --- 1. Détection des zones à transcrire ---
+
+def merge_regions(regions, min_gap=0.0, margin=0.0, duration=None):
+    """Élargit chaque zone de 'margin', puis fusionne celles qui se touchent (ou presque)."""
+    merged = []
+    for start, end in sorted(regions):
+        start = max(0.0, start - margin)
+        end = end + margin if duration is None else min(duration, end + margin)
+        if merged and start <= merged[-1][1] + min_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+def speech_regions(frame_levels, margin=DEFAULT_MARGIN, duration=None):
+    """
+    VAD 'énergie': une frame est active si son niveau RMS dépasse le bruit de fond
+    (10e percentile) de THRESHOLD_OVER_FLOOR dB. Les zones actives sont lissées
+    (trous < MIN_GAP fusionnés, zones < MIN_SPEECH ignorées) puis élargies de 'margin'.
+    """
+    np = audio.np
+    if len(frame_levels) == 0:
+        return []
+    rms_db = audio.to_db(np.sqrt(frame_levels.sumsq / np.maximum(frame_levels.counts, 1)))
+    threshold = max(MIN_THRESHOLD_DB, float(np.percentile(rms_db, 10)) + THRESHOLD_OVER_FLOOR)
+    active = rms_db > threshold
+
+    # Débuts / fins des suites de frames actives
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame_levels.frame_duration
+    ends = np.flatnonzero(edges == -1) * frame_levels.frame_duration
+
+    raw = merge_regions(zip(starts.tolist(), ends.tolist()), min_gap=MIN_GAP)
+    raw = [(s, e) for s, e in raw if e - s >= MIN_SPEECH]
+    return merge_regions(raw, margin=margin, duration=duration)
+
+
+def hype_regions(scored_chunks, top_fraction=0.5, margin=DEFAULT_MARGIN, duration=None):
+    """Zones autour des 'bouts' les mieux notés (la meilleure 'top_fraction' du classement)."""
+    if not scored_chunks:
+        return []
+    ranked = sorted(scored_chunks, key=lambda x: x[3], reverse=True)
+    keep = ranked[:max(1, int(len(ranked) * top_fraction))]
+    return merge_regions([(c[0], c[1]) for c in keep], margin=margin, duration=duration)
+
+
+# --- 2. Audio 'compacté' + remise sur la timeline d'origine ---
+
+class TimeMap:
+    """
+    Correspondance entre la timeline 'compactée' (zones gardées mises bout à bout)
+    et la timeline de la vidéo d'origine.
+    """
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.compact_starts = []
+        position = 0.0
+        for start, end in self.regions:
+            self.compact_starts.append(position)
+            position += end - start
+        self.compact_duration = position
+
+    def to_original(self, t):
+        i = max(0, bisect.bisect_right(self.compact_starts, t) - 1)
+        start, end = self.regions[i]
+        return min(end, start + (t - self.compact_starts[i]))
+
+
+def extract_regions_audio(input_file, regions, progress_cb=None, total_duration=None, popen=subprocess.Popen,
+                          buffer=None):
+    """
+    Décode l'audio en une passe et ne garde que les échantillons des 'regions'.
+    Avec 'buffer' (audio.PcmBuffer, déjà décodé), les zones y sont lues directement.
+    Retourne (np.float32[...], TimeMap).
+    """
+    np = audio.np
+    if buffer is not None:
+        parts = [buffer.view(start, end) for start, end in regions]
+        samples = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        return samples, TimeMap(regions)
+
+    sr = audio.SAMPLE_RATE
+    bounds = [(int(s * sr), int(e * sr)) for s, e in regions]
+    parts = []
+    position = 0 # index (en échantillons) du début du bloc courant
+    r = 0
+    block_samples = audio.READ_BLOCK_SECONDS * sr
+    expected = (total_duration or 0) * sr
+
+    for block in audio.iter_pcm_blocks(input_file, block_samples, sr, popen):
+        block_end = position + len(block)
+        while r < len(bounds) and bounds[r][0] < block_end:
+            s, e = bounds[r]
+            lo, hi = max(s, position), min(e, block_end)
+            if hi > lo:
+                parts.append(block[lo - position:hi - position].copy())
+            if e <= block_end:
+                r += 1
+            else:
+                break
+        position = block_end
+        if progress_cb and expected:
+            progress_cb(min(100.0, position / expected * 100))
+        if r >= len(bounds):
+            break
+
+    samples = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return samples, TimeMap(regions)
+
+
+def remap_result(result, time_map):
+    """Remet les timestamps d'un résultat Whisper 'compacté' sur la timeline d'origine."""
+    segments = []
+    for seg in result['segments']:
+        segments.append({
+            'start': time_map.to_original(seg['start']),
+            'end': time_map.to_original(seg['end']),
+            'text': seg.get('text', ''),
+            'words': [
+                {'word': w['word'], 'start': time_map.to_original(w['start']), 'end': time_map.to_original(w['end'])}
+                for w in seg.get('words', [])
+            ],
+        })
+    return {'text': result.get('text', ''), 'segments': segments, 'language': result.get('language')}